@@ -0,0 +1,215 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+DEFAULT_GLOBAL_CONCURRENCY = 8
+DEFAULT_GROUP_CONCURRENCY = 2
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8.0
+QUEUE_DEPTH_WARNING = 200
+
+PERMISSION_DENIED_MESSAGE = "机器人权限不足，无法禁言该成员。"
+BAN_FAILED_MESSAGE = "禁言失败，请检查机器人权限或稍后再试。"
+
+
+class BanRequest:
+    """一次待执行的禁言，同一用户的后续请求会合并到这里"""
+
+    __slots__ = ('client', 'group_id', 'user_id', 'self_id', 'duration', 'origin', 'submitted_at')
+
+    def __init__(self, client, group_id: int, user_id: int, self_id: int, duration: int, origin: Any,
+                 submitted_at: float):
+        self.client = client
+        self.group_id = group_id
+        self.user_id = user_id
+        self.self_id = self_id
+        self.duration = duration
+        self.origin = origin
+        self.submitted_at = submitted_at
+
+
+class BanDispatcher:
+    """后台禁言调度器
+
+    - 全局与单群两级并发上限，避免触发平台接口限流；
+    - 同一用户的禁言在落地前再次提交时合并为一次调用，取较长时长；
+    - 失败后按带抖动的指数退避重试，权限不足不重试。
+    """
+
+    def __init__(
+        self,
+        notify: Callable[[Any, str], Awaitable[Any]],
+        global_concurrency: int = DEFAULT_GLOBAL_CONCURRENCY,
+        group_concurrency: int = DEFAULT_GROUP_CONCURRENCY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        clock: Callable[[], float] = time.monotonic,
+        on_result: Optional[Callable[[BanRequest, int, bool], Any]] = None,
+    ):
+        self._notify = notify
+        # 每次禁言调用最终成功或失败时回调 (请求, 时长, 是否成功)
+        self._on_result = on_result
+        self._global_slots = asyncio.Semaphore(global_concurrency)
+        self._group_concurrency = group_concurrency
+        self._group_slots: Dict[Any, List[Any]] = {}
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._requests: Dict[Tuple[Any, Any], BanRequest] = {}
+        self._tasks: set = set()
+        # 统计信息
+        self.queued = 0
+        self.in_flight = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.completed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def submit(self, client, group_id: int, user_id: int, self_id: int, duration: int, origin: Any):
+        """提交禁言请求，立即返回"""
+        self.submitted += 1
+        key = (group_id, user_id)
+        request = self._requests.get(key)
+        if request is not None:
+            self.coalesced += 1
+            if duration > request.duration:
+                request.duration = duration
+            return
+        request = BanRequest(client, group_id, user_id, self_id, duration, origin, self._clock())
+        self._requests[key] = request
+        self.queued += 1
+        if self.queued == QUEUE_DEPTH_WARNING:
+            logger.warning(f"Ban queue depth reached {self.queued}")
+        task = asyncio.ensure_future(self._run(key, request))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _acquire_group_slot(self, group_id) -> asyncio.Semaphore:
+        entry = self._group_slots.get(group_id)
+        if entry is None:
+            entry = [asyncio.Semaphore(self._group_concurrency), 0]
+            self._group_slots[group_id] = entry
+        entry[1] += 1
+        return entry[0]
+
+    def _release_group_slot(self, group_id):
+        entry = self._group_slots[group_id]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._group_slots[group_id]
+
+    async def _run(self, key, request: BanRequest):
+        group_slot = self._acquire_group_slot(request.group_id)
+        started = False
+        try:
+            async with group_slot, self._global_slots:
+                self.queued -= 1
+                self.in_flight += 1
+                started = True
+                applied = 0
+                # 调用期间合并进来更长的时长时再补发一次
+                while request.duration > applied:
+                    applied = request.duration
+                    if not await self._call_with_retry(request, applied):
+                        break
+        finally:
+            if started:
+                self.in_flight -= 1
+            else:
+                self.queued -= 1
+            self._release_group_slot(request.group_id)
+            if self._requests.get(key) is request:
+                del self._requests[key]
+            latency = self._clock() - request.submitted_at
+            self.completed += 1
+            self.latency_total += latency
+            if latency > self.latency_max:
+                self.latency_max = latency
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    async def _call_with_retry(self, request: BanRequest, duration: int) -> bool:
+        ban_method = request.client.set_group_ban
+        for attempt in range(self.max_attempts):
+            try:
+                await ban_method(
+                    group_id=request.group_id,
+                    user_id=request.user_id,
+                    duration=duration,
+                    self_id=request.self_id,
+                )
+            except PermissionError:
+                self.failed += 1
+                self._report(request, duration, False)
+                await self._safe_notify(request.origin, PERMISSION_DENIED_MESSAGE)
+                return False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt + 1 < self.max_attempts:
+                    self.retries += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                self.failed += 1
+                self._report(request, duration, False)
+                logger.error(f"Failed to ban user {request.user_id} in {request.group_id}: {e}")
+                await self._safe_notify(request.origin, BAN_FAILED_MESSAGE)
+                return False
+            self.succeeded += 1
+            self._report(request, duration, True)
+            return True
+        return False
+
+    def _report(self, request: BanRequest, duration: int, succeeded: bool):
+        if self._on_result is None:
+            return
+        try:
+            self._on_result(request, duration, succeeded)
+        except Exception as e:
+            logger.error(f"Ban result callback failed: {e}")
+
+    async def _safe_notify(self, origin, message: str):
+        try:
+            await self._notify(origin, message)
+        except Exception as e:
+            logger.error(f"Failed to send ban notice: {e}")
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queued
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'queue_depth': self.queued,
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'retries': self.retries,
+            'latency_avg': self.latency_total / self.completed if self.completed else 0.0,
+            'latency_max': self.latency_max,
+        }
+
+    async def close(self, timeout: Optional[float] = 5.0):
+        """等待进行中的禁言完成，超时后取消"""
+        if not self._tasks:
+            return
+        pending = list(self._tasks)
+        _done, not_done = await asyncio.wait(pending, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            await asyncio.gather(*not_done, return_exceptions=True)
@@ -0,0 +1,105 @@
+"""指令分类基准测试
+
+用法: python benchmarks/bench_command_dispatch.py [--messages 200000] [--seed 1]
+
+对比旧的分类方式（lstrip('/') + split() + 集合查找）与 command_router.CommandTable：
+- 先在一组指令、带参数指令、近似指令与普通聊天上检查两者分类结果一致；
+- 再分别测量长普通消息（群里的主要流量）与指令消息的每条耗时，
+  以及用 tracemalloc 统计的单次分类临时分配峰值字节数。
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from fakes import load_plugin_module
+
+LONG_CHAT = [
+    '这是一条比较长的普通聊天消息，用来模拟群里大部分非指令流量。' * 4,
+    '有人打游戏吗？今晚八点老地方集合，不来的请假 ' * 6,
+    'hello everyone, this is a fairly long plain chat message without any command in it. ' * 3,
+    '哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈' * 5,
+]
+COMMANDS = ['/装填 3', '/开枪', '开枪', '/走火开', '走火关', '/rg状态', '/排行榜', '//装填\t2']
+NEAR_MISSES = ['装填3', '开枪了', '/开', '/走火', '排行', '/rg', '/', '', '/ 开枪', '开 枪']
+
+
+def legacy_classify(keywords, message_str):
+    """旧实现：切分整条消息后查集合"""
+    if not message_str:
+        return None
+    normalized = message_str.lstrip('/').split()
+    if not normalized:
+        return None
+    return normalized[0] if normalized[0] in keywords else None
+
+
+def table_classify(table, message_str):
+    matched = table.match(message_str)
+    return matched[0].name if matched is not None else None
+
+
+def time_per_call(function, argument, messages):
+    start = time.perf_counter()
+    for message in messages:
+        function(argument, message)
+    return (time.perf_counter() - start) / len(messages)
+
+
+def peak_bytes_per_call(function, argument, messages):
+    """逐条调用并记录每次分类期间的临时分配峰值，返回平均值"""
+    total = 0
+    tracemalloc.start()
+    try:
+        for message in messages:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            function(argument, message)
+            total += tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return total / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    plugin_main = load_plugin_module()
+    table = plugin_main.RevolverGamePlugin.command_table
+    keywords = {route.name for route in table.routes}
+
+    mismatches = [
+        (message, legacy_classify(keywords, message), table_classify(table, message))
+        for message in LONG_CHAT + COMMANDS + NEAR_MISSES
+        if legacy_classify(keywords, message) != table_classify(table, message)
+    ]
+    for message, legacy, current in mismatches:
+        print(f"  mismatch {message!r}: legacy={legacy} table={current}")
+
+    rng = random.Random(args.seed)
+    workloads = {
+        'long chat': [rng.choice(LONG_CHAT) for _ in range(args.messages)],
+        'commands': [rng.choice(COMMANDS) for _ in range(args.messages)],
+    }
+    sample = max(1, min(args.messages, 2000))
+    for name, messages in workloads.items():
+        legacy_time = time_per_call(legacy_classify, keywords, messages)
+        table_time = time_per_call(table_classify, table, messages)
+        legacy_bytes = peak_bytes_per_call(legacy_classify, keywords, messages[:sample])
+        table_bytes = peak_bytes_per_call(table_classify, table, messages[:sample])
+        print(f"{name:10s} legacy {legacy_time * 1e9:7.0f} ns/msg {legacy_bytes:8.1f} B/msg | "
+              f"table {table_time * 1e9:7.0f} ns/msg {table_bytes:8.1f} B/msg")
+
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} messages classified differently")
+        return 1
+    print("OK: prefix table classification matches the legacy keyword lookup")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""对比字典+列表与 GameState 两种群游戏状态的内存与开枪耗时
+
+用法: python benchmarks/bench_game_state_memory.py [--groups 100000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_state import CHAMBER_COUNT, GameState  # noqa: E402
+
+
+def build_legacy(groups, rng):
+    states = {}
+    for group_id in range(groups):
+        chambers = [False] * CHAMBER_COUNT
+        for position in rng.sample(range(CHAMBER_COUNT), rng.randint(1, CHAMBER_COUNT)):
+            chambers[position] = True
+        states[group_id] = {'chambers': chambers, 'current_chamber_index': 0}
+    return states
+
+
+def build_slots(groups, rng):
+    return {
+        group_id: GameState.load(rng.randint(1, CHAMBER_COUNT), CHAMBER_COUNT, rng)
+        for group_id in range(groups)
+    }
+
+
+def measure(builder, groups):
+    gc.collect()
+    tracemalloc.start()
+    states = builder(groups, random.Random(7))
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return states, current
+
+
+def shoot_legacy(states):
+    # 与旧版 execute_shot 相同：开枪后 sum() 统计剩余实弹
+    for state in states.values():
+        chambers = state['chambers']
+        index = state['current_chamber_index']
+        if chambers[index]:
+            chambers[index] = False
+        state['current_chamber_index'] = (index + 1) % CHAMBER_COUNT
+        sum(chambers)
+
+
+def shoot_slots(states):
+    for state in states.values():
+        state.fire()
+        state.is_active
+
+
+def timed(func, states):
+    start = time.perf_counter()
+    func(states)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=100_000)
+    args = parser.parse_args()
+
+    legacy, legacy_bytes = measure(build_legacy, args.groups)
+    slots, slots_bytes = measure(build_slots, args.groups)
+
+    print(f"groups={args.groups}")
+    print(f"  dict+list : {legacy_bytes / 1024 / 1024:8.2f} MiB  ({legacy_bytes / args.groups:6.1f} B/group)")
+    print(f"  GameState : {slots_bytes / 1024 / 1024:8.2f} MiB  ({slots_bytes / args.groups:6.1f} B/group)")
+    print(f"  ratio     : {legacy_bytes / slots_bytes:.2f}x")
+
+    legacy_seconds = timed(shoot_legacy, legacy)
+    slots_seconds = timed(shoot_slots, slots)
+    print(f"  shot+remaining dict+list : {legacy_seconds * 1e9 / args.groups:6.1f} ns/shot")
+    print(f"  shot+remaining GameState : {slots_seconds * 1e9 / args.groups:6.1f} ns/shot")
+
+
+if __name__ == '__main__':
+    main()
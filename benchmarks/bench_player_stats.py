@@ -0,0 +1,105 @@
+"""玩家统计与排行榜压力测试
+
+用法: python benchmarks/bench_player_stats.py [--members 50000] [--events 200000] [--cache-size 4096]
+
+在一个成员数上万的群里随机记录开枪、走火与禁言，检查：
+- 内存中缓存的玩家数不超过 cache_size；
+- 排行榜与按全部事件暴力计算的结果一致（含写入数据库后重新加载）；
+并输出单次记录与排行榜查询的耗时。
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from fakes import load_plugin_module
+
+GROUP_ID = 10001
+
+
+def expected_top(totals, limit):
+    ranked = sorted(totals.items(), key=lambda item: (-item[1][1], -item[1][0], str(item[0])))
+    return [(user_id, ban_seconds) for user_id, (_hits, ban_seconds) in ranked[:limit]]
+
+
+def actual_top(players):
+    return [(player.user_id, player.ban_seconds) for player in players]
+
+
+async def main_async(args):
+    load_plugin_module()
+    state_store = load_plugin_module('state_store')
+    player_stats = load_plugin_module('player_stats')
+    rng = random.Random(args.seed)
+    errors = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = state_store.PluginStateStore(os.path.join(directory, 'rg_state.db'))
+        store.open()
+        book = player_stats.StatsBook(store, cache_size=args.cache_size, flush_delay=0.5)
+        totals = {}
+        max_cached = 0
+        start = time.perf_counter()
+        for index in range(args.events):
+            # 少数活跃玩家占大部分事件，其余成员偶尔出现
+            if rng.random() < 0.7:
+                user_id = rng.randrange(1, 200)
+            else:
+                user_id = rng.randrange(1, args.members + 1)
+            hit = rng.random() < 0.3
+            ban_seconds = rng.randint(60, 300) if hit else 0
+            book.record_nowait(GROUP_ID, user_id, f"u{user_id}", shots=1, hits=int(hit),
+                               misses=int(not hit), ban_seconds=ban_seconds)
+            hits, seconds = totals.get(user_id, (0, 0))
+            totals[user_id] = (hits + hit, seconds + ban_seconds)
+            max_cached = max(max_cached, book.cached_players)
+            if index % args.yield_every == 0:
+                # 像处理器一样让出事件循环，后台读取与批量写入得以进行
+                await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+        await book.settle()
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            top = await book.top(GROUP_ID)
+        query = (time.perf_counter() - start) / 1000
+        expected = expected_top(totals, book.leaderboard_size)
+        if actual_top(top) != expected:
+            errors.append(f"in-memory leaderboard {actual_top(top)} != expected {expected}")
+
+        await book.close()
+        reloaded = player_stats.StatsBook(store, cache_size=args.cache_size)
+        if actual_top(await reloaded.top(GROUP_ID)) != expected:
+            errors.append("leaderboard reloaded from the database differs")
+        await store.close()
+
+    print(f"members={args.members} distinct_players={len(totals)} events={args.events}")
+    print(f"record_nowait: {elapsed / args.events * 1e6:.1f} us/event ({args.events / elapsed:.0f} events/s)")
+    print(f"leaderboard query: {query * 1e6:.2f} us")
+    print(f"max cached players: {max_cached} (limit {args.cache_size})")
+    if max_cached > args.cache_size:
+        errors.append(f"cache grew to {max_cached} players")
+    if errors:
+        for error in errors:
+            print("  " + error)
+        print("FAIL")
+        return 1
+    print("OK: bounded cache and exact leaderboard")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=50000)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    parser.add_argument('--yield-every', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
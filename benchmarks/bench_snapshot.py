@@ -0,0 +1,84 @@
+"""进行中游戏快照的编码、解码与恢复耗时
+
+用法: python benchmarks/bench_snapshot.py [--games 100000]
+
+恢复阶段与插件启动时相同：解码快照、重建 GameState 并按剩余时间登记到超时时间轮。
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_state import CHAMBER_COUNT, GameState  # noqa: E402
+from snapshot import (  # noqa: E402
+    GameSnapshot,
+    encode_snapshot,
+    read_snapshot_file,
+    write_snapshot_file,
+)
+from timeout_wheel import TimeoutWheel  # noqa: E402
+
+
+async def _noop(_key):
+    return None
+
+
+async def run(games_count):
+    rng = random.Random(3)
+    games = []
+    for index in range(games_count):
+        state = GameState.load(rng.randint(1, CHAMBER_COUNT), CHAMBER_COUNT, rng)
+        group_id = 100000000 + index
+        games.append(GameSnapshot(
+            group_id, state.chamber_count, state.current_chamber_index, state.live_rounds,
+            state.chambers, rng.uniform(0, 60), f"aiocqhttp:GroupMessage:{group_id}",
+        ))
+
+    path = os.path.join(tempfile.mkdtemp(prefix='rg-snapshot-'), 'active_games.snapshot')
+
+    start = time.perf_counter()
+    data = encode_snapshot(games)
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_snapshot_file(path, data)
+    write_seconds = time.perf_counter() - start
+
+    wheel = TimeoutWheel(_noop)
+    group_states = {}
+    origins = {}
+    start = time.perf_counter()
+    saved_at, restored = read_snapshot_file(path)
+    decode_seconds = time.perf_counter() - start
+    elapsed = max(time.time() - saved_at, 0.0)
+    for game in restored:
+        group_states[game.group_id] = GameState(
+            game.chamber_count, game.chambers, game.current_chamber_index, game.live_rounds
+        )
+        origins[game.group_id] = game.origin
+        wheel.schedule(game.group_id, max(game.remaining - elapsed, 0.0))
+    restore_seconds = time.perf_counter() - start
+    wheel.stop()
+
+    assert len(restored) == games_count and restored[-1].origin == games[-1].origin
+    print(f"games={games_count} size={len(data) / 1024 / 1024:.2f} MiB ({len(data) / games_count:.1f} B/game)")
+    print(f"  encode           {encode_seconds * 1000:8.1f} ms")
+    print(f"  write+fsync      {write_seconds * 1000:8.1f} ms")
+    print(f"  read+decode      {decode_seconds * 1000:8.1f} ms")
+    print(f"  full restore     {restore_seconds * 1000:8.1f} ms  (decode + GameState + timing wheel)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.games))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""插件冷启动耗时
+
+用法: python benchmarks/bench_startup.py [--repeat 5] [--top 15]
+
+1. 在子进程中以 -X importtime 导入插件，统计插件包及其依赖的导入耗时；
+2. 测量 RevolverGamePlugin 构造耗时（应接近零，不做文件 I/O）
+   以及随后异步预热（加载文本、走火开关与游戏快照）的耗时。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from fakes import PLUGIN_PACKAGE, FakeContext, load_plugin_module
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {bench_dir!r}); "
+    "from fakes import load_plugin_module; "
+    "start = time.perf_counter(); load_plugin_module(); "
+    "print(time.perf_counter() - start)"
+)
+
+
+def import_profile(top):
+    """返回 (导入插件的墙钟耗时秒, 插件模块各自的累计耗时us, 按自身耗时排序的前 top 个模块)"""
+    command = [sys.executable, '-X', 'importtime', '-c', IMPORT_SNIPPET.format(bench_dir=BENCH_DIR)]
+    completed = subprocess.run(command, capture_output=True, text=True, env=os.environ.copy())
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    rows = []
+    plugin_rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((int(self_us), int(cumulative_us), name))
+        if name.startswith(f'{PLUGIN_PACKAGE}.'):
+            plugin_rows.append((int(cumulative_us), name))
+    rows.sort(reverse=True)
+    return float(completed.stdout.strip().splitlines()[-1]), plugin_rows, rows[:top]
+
+
+async def construct_and_warm_up(main, data_dir):
+    context = FakeContext(data_dir)
+    start = time.perf_counter()
+    plugin = main.RevolverGamePlugin(context, {})
+    constructed = time.perf_counter() - start
+    start = time.perf_counter()
+    await plugin._ensure_ready()
+    warmed = time.perf_counter() - start
+    await plugin.terminate()
+    return constructed, warmed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    wall, plugin_rows, top_rows = import_profile(args.top)
+    print(f"import {PLUGIN_PACKAGE}.main: {wall * 1000:.1f} ms wall")
+    for cumulative_us, name in plugin_rows:
+        print(f"  {cumulative_us / 1000:7.2f} ms cum  {name}")
+    print(f"top {args.top} modules by self import time:")
+    for self_us, cumulative_us, name in top_rows:
+        print(f"  {self_us / 1000:7.2f} ms self {cumulative_us / 1000:8.2f} ms cum  {name}")
+
+    main_module = load_plugin_module()
+    constructs, warm_ups = [], []
+    data_dir = FakeContext().get_plugin_data_dir()
+    for _ in range(args.repeat):
+        # 同一数据目录重复启动，第一次包含复制默认文本与建库
+        constructed, warmed = asyncio.run(construct_and_warm_up(main_module, data_dir))
+        constructs.append(constructed)
+        warm_ups.append(warmed)
+    print(f"construct: median {statistics.median(constructs) * 1000:.3f} ms "
+          f"(first {constructs[0] * 1000:.3f} ms)")
+    print(f"warm-up  : median {statistics.median(warm_ups) * 1000:.3f} ms "
+          f"(first {warm_ups[0] * 1000:.3f} ms, off the constructor path)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""游戏超时时间轮基准测试
+
+用法: python benchmarks/bench_timeout_wheel.py [--games 50000] [--shots 5]
+
+1. 虚拟时钟下测量登记、重新计时（模拟每次开枪）、取消与批量到期的耗时；
+2. 真实事件循环中让所有游戏在同一时刻附近超时，统计回调的触发延迟。
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeout_wheel import TimeoutWheel  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def per_op(seconds, count):
+    return f"{seconds * 1e9 / max(count, 1):8.1f} ns/op"
+
+
+async def _noop(_key):
+    return None
+
+
+async def bench_virtual(games, shots, timeout):
+    # 在事件循环内同步执行，后台推进任务在测量期间不会获得运行机会
+    clock = FakeClock()
+    wheel = TimeoutWheel(_noop, clock=clock)
+    rng = random.Random(1)
+
+    start = time.perf_counter()
+    for group_id in range(games):
+        wheel.schedule(group_id, timeout)
+    schedule_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(shots):
+        clock.now += 0.1
+        for group_id in range(games):
+            wheel.schedule(group_id, timeout)
+    reschedule_seconds = time.perf_counter() - start
+
+    cancelled = rng.sample(range(games), games // 10)
+    start = time.perf_counter()
+    for group_id in cancelled:
+        wheel.cancel(group_id)
+    cancel_seconds = time.perf_counter() - start
+
+    remaining = len(wheel)
+    clock.now += timeout + wheel.tick_seconds
+    start = time.perf_counter()
+    expired = wheel.advance()
+    expire_seconds = time.perf_counter() - start
+    assert len(expired) == remaining and not len(wheel)
+    wheel.stop()
+
+    print(f"[virtual] games={games}")
+    print(f"  schedule   {per_op(schedule_seconds, games)}")
+    print(f"  reschedule {per_op(reschedule_seconds, games * shots)}")
+    print(f"  cancel     {per_op(cancel_seconds, len(cancelled))}")
+    print(f"  expire     {per_op(expire_seconds, len(expired))}  ({len(expired)} in one batch, "
+          f"{expire_seconds * 1000:.1f} ms)")
+
+
+async def bench_realtime(games, timeout):
+    fired = []
+    deadlines = {}
+
+    async def on_timeout(group_id):
+        fired.append(time.monotonic() - deadlines[group_id])
+
+    wheel = TimeoutWheel(on_timeout)
+    base = time.monotonic()
+    for group_id in range(games):
+        deadlines[group_id] = base + timeout
+        wheel.schedule_at(group_id, base + timeout)
+
+    while len(fired) < games:
+        await asyncio.sleep(0.05)
+        if time.monotonic() - base > timeout + 10:
+            break
+    wheel.stop()
+
+    fired.sort()
+    print(f"[realtime] games={games} fired={len(fired)}")
+    if fired:
+        print(f"  lateness p50={fired[len(fired) // 2] * 1000:.1f} ms "
+              f"p99={fired[int(len(fired) * 0.99) - 1] * 1000:.1f} ms max={fired[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=50_000)
+    parser.add_argument('--shots', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--realtime-timeout', type=float, default=1.0)
+    args = parser.parse_args()
+
+    asyncio.run(bench_virtual(args.games, args.shots, args.timeout))
+    asyncio.run(bench_realtime(args.games, args.realtime_timeout))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""以字符串群号检查按群参数（含弹膛数）在重启与共享状态同步后仍然生效
+
+用法: python benchmarks/check_group_ids.py
+
+AstrBot 事件中的群号是字符串（如 "123"），而其他脚本的 FakeEvent 使用整数群号，
+容易掩盖“状态库读回的群号与事件中的群号类型不一致”一类问题。本脚本全程使用字符串群号：
+1. 内存后端：/rg群设置 超时 999、弹膛数 8 后重启插件，检查设置仍然生效，
+   装填 7 发（超过全局默认的 6 个弹膛）成功且提示为 8 弹膛、999 秒；
+2. SQLite 共享后端：设置后立即执行一轮共享状态同步，检查设置没有被当作已删除而丢弃；
+3. SQLite 共享后端：另一进程留下的过期租约被接管时，返回的群号与事件中的群号相同，
+   超时处理与指令使用同一把群锁（持有群锁期间接管的超时必须等待）。
+任一检查失败时以非零状态退出。
+"""
+import asyncio
+import sys
+import time
+
+from fakes import FakeBot, FakeContext, FakeEvent, drain, load_plugin_module
+
+GROUP_ID = "123"
+TIMEOUT_SECONDS = 999
+CHAMBER_COUNT = 8
+
+
+def make_plugin(main, context, backend):
+    config = {
+        'state_backend': backend,
+        'journal_enabled': False,
+        'flood_user_per_minute': 0,
+        'flood_group_per_minute': 0,
+    }
+    return main.RevolverGamePlugin(context, config)
+
+
+async def say(plugin, message):
+    event = FakeEvent(GROUP_ID, 1, message, FakeBot(), is_admin=True)
+    return await drain(plugin.on_all_messages(event))
+
+
+def effective_timeout(plugin):
+    return plugin.group_settings.get(plugin._get_group_id(FakeEvent(GROUP_ID, 1, '', FakeBot()))).timeout_seconds
+
+
+async def check_restart(main, errors):
+    context = FakeContext()
+    plugin = make_plugin(main, context, 'memory')
+    await plugin._ensure_ready()
+    await say(plugin, f'/rg群设置 超时 {TIMEOUT_SECONDS}')
+    await say(plugin, f'/rg群设置 弹膛数 {CHAMBER_COUNT}')
+    await plugin.terminate()
+
+    plugin = make_plugin(main, context, 'memory')
+    await plugin._ensure_ready()
+    timeout = effective_timeout(plugin)
+    replies = await say(plugin, f'/装填 {CHAMBER_COUNT - 1}')
+    await plugin.terminate()
+    print(f"restart : timeout={timeout} reply={replies[:1]}")
+    if timeout != TIMEOUT_SECONDS:
+        errors.append(f"override lost after restart: timeout={timeout}")
+    if not replies or f"{TIMEOUT_SECONDS} 秒" not in replies[0]:
+        errors.append("load reply does not use the overridden timeout")
+    if not replies or f"{CHAMBER_COUNT} 弹膛" not in replies[0]:
+        errors.append("load does not use the overridden chamber count")
+
+
+async def check_shared_sweep(main, errors):
+    plugin = make_plugin(main, FakeContext(), 'sqlite')
+    await plugin._ensure_ready()
+    await say(plugin, f'/rg群设置 超时 {TIMEOUT_SECONDS}')
+    await plugin._sweep_shared_state()
+    timeout = effective_timeout(plugin)
+    await plugin.terminate()
+    print(f"sweep   : timeout={timeout}")
+    if timeout != TIMEOUT_SECONDS:
+        errors.append(f"override dropped by the shared state sweep: timeout={timeout}")
+
+
+async def check_expired_lease(main, errors):
+    context = FakeContext()
+    owner = make_plugin(main, context, 'sqlite')
+    await owner._ensure_ready()
+    await say(owner, '/装填 1')
+    # 接管方与原持有者共用数据库，时钟拨快一小时使租约过期
+    taker_context = FakeContext(context.get_plugin_data_dir())
+    taker = make_plugin(main, taker_context, 'sqlite')
+    await taker._ensure_ready()
+    taker.state_backend._clock = lambda: time.time() + 3600
+    group_id = taker._get_group_id(FakeEvent(GROUP_ID, 1, '', FakeBot()))
+    leases = await taker.state_backend.expired_leases()
+    print(f"lease   : expired={leases!r} event group id={group_id!r}")
+    if leases != [group_id]:
+        errors.append(f"expired lease ids {leases!r} differ from the event group id {group_id!r}")
+    async with taker.group_serializer.hold(group_id):
+        sweep = asyncio.ensure_future(taker._sweep_shared_state())
+        await asyncio.sleep(0.2)
+        if sweep.done():
+            errors.append("lease takeover ran while a command held the group lock")
+    await sweep
+    await taker.outbox.drain(main.PRIORITY_TIMEOUT)
+    notices = [message for _session, message in taker_context.sent if "长时间未操作" in str(message)]
+    if len(notices) != 1:
+        errors.append(f"{len(notices)} timeout notices sent for the expired lease, expected 1")
+    await taker.terminate()
+    owner.timeout_wheel.stop()
+    await owner.terminate()
+
+
+async def main_async():
+    main = load_plugin_module()
+    errors = []
+    await check_restart(main, errors)
+    await check_shared_sweep(main, errors)
+    await check_expired_lease(main, errors)
+    if errors:
+        for error in errors:
+            print("  " + error)
+        print("FAIL")
+        return 1
+    print("OK: string group ids match across overrides, restarts, shared sweeps and lease takeovers")
+    return 0
+
+
+def main():
+    return asyncio.run(main_async())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""检查多个进程共用 journal/ 目录时日志文件互不覆盖、互不误删
+
+用法: python benchmarks/check_journal_workers.py
+
+SQLite 共享后端下多个 worker 使用同一个插件数据目录。本脚本：
+1. 两个 GameJournal（不同 worker，exclusive=False）交替写入同一目录，单文件很小以频繁轮转，
+   检查每个 worker 最多保留 max_files 个自己的文件、另一方正在写的文件没有被删除、
+   合并读取的事件按时间排序且数量等于各自最后保留的文件中的事件数之和；
+2. 列出目录后、打开文件前另一进程抢先创建了同名文件时，新文件换下一个序号而不是截断已有文件；
+3. exclusive=True（单进程）时，上一次运行留下的文件与本进程文件一起按 max_files 轮转。
+任一检查失败时以非零状态退出。
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+from fakes import load_plugin_module
+
+MAX_FILES = 3
+ROUNDS = 40
+
+
+async def check_shared_rotation(journal, directory, errors):
+    writers = [
+        journal.GameJournal(directory, max_file_bytes=256, max_files=MAX_FILES, worker=worker, exclusive=False)
+        for worker in ('a', 'b')
+    ]
+    for round_index in range(ROUNDS):
+        for writer in writers:
+            for _ in range(5):
+                writer.record(journal.EVENT_SHOT, '1', writer.worker, value=round_index)
+            await writer.flush()
+        for writer in writers:
+            active = writer._file.name
+            if not os.path.exists(active):
+                errors.append(f"round {round_index}: active file of worker {writer.worker} was deleted")
+    for writer in writers:
+        own = journal.journal_files(directory, writer.worker)
+        if len(own) > MAX_FILES:
+            errors.append(f"worker {writer.worker} kept {len(own)} files, expected at most {MAX_FILES}")
+    for writer in writers:
+        await writer.close()
+    expected = sum(
+        len(list(journal.read_journal(path)))
+        for writer in writers for path in journal.journal_files(directory, writer.worker)
+    )
+    events = list(journal.read_journal_dir(directory))
+    if len(events) != expected:
+        errors.append(f"merged read returned {len(events)} events, expected {expected}")
+    if any(earlier.timestamp > later.timestamp for earlier, later in zip(events, events[1:])):
+        errors.append("merged events are not ordered by timestamp")
+
+
+async def check_existing_file(journal, directory, errors):
+    path = os.path.join(directory, f'{journal.JOURNAL_PREFIX}c-000001{journal.JOURNAL_SUFFIX}')
+    with open(path, 'wb') as file:
+        file.write(journal.JOURNAL_MAGIC + journal.encode_event(1.0, journal.EVENT_LOAD, '1', 'x', 1))
+    writer = journal.GameJournal(directory, worker='c', exclusive=False)
+    # 模拟竞争：列目录时还看不到另一进程刚创建的文件
+    list_files = journal.journal_files
+    journal.journal_files = lambda directory, worker=None: []
+    try:
+        writer._open_next_file()
+    finally:
+        journal.journal_files = list_files
+    writer.record(journal.EVENT_LOAD, '1', 'c', 1)
+    await writer.close()
+    if [event.user_id for event in journal.read_journal(path)] != ['x']:
+        errors.append("an existing journal file with the same name was truncated")
+
+
+async def check_exclusive_rotation(journal, directory, errors):
+    for index in range(5):
+        path = os.path.join(directory, f'{journal.JOURNAL_PREFIX}old{index}-000001{journal.JOURNAL_SUFFIX}')
+        with open(path, 'wb') as file:
+            file.write(journal.JOURNAL_MAGIC)
+        os.utime(path, (index, index))
+    writer = journal.GameJournal(directory, max_files=MAX_FILES, worker='d')
+    writer.record(journal.EVENT_LOAD, '1', 'd', 1)
+    await writer.close()
+    remaining = journal.journal_files(directory)
+    if len(remaining) != MAX_FILES or journal.journal_files(directory, 'd') == []:
+        errors.append(f"exclusive rotation kept {[os.path.basename(path) for path in remaining]}")
+
+
+async def main_async():
+    journal = load_plugin_module('journal')
+    errors = []
+    with tempfile.TemporaryDirectory() as directory:
+        await check_shared_rotation(journal, directory, errors)
+    with tempfile.TemporaryDirectory() as directory:
+        await check_existing_file(journal, directory, errors)
+    with tempfile.TemporaryDirectory() as directory:
+        await check_exclusive_rotation(journal, directory, errors)
+    if errors:
+        for error in errors:
+            print("  " + error)
+        print("FAIL")
+        return 1
+    print("OK: workers sharing a journal directory keep their own files and rotation")
+    return 0
+
+
+def main():
+    return asyncio.run(main_async())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""离线运行插件所需的 AstrBot 替身对象
+
+插件本身仍需 AstrBot 已安装（提供 astrbot.api），这里只替换运行时
+由框架注入的上下文、消息事件与协议端客户端，不访问网络。
+"""
+import asyncio
+import importlib
+import importlib.util
+import itertools
+import os
+import sys
+import tempfile
+from typing import Any, List, Optional, Tuple
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_PACKAGE = 'astrbot_plugin_rg'
+
+_message_ids = itertools.count(1)
+
+
+def load_plugin_module(name: str = 'main'):
+    """以包的形式导入插件目录下的模块（默认 main.py，插件内部使用相对导入）"""
+    if PLUGIN_PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PLUGIN_PACKAGE,
+            os.path.join(PLUGIN_DIR, '__init__.py'),
+            submodule_search_locations=[PLUGIN_DIR],
+        )
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[PLUGIN_PACKAGE] = package
+    return importlib.import_module(f'{PLUGIN_PACKAGE}.{name}')
+
+
+class FakeResult:
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeMessageObject:
+    __slots__ = ('group_id', 'message_id')
+
+    def __init__(self, group_id, message_id):
+        self.group_id = group_id
+        self.message_id = message_id
+
+
+class FakeBot:
+    """协议端替身，set_group_ban 可模拟延迟与失败"""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, rng=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.bans: List[Tuple[int, int, int]] = []
+
+    async def set_group_ban(self, group_id: int, user_id: int, duration: int, self_id: int):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+        if self.failure_rate and self.rng is not None and self.rng.random() < self.failure_rate:
+            raise RuntimeError("simulated ban failure")
+        self.bans.append((group_id, user_id, duration))
+
+
+class FakeEvent:
+    """AstrMessageEvent 替身"""
+
+    def __init__(self, group_id: Optional[int], user_id: int, message: str, bot: FakeBot,
+                 nickname: Optional[str] = None, message_id: Any = None, platform: str = 'fake',
+                 is_admin: bool = False):
+        self.message_obj = FakeMessageObject(group_id, message_id if message_id is not None else next(_message_ids))
+        # 与框架的唤醒阶段一致：以默认唤醒前缀 / 开头的消息去掉前缀并带上唤醒标记
+        self.is_at_or_wake_command = message.startswith('/')
+        self.message_str = message[1:] if self.is_at_or_wake_command else message
+        self.bot = bot
+        self.user_id = user_id
+        self.nickname = nickname or f"user{user_id}"
+        self._is_admin = is_admin
+        if group_id:
+            self.unified_msg_origin = f"{platform}:GroupMessage:{group_id}"
+        else:
+            self.unified_msg_origin = f"{platform}:FriendMessage:{user_id}"
+
+    def plain_result(self, text: str) -> FakeResult:
+        return FakeResult(text)
+
+    def get_sender_name(self) -> str:
+        return self.nickname
+
+    def get_sender_id(self) -> str:
+        return str(self.user_id)
+
+    def get_group_id(self) -> str:
+        return str(self.message_obj.group_id or '')
+
+    def get_self_id(self) -> str:
+        return '10000'
+
+    def is_admin(self) -> bool:
+        return self._is_admin
+
+
+class FakeContext:
+    """Context 替身，插件数据目录默认放在临时目录"""
+
+    def __init__(self, data_dir: Optional[str] = None, send_latency: float = 0.0):
+        self._data_dir = data_dir or tempfile.mkdtemp(prefix='rg-bench-')
+        self.send_latency = send_latency
+        self.sent: List[Tuple[str, Any]] = []
+
+    def get_plugin_data_dir(self) -> str:
+        return self._data_dir
+
+    async def send_message(self, session: str, message: Any):
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        self.sent.append((session, message))
+        return True
+
+
+async def drain(results, yield_between: bool = True) -> List[str]:
+    """像框架一样逐条消费处理器产出的结果，期间让出事件循环"""
+    texts = []
+    async for result in results:
+        texts.append(getattr(result, 'text', result))
+        if yield_between:
+            await asyncio.sleep(0)
+    return texts
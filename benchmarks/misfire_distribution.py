@@ -0,0 +1,160 @@
+"""比较逐条随机抽样与几何倒计时两种走火判定的统计分布
+
+用法: python benchmarks/misfire_distribution.py [--probability 0.005] [--messages 4000000] [--groups 8]
+
+消息随机来自多个群，两种方式分别统计走火率以及每个群内相邻两次走火之间的消息间隔分布，
+间隔分布按等概率分箱后做双样本卡方检验；另外按插件中的写法测量单条消息的判定耗时。
+只有间隔分布存在显著差异时以非零状态退出；耗时受机器负载影响，仅作参考输出，不作为失败条件。
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from misfire import MisfireCountdown  # noqa: E402
+
+
+def bernoulli_gaps(probability, senders, groups, seed):
+    rng = random.Random(seed)
+    counts = [0] * groups
+    last = [0] * groups
+    gaps = []
+    for group_id in senders:
+        counts[group_id] += 1
+        if rng.random() <= probability:
+            gaps.append(counts[group_id] - last[group_id])
+            last[group_id] = counts[group_id]
+    return gaps
+
+
+def countdown_gaps(probability, senders, groups, seed):
+    """与插件 on_all_messages 中内联的判定相同"""
+    countdown = MisfireCountdown(probability, rng=random.Random(seed))
+    counts = [0] * groups
+    last = [0] * groups
+    gaps = []
+    for group_id in senders:
+        counts[group_id] += 1
+        countdown.remaining -= 1
+        if not countdown.remaining and countdown.fire(group_id):
+            gaps.append(counts[group_id] - last[group_id])
+            last[group_id] = counts[group_id]
+    return gaps
+
+
+class _Plugin:
+    """按插件中的写法访问属性：原实现读 self.misfire_probability，新实现读 self.misfire_countdown"""
+
+    def __init__(self, probability):
+        self.misfire_probability = probability
+        self.misfire_countdown = MisfireCountdown(probability)
+
+
+BERNOULLI_CHECK = "fired = random.random() <= self.misfire_probability"
+COUNTDOWN_CHECK = """\
+countdown = self.misfire_countdown
+countdown.remaining -= 1
+fired = not countdown.remaining and countdown.fire(group_id)
+"""
+
+
+def per_message_ns(statement, probability, number=2_000_000, repeat=5):
+    namespace = {'random': random, 'self': _Plugin(probability), 'group_id': '123456789'}
+    return min(timeit.repeat(statement, globals=namespace, number=number, repeat=repeat)) / number * 1e9
+
+
+def gap_bin_edges(probability, bins):
+    """按几何分布的理论分位数划分等概率分箱"""
+    log_miss = math.log1p(-probability)
+    edges = []
+    for k in range(1, bins):
+        edge = math.ceil(math.log(1 - k / bins) / log_miss)
+        if not edges or edge > edges[-1]:
+            edges.append(edge)
+    return edges
+
+
+def histogram(gaps, edges):
+    counts = [0] * (len(edges) + 1)
+    for gap in gaps:
+        low, high = 0, len(edges)
+        while low < high:
+            mid = (low + high) // 2
+            if gap <= edges[mid]:
+                high = mid
+            else:
+                low = mid + 1
+        counts[low] += 1
+    return counts
+
+
+def two_sample_chi_square(left, right):
+    total_left, total_right = sum(left), sum(right)
+    k1 = math.sqrt(total_right / total_left)
+    k2 = math.sqrt(total_left / total_right)
+    statistic = 0.0
+    dof = -1
+    for a, b in zip(left, right):
+        if a + b == 0:
+            continue
+        statistic += (k1 * a - k2 * b) ** 2 / (a + b)
+        dof += 1
+    return statistic, dof
+
+
+def chi_square_critical(dof, z=3.09):
+    """Wilson-Hilferty 近似的卡方上分位数，z=3.09 约对应 0.1% 显著性"""
+    term = 2.0 / (9.0 * dof)
+    return dof * (1 - term + z * math.sqrt(term)) ** 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--probability', type=float, default=0.005)
+    parser.add_argument('--messages', type=int, default=4_000_000)
+    parser.add_argument('--groups', type=int, default=8)
+    parser.add_argument('--bins', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=20240501)
+    args = parser.parse_args()
+
+    sender_rng = random.Random(args.seed + 2)
+    senders = [sender_rng.randrange(args.groups) for _ in range(args.messages)]
+
+    start = time.perf_counter()
+    reference = bernoulli_gaps(args.probability, senders, args.groups, args.seed)
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate = countdown_gaps(args.probability, senders, args.groups, args.seed + 1)
+    candidate_seconds = time.perf_counter() - start
+
+    reference_ns = per_message_ns(BERNOULLI_CHECK, args.probability)
+    candidate_ns = per_message_ns(COUNTDOWN_CHECK, args.probability)
+
+    edges = gap_bin_edges(args.probability, args.bins)
+    statistic, dof = two_sample_chi_square(histogram(reference, edges), histogram(candidate, edges))
+    critical = chi_square_critical(dof)
+
+    print(f"probability={args.probability} messages={args.messages} groups={args.groups}")
+    print(f"bernoulli : misfires={len(reference)} rate={len(reference) / args.messages:.6f} "
+          f"elapsed={reference_seconds:.3f}s per-message check={reference_ns:.1f}ns")
+    print(f"countdown : misfires={len(candidate)} rate={len(candidate) / args.messages:.6f} "
+          f"elapsed={candidate_seconds:.3f}s per-message check={candidate_ns:.1f}ns")
+    print(f"gap chi-square={statistic:.2f} dof={dof} critical(0.1%)={critical:.2f}")
+
+    print(f"per-message check: countdown/bernoulli={candidate_ns / reference_ns:.2f}x（仅供参考）")
+
+    if statistic > critical:
+        print("FAIL: 两种走火判定的间隔分布存在显著差异")
+        return 1
+    print("OK: 两种走火判定的间隔分布一致")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
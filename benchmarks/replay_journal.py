@@ -0,0 +1,166 @@
+"""游戏事件日志回放
+
+用法:
+  python benchmarks/replay_journal.py <日志文件或 journal 目录> [--speed 60] [--seed 1] [--output replay.json]
+  python benchmarks/replay_journal.py <日志文件或 journal 目录> --dump [--limit 50]
+
+按原始时间间隔（除以 --speed 加速，0 表示不等待）把日志中的装填、开枪、走火开关与走火事件
+以替身事件重新送入 RevolverGamePlugin；超时由插件自身的时间轮按同样的加速比例产生
+（timeout_seconds 最短 1 秒，不等待时不产生超时）。
+回放结束后对比原始日志与回放的事件计数，并输出各处理器的延迟分位数。
+禁言结果与超时是原始运行的结果，不会被回放；随机数不同，命中情况通常与原始日志不完全一致。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from fakes import FakeBot, FakeContext, FakeEvent, drain, load_plugin_module
+
+EMPTY_GUN_MARK = '请先装填'
+
+
+def load_events(journal, path):
+    if os.path.isdir(path):
+        return list(journal.read_journal_dir(path))
+    return list(journal.read_journal(path))
+
+
+def count_events(journal, events):
+    counts = Counter(event.name for event in events)
+    shots = [event for event in events if event.kind == journal.EVENT_SHOT]
+    counts['shot'] = sum(1 for event in shots if event.flag != journal.SHOT_EMPTY_GUN)
+    counts['empty_gun'] = sum(1 for event in shots if event.flag == journal.SHOT_EMPTY_GUN)
+    counts['hit'] = sum(1 for event in shots if event.flag == journal.SHOT_HIT)
+    return counts
+
+
+def dump(journal, events, limit):
+    for event in events[:limit]:
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.timestamp))
+        print(f"{stamp}.{int(event.timestamp * 1000) % 1000:03d} {event.name:14s} group={event.group_id} "
+              f"user={event.user_id} value={event.value} flag={event.flag} {event.text}")
+    print(f"{len(events)} events")
+
+
+async def replay(args, journal, events):
+    main = load_plugin_module()
+    original_span = events[-1].timestamp - events[0].timestamp if events else 0.0
+    timeout = args.timeout
+    if args.speed > 0:
+        timeout = max(1, round(timeout / args.speed))
+    else:
+        timeout = max(1, round(timeout))
+    config = {
+        'timeout_seconds': timeout,
+        'misfire_probability': 1.0,
+        'journal_enabled': False,
+        'chamber_count': args.chambers,
+    }
+    random.seed(args.seed)
+    context = FakeContext()
+    plugin = main.RevolverGamePlugin(context, config)
+    await plugin._ensure_ready()
+    bot = FakeBot()
+    start = time.perf_counter()
+    first = events[0].timestamp if events else 0.0
+    fed = 0
+    empty_gun = 0
+    for event in events:
+        if args.speed > 0:
+            delay = (event.timestamp - first) / args.speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        user_id = event.user_id if event.user_id is not None else 0
+        nickname = event.text or None
+        if event.kind == journal.EVENT_LOAD:
+            handler = plugin.command_load(
+                FakeEvent(event.group_id, user_id, f'/装填 {event.value}', bot, nickname), str(event.value)
+            )
+        elif event.kind == journal.EVENT_SHOT:
+            handler = plugin.command_shoot(FakeEvent(event.group_id, user_id, '/开枪', bot, nickname))
+        elif event.kind == journal.EVENT_MISFIRE_SWITCH:
+            message = '/走火开' if event.flag else '/走火关'
+            fake = FakeEvent(event.group_id, user_id, message, bot, nickname)
+            handler = plugin.command_misfire_on(fake) if event.flag else plugin.command_misfire_off(fake)
+        elif event.kind == journal.EVENT_MISFIRE:
+            # 走火概率设为 1，开关打开时这条普通消息必定走火
+            plugin.group_switches.set(event.group_id, True)
+            handler = plugin.on_all_messages(FakeEvent(event.group_id, user_id, '回放消息', bot, nickname))
+        else:
+            continue
+        texts = await drain(handler)
+        empty_gun += any(EMPTY_GUN_MARK in text for text in texts)
+        fed += 1
+    # 加速回放时等待剩余的游戏超时结束
+    while args.speed > 0 and len(plugin.timeout_wheel):
+        await asyncio.sleep(plugin.timeout_wheel.tick_seconds)
+    await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await plugin.terminate()
+
+    metrics = plugin.metrics
+    replayed = {
+        'load': metrics.loads,
+        'shot': metrics.shots,
+        'empty_gun': empty_gun,
+        'hit': metrics.hits,
+        'misfire': metrics.misfires,
+        'timeout': metrics.timeouts,
+        'ban_request': len(bot.bans),
+    }
+    latency = {}
+    for name, histogram in zip(load_plugin_module('metrics').HANDLER_NAMES, metrics.handler_latency):
+        if histogram.count:
+            latency[name] = {'count': histogram.count, 'p50': histogram.quantile(0.5), 'p99': histogram.quantile(0.99)}
+    return {
+        'events': len(events),
+        'fed': fed,
+        'original_span_seconds': round(original_span, 3),
+        'replay_seconds': round(elapsed, 3),
+        'speed': args.speed,
+        'events_per_second': round(fed / elapsed, 1) if elapsed else None,
+        'original_counts': dict(count_events(journal, events)),
+        'replayed_counts': replayed,
+        'handler_latency': latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=60.0, help="加速倍数，0 表示不等待")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--chambers', type=int, default=6)
+    parser.add_argument('--timeout', type=float, default=60, help="原始运行的 timeout_seconds，回放时同样按 --speed 缩短")
+    parser.add_argument('--output')
+    parser.add_argument('--dump', action='store_true', help="只打印日志内容")
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    load_plugin_module()
+    journal = load_plugin_module('journal')
+    events = load_events(journal, args.path)
+    if args.dump:
+        dump(journal, events, args.limit)
+        return 0
+    result = asyncio.run(replay(args, journal, events))
+    print(f"replayed {result['fed']}/{result['events']} events in {result['replay_seconds']}s "
+          f"(original span {result['original_span_seconds']}s, {result['events_per_second']} events/s)")
+    original = result['original_counts']
+    for name, count in result['replayed_counts'].items():
+        print(f"  {name:12s} original={original.get(name, 0):<8d} replay={count}")
+    for name, stats in result['handler_latency'].items():
+        print(f"  {name:18s} n={stats['count']:<6d} p50<={stats['p50']} p99<={stats['p99']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
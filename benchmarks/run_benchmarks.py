@@ -0,0 +1,211 @@
+"""插件离线基准测试
+
+用法:
+    python benchmarks/run_benchmarks.py [--groups 1000] [--messages 200000] [--rate 0]
+                                        [--output bench_results.json] [--compare old.json]
+
+不依赖网络或真实机器人：上下文、消息事件与协议端均使用 benchmarks/fakes.py 中的替身。
+依次驱动 on_all_messages、command_load、command_shoot、timeout_callback，
+输出每个场景的吞吐（msgs/sec）、处理器延迟 p50/p99 与进程 RSS，并写入 JSON 便于版本间对比。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+
+from fakes import PLUGIN_DIR, FakeBot, FakeContext, FakeEvent, load_plugin_module
+
+CHAT_MESSAGES = [
+    '今天吃什么',
+    '哈哈哈哈哈哈',
+    '有人打游戏吗？' * 3,
+    '这是一条比较长的普通聊天消息，用来模拟群里大部分非指令流量。' * 4,
+]
+
+
+def rss_bytes() -> int:
+    """当前常驻内存，读取失败时退回峰值 RSS"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def plugin_version() -> str:
+    try:
+        with open(os.path.join(PLUGIN_DIR, 'metadata.yaml'), encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('version:'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return 'unknown'
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Pacer:
+    """按目标速率发送，rate<=0 时不限速"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.start = time.perf_counter()
+        self.sent = 0
+
+    async def wait(self):
+        self.sent += 1
+        if not self.interval:
+            # 不限速时也定期让出事件循环，让禁言等后台任务得以运行
+            if not self.sent % 256:
+                await asyncio.sleep(0)
+            return
+        ahead = self.start + self.sent * self.interval - time.perf_counter()
+        if ahead > 0.001:
+            await asyncio.sleep(ahead)
+
+
+async def timed_calls(name, calls, rate):
+    """依次执行 calls 中的 (处理器工厂) 并统计延迟"""
+    latencies = []
+    pacer = Pacer(rate)
+    rss_before = rss_bytes()
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for make_handler in calls:
+        began = perf_counter()
+        async for _ in make_handler():
+            pass
+        latencies.append(perf_counter() - began)
+        await pacer.wait()
+    elapsed = perf_counter() - start
+    latencies.sort()
+    count = len(latencies)
+    result = {
+        'count': count,
+        'elapsed_s': round(elapsed, 6),
+        'msgs_per_sec': round(count / elapsed, 1) if elapsed else 0.0,
+        'p50_us': round(percentile(latencies, 0.50) * 1e6, 2),
+        'p99_us': round(percentile(latencies, 0.99) * 1e6, 2),
+        'max_us': round(latencies[-1] * 1e6, 2) if latencies else 0.0,
+        'rss_mb': round(rss_bytes() / 1024 / 1024, 2),
+        'rss_delta_mb': round((rss_bytes() - rss_before) / 1024 / 1024, 2),
+    }
+    print(f"{name:<18} n={count:<8} {result['msgs_per_sec']:>10.0f} msg/s  "
+          f"p50={result['p50_us']:>8.1f}us  p99={result['p99_us']:>8.1f}us  rss={result['rss_mb']:.1f}MB")
+    return result
+
+
+async def run(args):
+    main = load_plugin_module()
+    rng = random.Random(args.seed)
+    context = FakeContext()
+    plugin = main.RevolverGamePlugin(context, {
+        'misfire_probability': args.misfire_probability,
+        'misfire_enabled_by_default': True,
+    })
+    bot = FakeBot()
+    groups = list(range(1, args.groups + 1))
+    results = {}
+
+    def chat_call():
+        event = FakeEvent(rng.choice(groups), rng.randint(1, 5000), rng.choice(CHAT_MESSAGES), bot)
+        return lambda: plugin.on_all_messages(event)
+
+    results['on_all_messages'] = await timed_calls(
+        'on_all_messages', (chat_call() for _ in range(args.messages)), args.rate)
+
+    def load_call(group_id):
+        event = FakeEvent(group_id, rng.randint(1, 5000), '/装填 3', bot)
+        return lambda: plugin.command_load(event, '3')
+
+    results['command_load'] = await timed_calls(
+        'command_load', (load_call(group_id) for group_id in groups), args.rate)
+
+    def shoot_call():
+        event = FakeEvent(rng.choice(groups), rng.randint(1, 5000), '/开枪', bot)
+        return lambda: plugin.command_shoot(event)
+
+    shots = max(args.messages // 10, len(groups))
+    results['command_shoot'] = await timed_calls(
+        'command_shoot', (shoot_call() for _ in range(shots)), args.rate)
+
+    # 重新装填所有群后直接驱动超时回调，替代真实等待
+    for group_id in groups:
+        async for _ in plugin.command_load(FakeEvent(group_id, 1, '/装填 1', bot), '1'):
+            pass
+
+    async def timeout_gen(group_id):
+        plugin.timeout_wheel.cancel(group_id)
+        await plugin.timeout_callback(group_id)
+        return
+        yield  # pragma: no cover - 让函数成为异步生成器
+
+    results['timeout_callback'] = await timed_calls(
+        'timeout_callback', ((lambda g=group_id: timeout_gen(g)) for group_id in groups), args.rate)
+
+    await plugin.terminate()
+    return results
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = json.load(file)
+    print(f"\ncompared with {baseline_path} (version {baseline.get('plugin_version')}):")
+    for name, result in current['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if not old:
+            continue
+        for metric in ('msgs_per_sec', 'p50_us', 'p99_us'):
+            if old.get(metric):
+                change = (result[metric] - old[metric]) / old[metric] * 100
+                print(f"  {name:<18} {metric:<13} {old[metric]:>10} -> {result[metric]:>10}  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=1000)
+    parser.add_argument('--messages', type=int, default=200_000, help='on_all_messages 场景的消息数')
+    parser.add_argument('--rate', type=float, default=0.0, help='目标消息速率（条/秒），0 表示不限速')
+    parser.add_argument('--misfire-probability', type=float, default=0.005)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='与之前保存的结果 JSON 对比')
+    args = parser.parse_args()
+
+    scenarios = asyncio.run(run(args))
+    report = {
+        'plugin_version': plugin_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'config': {
+            'groups': args.groups,
+            'messages': args.messages,
+            'rate': args.rate,
+            'misfire_probability': args.misfire_probability,
+            'seed': args.seed,
+        },
+        'scenarios': scenarios,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"\nresults written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""游戏平衡离线模拟
+
+用法:
+  python benchmarks/simulate_balance.py [--misfire-probability 0.005] [--min-ban 60] [--max-ban 300]
+      [--chambers 6] [--bullets 1] [--messages 1000000] [--games-per-1000 5] [--abandon 0.1]
+  python benchmarks/simulate_balance.py --sweep misfire_probability=0.001,0.005,0.01 --sweep bullets=1,2,3
+  python benchmarks/simulate_balance.py --check
+
+输出每 1000 条消息的期望禁言次数、禁言时长分布与对局长度分布；--sweep 按参数网格批量模拟，
+--check 在小规模随机运行上比较 NumPy 向量化结果与插件标量代码的结果。需要安装 NumPy，不依赖 AstrBot。
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+
+from fakes import load_plugin_module
+
+CONFIG_FIELDS = ('misfire_probability', 'min_ban_seconds', 'max_ban_seconds', 'chamber_count', 'bullets')
+PROFILE_FIELDS = ('messages', 'games_per_1000_messages', 'abandon_probability')
+
+
+def parse_sweep(values):
+    grid = []
+    for item in values:
+        name, _, raw = item.partition('=')
+        if name not in CONFIG_FIELDS + PROFILE_FIELDS or not raw:
+            raise SystemExit(f"invalid --sweep {item!r}, expected one of {CONFIG_FIELDS + PROFILE_FIELDS}")
+        kind = float if name in ('misfire_probability', 'games_per_1000_messages', 'abandon_probability') else int
+        grid.append((name, [kind(value) for value in raw.split(',')]))
+    return grid
+
+
+def split_parameters(simulator, parameters):
+    config = simulator.BalanceConfig(**{key: parameters[key] for key in CONFIG_FIELDS})
+    profile = simulator.TrafficProfile(**{key: parameters[key] for key in PROFILE_FIELDS})
+    return config, profile
+
+
+def print_summary(summary):
+    print(f"  bans/1000 msgs : {summary['bans_per_1000_messages']:.3f} "
+          f"(misfire {summary['misfire_bans_per_1000_messages']:.3f}, game {summary['game_bans_per_1000_messages']:.3f})")
+    print(f"  ban seconds    : mean {summary['ban_seconds_mean']} p50 {summary['ban_seconds_p50']} "
+          f"p90 {summary['ban_seconds_p90']} p99 {summary['ban_seconds_p99']}, "
+          f"{summary['ban_seconds_per_1000_messages']} s per 1000 msgs")
+    histogram = summary['game_length_histogram']
+    games = sum(histogram) or 1
+    shares = ' '.join(f"{length}:{count / games:.3f}" for length, count in enumerate(histogram) if count)
+    print(f"  game length    : mean {summary['game_length_mean']} shots, timed out {summary['timed_out_share']:.3f}")
+    print(f"  length shares  : {shares}")
+
+
+def run_check(simulator, args):
+    config = simulator.BalanceConfig(misfire_probability=0.01, chamber_count=6, bullets=0)
+    profile = simulator.TrafficProfile(messages=200_000, games_per_1000_messages=100.0, abandon_probability=0.15)
+    failures = 0
+    for seed in range(args.check_seeds):
+        vectorized = simulator.simulate(config, profile, seed=seed)
+        scalar = simulator.simulate_scalar(config, profile, seed=seed)
+        print(f"seed {seed}: {vectorized.games} games, {vectorized.messages} messages")
+        for name, left, right, ok in simulator.compare_results(vectorized, scalar):
+            failures += not ok
+            print(f"  {'ok  ' if ok else 'FAIL'} {name:34s} numpy={left:<10.4f} scalar={right:.4f}")
+    if failures:
+        print(f"FAIL: {failures} statistics disagree")
+        return 1
+    print("OK: vectorized simulator agrees with the scalar game code")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--misfire-probability', dest='misfire_probability', type=float, default=0.005)
+    parser.add_argument('--min-ban', dest='min_ban_seconds', type=int, default=60)
+    parser.add_argument('--max-ban', dest='max_ban_seconds', type=int, default=300)
+    parser.add_argument('--chambers', dest='chamber_count', type=int, default=6)
+    parser.add_argument('--bullets', type=int, default=1, help="每局装填数，0 表示随机")
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--games-per-1000', dest='games_per_1000_messages', type=float, default=5.0)
+    parser.add_argument('--abandon', dest='abandon_probability', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--sweep', action='append', default=[], metavar='NAME=V1,V2,...')
+    parser.add_argument('--output', help="把结果写入 JSON 文件")
+    parser.add_argument('--check', action='store_true', help="与标量实现比较")
+    parser.add_argument('--check-seeds', type=int, default=3)
+    args = parser.parse_args()
+
+    simulator = load_plugin_module('simulator')
+    if args.check:
+        return run_check(simulator, args)
+
+    base = {key: getattr(args, key) for key in CONFIG_FIELDS + PROFILE_FIELDS}
+    grid = parse_sweep(args.sweep)
+    names = [name for name, _ in grid]
+    results = []
+    start = time.perf_counter()
+    for values in itertools.product(*(values for _, values in grid)):
+        parameters = dict(base, **dict(zip(names, values)))
+        config, profile = split_parameters(simulator, parameters)
+        summary = simulator.simulate(config, profile, seed=args.seed).summary()
+        results.append({'parameters': parameters, 'summary': summary})
+        label = ', '.join(f"{name}={value}" for name, value in zip(names, values)) or 'base config'
+        print(label)
+        print_summary(summary)
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} simulations in {elapsed:.2f}s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""同群并发开枪压力测试
+
+用法: python benchmarks/stress_group_serializer.py [--groups 20] [--shots 2000] [--rounds 3]
+
+每轮为每个群装满实弹，然后在同一时刻并发发出大量 /开枪，
+检查弹膛不变量：每轮命中次数等于装填数、“游戏结束”恰好出现一次、
+处理过程中没有异常。
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from fakes import FakeBot, FakeContext, FakeEvent, drain, load_plugin_module
+
+GAME_OVER_MARK = '游戏结束'
+EMPTY_GUN_MARK = '请先装填'
+
+
+async def run_round(plugin, bot, group_id, shots, bullets, chamber_count):
+    texts = await drain(plugin.command_load(FakeEvent(group_id, 1, f'/装填 {bullets}', bot), str(bullets)))
+    if not texts or '装填了' not in texts[0]:
+        return [f"group {group_id}: load failed: {texts}"]
+
+    bans_before = sum(1 for ban in bot.bans if ban[0] == group_id)
+    outputs = await asyncio.gather(*(
+        drain(plugin.command_shoot(FakeEvent(group_id, 100 + index, '/开枪', bot)))
+        for index in range(shots)
+    ), return_exceptions=True)
+
+    errors = [f"group {group_id}: {output!r}" for output in outputs if isinstance(output, BaseException)]
+    replies = [output for output in outputs if not isinstance(output, BaseException)]
+    fired = sum(1 for texts in replies if texts and EMPTY_GUN_MARK not in texts[0])
+    game_overs = sum(1 for texts in replies for text in texts if GAME_OVER_MARK in text)
+
+    # 装满时每一枪都是实弹
+    expected_fired = bullets if bullets == chamber_count else None
+    if game_overs != 1:
+        errors.append(f"group {group_id}: game over announced {game_overs} times")
+    if expected_fired is not None and fired != expected_fired:
+        errors.append(f"group {group_id}: {fired} shots fired, expected {expected_fired}")
+    if group_id in plugin.group_states:
+        errors.append(f"group {group_id}: state left behind after the last bullet")
+
+    await asyncio.sleep(0)
+    await plugin.ban_dispatcher.close()
+    bans = sum(1 for ban in bot.bans if ban[0] == group_id) - bans_before
+    if bans > bullets:
+        errors.append(f"group {group_id}: {bans} bans for {bullets} bullets")
+    return errors
+
+
+async def main_async(args):
+    main = load_plugin_module()
+    plugin = main.RevolverGamePlugin(FakeContext(), {'chamber_count': args.chambers})
+    bot = FakeBot()
+    errors = []
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        results = await asyncio.gather(*(
+            run_round(plugin, bot, group_id, args.shots, args.chambers, args.chambers)
+            for group_id in range(1, args.groups + 1)
+        ))
+        for group_errors in results:
+            errors.extend(group_errors)
+    elapsed = time.perf_counter() - start
+    await plugin.terminate()
+
+    total = args.groups * args.shots * args.rounds
+    print(f"groups={args.groups} shots/group/round={args.shots} rounds={args.rounds} "
+          f"total_shots={total} elapsed={elapsed:.2f}s ({total / elapsed:.0f} shots/s)")
+    print(f"idle serializer slots after run: {len(plugin.group_serializer)}")
+    if errors or len(plugin.group_serializer):
+        for error in errors[:20]:
+            print("  " + error)
+        print(f"FAIL: {len(errors)} invariant violations")
+        return 1
+    print("OK: chamber invariants held")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--shots', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--chambers', type=int, default=6)
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""重启后主动消息积压的限速压力测试
+
+用法: python benchmarks/stress_outbound_backlog.py [--groups 100] [--platforms 2] [--platform-per-minute 1200]
+                                                  [--group-per-minute 60] [--error-max-age 3]
+
+模拟重启后的集中发送：各平台的每个群同时装填并开一枪，机器人缺少禁言能力，
+每个群立即产生一条错误提示；约 1 秒后所有游戏同时超时，再产生一条超时提示。
+分别在关闭限速（等同于直接调用 context.send_message）与开启限速时运行，检查开启时：
+每个平台、每个群的发送时间序列都不超过对应令牌桶的速率与突发上限；
+所有超时提示都送达；同一平台上超时提示开始发送后，错误提示要等超时提示发完才继续；
+排队过久的错误提示被丢弃。并输出每个平台任意 1 秒内的最大发送数与队列深度峰值。
+最后以默认限速运行一次“超时提示积压时关闭插件”：所有游戏超时后立即调用 terminate，
+检查关闭过程没有丢弃任何超时提示（全部送达、队列为空）。
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import defaultdict
+
+from fakes import FakeBot, FakeContext, FakeEvent, drain, load_plugin_module
+
+TIMEOUT_TEXT = "长时间未操作"
+ERROR_TEXT = "缺少禁言能力"
+
+
+class NoBanBot:
+    """没有 set_group_ban 的协议端，击中时插件只能发出错误提示"""
+
+
+class RecordingContext(FakeContext):
+    def __init__(self):
+        super().__init__()
+        self.sent_at = []
+
+    async def send_message(self, session, message):
+        self.sent_at.append((time.monotonic(), session, message))
+        return True
+
+
+def bucket_violations(times, per_minute, burst):
+    """按令牌桶回放发送时间，返回超出额度的发送次数（允许 1% 的计时误差）"""
+    rate = per_minute / 60.0
+    tokens = float(burst)
+    last = None
+    violations = 0
+    for moment in times:
+        if last is not None:
+            tokens = min(float(burst), tokens + (moment - last) * rate)
+        last = moment
+        if tokens < 0.99:
+            violations += 1
+        tokens -= 1.0
+    return violations
+
+
+def peak_per_second(times):
+    peak = 0
+    start = 0
+    for end in range(len(times)):
+        while times[end] - times[start] >= 1.0:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+async def run(args, limited):
+    main = load_plugin_module()
+    outbox_module = load_plugin_module('outbox')
+    config = {
+        'chamber_count': 6,
+        'timeout_seconds': 1,
+        'flood_user_per_minute': 0,
+        'flood_group_per_minute': 0,
+        'journal_enabled': False,
+        'outbound_platform_per_minute': args.platform_per_minute if limited else 0,
+        'outbound_group_per_minute': args.group_per_minute if limited else 0,
+    }
+    context = RecordingContext()
+    plugin = main.RevolverGamePlugin(context, config)
+    await plugin._ensure_ready()
+    max_ages = list(outbox_module.DEFAULT_MAX_AGES)
+    max_ages[outbox_module.PRIORITY_ERROR] = args.error_max_age
+    plugin.outbox.max_ages = tuple(max_ages)
+    bot = NoBanBot()
+    # 群号在各平台间不重复，游戏状态按群号保存
+    groups = [
+        (f'p{platform}', platform * args.groups + index)
+        for platform in range(args.platforms) for index in range(1, args.groups + 1)
+    ]
+    start = time.monotonic()
+    for command in ('/装填 6', '/开枪'):
+        await asyncio.gather(*(
+            drain(plugin.on_all_messages(FakeEvent(group_id, 1, command, bot, platform=platform)))
+            for platform, group_id in groups
+        ))
+    peak_depth = 0
+    # 等待全部超时触发、队列排空
+    while plugin.group_states or plugin.outbox.queue_depth:
+        peak_depth = max(peak_depth, plugin.outbox.queue_depth)
+        await asyncio.sleep(0.02)
+        if time.monotonic() - start > args.deadline:
+            break
+    stats = plugin.outbox.stats()
+    await plugin.terminate()
+    return context.sent_at, stats, peak_depth, time.monotonic() - start
+
+
+async def run_shutdown(args):
+    """默认限速下超时提示大量积压时关闭插件，返回送达的超时提示数与关闭后仍在队列中的消息数"""
+    main = load_plugin_module()
+    config = {
+        'chamber_count': 6,
+        'timeout_seconds': 1,
+        'flood_user_per_minute': 0,
+        'flood_group_per_minute': 0,
+        'journal_enabled': False,
+    }
+    context = RecordingContext()
+    plugin = main.RevolverGamePlugin(context, config)
+    await plugin._ensure_ready()
+    bot = FakeBot()
+    groups = [
+        (f'p{platform}', platform * args.groups + index)
+        for platform in range(args.platforms) for index in range(1, args.groups + 1)
+    ]
+    await asyncio.gather(*(
+        drain(plugin.on_all_messages(FakeEvent(group_id, 1, '/装填 1', bot, platform=platform)))
+        for platform, group_id in groups
+    ))
+    start = time.monotonic()
+    while plugin.group_states and time.monotonic() - start < args.deadline:
+        await asyncio.sleep(0.02)
+    queued = plugin.outbox.queue_depth
+    started = time.monotonic()
+    await plugin.terminate()
+    elapsed = time.monotonic() - started
+    timeouts = sum(1 for _moment, _session, message in context.sent_at if TIMEOUT_TEXT in message)
+    return timeouts, queued, plugin.outbox.queue_depth, elapsed
+
+
+def check(args, sent, stats):
+    outbox_module = load_plugin_module('outbox')
+    errors = []
+    by_platform = defaultdict(list)
+    by_session = defaultdict(list)
+    for moment, session, message in sent:
+        by_platform[session.split(':', 1)[0]].append((moment, message))
+        by_session[session].append(moment)
+    timeouts = sum(1 for _moment, _session, message in sent if TIMEOUT_TEXT in message)
+    if timeouts != args.platforms * args.groups:
+        errors.append(f"{timeouts} timeout notices delivered, expected {args.platforms * args.groups}")
+    for platform, entries in by_platform.items():
+        violations = bucket_violations([moment for moment, _message in entries], args.platform_per_minute,
+                                      outbox_module.DEFAULT_PLATFORM_BURST)
+        if violations:
+            errors.append(f"platform {platform}: {violations} sends over the token bucket")
+        kinds = [TIMEOUT_TEXT in message for _moment, message in entries]
+        if True in kinds:
+            first = kinds.index(True)
+            last = len(kinds) - 1 - kinds[::-1].index(True)
+            interleaved = kinds[first:last + 1].count(False)
+            if interleaved:
+                errors.append(f"platform {platform}: {interleaved} error notices sent between timeout notices")
+    for session, moments in by_session.items():
+        violations = bucket_violations(moments, args.group_per_minute, outbox_module.DEFAULT_SESSION_BURST)
+        if violations:
+            errors.append(f"{session}: {violations} sends over the token bucket")
+    if not stats['dropped_stale']:
+        errors.append("no stale error notices were dropped")
+    return errors
+
+
+async def main_async(args):
+    for limited in (False, True):
+        sent, stats, peak_depth, elapsed = await run(args, limited)
+        by_platform = defaultdict(list)
+        for moment, session, _message in sent:
+            by_platform[session.split(':', 1)[0]].append(moment)
+        peaks = ", ".join(f"{platform}={peak_per_second(sorted(times))}" for platform, times in sorted(by_platform.items()))
+        label = 'limited' if limited else 'direct'
+        print(f"{label:8s}: sent={len(sent)} dropped_stale={stats['dropped_stale']} throttled={stats['throttled']} "
+              f"peak_depth={peak_depth} wait_max={stats['wait_max']:.2f}s elapsed={elapsed:.2f}s "
+              f"peak sends/s per platform: {peaks}")
+    errors = check(args, sent, stats)
+    timeouts, queued, dropped, elapsed = await run_shutdown(args)
+    print(f"shutdown: queued={queued} timeouts delivered={timeouts} dropped={dropped} terminate={elapsed:.2f}s")
+    if dropped:
+        errors.append(f"shutdown dropped {dropped} queued messages")
+    if timeouts != args.platforms * args.groups:
+        errors.append(f"shutdown delivered {timeouts} timeout notices, expected {args.platforms * args.groups}")
+    if errors:
+        for error in errors:
+            print("  " + error)
+        print("FAIL")
+        return 1
+    print("OK: sends stayed within the platform and group token buckets, timeouts went ahead of errors, "
+          "shutdown dropped nothing")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--platforms', type=int, default=2)
+    parser.add_argument('--platform-per-minute', type=float, default=1200)
+    parser.add_argument('--group-per-minute', type=float, default=60)
+    parser.add_argument('--error-max-age', type=float, default=3.0)
+    parser.add_argument('--deadline', type=float, default=60.0)
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""消息重投风暴压力测试
+
+用法: python benchmarks/stress_redelivery.py [--groups 50] [--rounds 4] [--storm-probability 0.05]
+                                            [--storm-size 20] [--storm-repeats 3] [--concurrency 16]
+                                            [--chat-flood 50000]
+
+每个群循环“装满实弹后逐枪射空”，每一枪由不同玩家发出，每条消息带唯一的平台消息 id；
+投递过程中随机触发重投风暴：把最近投递过的一批消息原样再投递若干次，并与正常消息并发交错。
+分别在开启与关闭去重（dedup_ttl_seconds=0）时经 on_all_messages 投递同一条消息流，检查：
+开启去重时击发次数与禁言次数恰好等于原始消息对应的次数、重投的指令全部被识别
+（普通聊天消息没有副作用，不进入去重缓存）；另外在一条指令之后投递超过缓存容量的普通消息，
+检查之后重投该指令仍被识别。并输出去重缓存命中率与单次检查耗时。
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from fakes import FakeBot, FakeContext, FakeEvent, drain, load_plugin_module
+
+
+def build_stream(args, rng):
+    """生成 (group_id, user_id, message, message_id) 的原始消息流，各群的消息交错排列"""
+    per_group = []
+    message_id = 0
+    for group_id in range(1, args.groups + 1):
+        messages = []
+        for round_index in range(args.rounds):
+            message_id += 1
+            messages.append((group_id, 1, f'/装填 {args.chambers}', message_id))
+            for shot in range(args.chambers):
+                message_id += 1
+                user_id = 1000 + round_index * args.chambers + shot
+                messages.append((group_id, user_id, '/开枪', message_id))
+                message_id += 1
+                messages.append((group_id, user_id, '今天天气不错', message_id))
+        per_group.append(messages)
+    stream = []
+    cursors = [0] * len(per_group)
+    active = list(range(len(per_group)))
+    while active:
+        index = rng.choice(active)
+        stream.append(per_group[index][cursors[index]])
+        cursors[index] += 1
+        if cursors[index] == len(per_group[index]):
+            active.remove(index)
+    return stream
+
+
+def with_storms(stream, args, rng):
+    """在原始消息流中插入重投风暴，返回投递序列、重投条数与其中重投的指令条数"""
+    deliveries = []
+    redelivered = 0
+    redelivered_commands = 0
+    for position, message in enumerate(stream):
+        deliveries.append(message)
+        if rng.random() < args.storm_probability:
+            window = stream[max(0, position + 1 - args.storm_size):position + 1]
+            commands = sum(1 for entry in window if entry[2].startswith('/'))
+            for _ in range(args.storm_repeats):
+                deliveries.extend(window)
+                redelivered += len(window)
+                redelivered_commands += commands
+    return deliveries, redelivered, redelivered_commands
+
+
+async def deliver(args, deliveries, dedup_ttl):
+    main = load_plugin_module()
+    config = {
+        'chamber_count': args.chambers,
+        'dedup_ttl_seconds': dedup_ttl,
+        'flood_user_per_minute': 0,
+        'flood_group_per_minute': 0,
+        'journal_enabled': False,
+    }
+    plugin = main.RevolverGamePlugin(FakeContext(), config)
+    await plugin._ensure_ready()
+    bot = FakeBot()
+    start = time.perf_counter()
+    # 每批消息并发处理，同一群的消息由插件的按群串行器按投递顺序执行
+    for offset in range(0, len(deliveries), args.concurrency):
+        batch = deliveries[offset:offset + args.concurrency]
+        await asyncio.gather(*(
+            drain(plugin.on_all_messages(FakeEvent(group_id, user_id, message, bot, message_id=message_id)))
+            for group_id, user_id, message, message_id in batch
+        ))
+    elapsed = time.perf_counter() - start
+    await plugin.ban_dispatcher.close()
+    gauges = plugin._metric_gauges()
+    result = {
+        'elapsed': elapsed,
+        'loads': plugin.metrics.loads,
+        'shots': plugin.metrics.shots,
+        'hits': plugin.metrics.hits,
+        'bans': len(bot.bans),
+        'duplicates': gauges['dedup_duplicates_total'][0],
+        'hit_rate': gauges['dedup_hit_rate'][0],
+    }
+    await plugin.terminate()
+    return result
+
+
+async def redeliver_after_chat_flood(args):
+    """一条指令之后投递大量普通消息再重投该指令，返回 (识别出的重复数, 装填次数)"""
+    main = load_plugin_module()
+    config = {'dedup_ttl_seconds': 300, 'flood_user_per_minute': 0, 'flood_group_per_minute': 0,
+              'journal_enabled': False}
+    plugin = main.RevolverGamePlugin(FakeContext(), config)
+    await plugin._ensure_ready()
+    bot = FakeBot()
+    command = (1, 1, '/装填 1', 'flood-command')
+    chat = [(2 + index % 100, 2, '今天天气不错', f'chat-{index}') for index in range(args.chat_flood)]
+    for group_id, user_id, message, message_id in [command] + chat + [command]:
+        await drain(plugin.on_all_messages(FakeEvent(group_id, user_id, message, bot, message_id=message_id)),
+                    yield_between=False)
+    result = (plugin._metric_gauges()['dedup_duplicates_total'][0], plugin.metrics.loads)
+    await plugin.terminate()
+    return result
+
+
+def time_dedup_checks(count):
+    dedup_cache = load_plugin_module('dedup_cache')
+    cache = dedup_cache.DedupCache()
+    keys = [('fake:GroupMessage:1', message_id) for message_id in range(count)]
+    start = time.perf_counter()
+    for key in keys:
+        cache.seen(key)
+    fresh = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for key in keys[-cache.capacity:]:
+        cache.seen(key)
+    repeated = (time.perf_counter() - start) / min(count, cache.capacity)
+    return fresh, repeated, len(cache)
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    stream = build_stream(args, rng)
+    deliveries, redelivered, redelivered_commands = with_storms(stream, args, rng)
+    # 原始流中每局装满实弹，每一枪都击中
+    expected = args.groups * args.rounds * args.chambers
+    print(f"{len(stream)} messages, {redelivered} redeliveries ({redelivered_commands} commands), "
+          f"{len(deliveries)} deliveries")
+
+    errors = []
+    for label, dedup_ttl in (('dedup on', 300), ('dedup off', 0)):
+        result = await deliver(args, deliveries, dedup_ttl)
+        print(f"{label:9s}: loads={result['loads']} shots={result['shots']} hits={result['hits']} "
+              f"bans={result['bans']} duplicates={result['duplicates']} hit_rate={result['hit_rate']:.3f} "
+              f"({len(deliveries) / result['elapsed']:.0f} deliveries/s)")
+        if dedup_ttl:
+            if result['shots'] != expected or result['hits'] != expected:
+                errors.append(f"{result['shots']} shots / {result['hits']} hits, expected {expected}")
+            if result['bans'] != expected:
+                errors.append(f"{result['bans']} bans, expected {expected}")
+            if result['duplicates'] != redelivered_commands:
+                errors.append(f"{result['duplicates']} duplicates detected, expected {redelivered_commands}")
+
+    duplicates, loads = await redeliver_after_chat_flood(args)
+    print(f"chat flood: {args.chat_flood} chat messages between a command and its redelivery, "
+          f"duplicates={duplicates} loads={loads}")
+    if duplicates != 1 or loads != 1:
+        errors.append("command redelivered after a chat flood was not recognised")
+
+    fresh, repeated, entries = time_dedup_checks(args.check_keys)
+    print(f"dedup check: {fresh * 1e9:.0f} ns/new id, {repeated * 1e9:.0f} ns/duplicate, "
+          f"{entries} ids retained after {args.check_keys} inserts")
+
+    if errors:
+        for error in errors:
+            print("  " + error)
+        print("FAIL")
+        return 1
+    print("OK: every redelivered command was dropped exactly once per redelivery")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=4)
+    parser.add_argument('--chambers', type=int, default=6)
+    parser.add_argument('--storm-probability', type=float, default=0.05)
+    parser.add_argument('--storm-size', type=int, default=20)
+    parser.add_argument('--storm-repeats', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--chat-flood', type=int, default=50_000)
+    parser.add_argument('--check-keys', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
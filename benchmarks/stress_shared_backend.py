@@ -0,0 +1,133 @@
+"""多进程共享状态后端压力测试
+
+用法: python benchmarks/stress_shared_backend.py [--workers 4] [--groups 50] [--chambers 32] [--bullets 8]
+
+多个进程打开同一个 SQLite 状态库：
+1. 并发对同一批群开枪，检查每个弹膛恰好被击发一次、命中数等于装填数；
+2. 所有超时都已到期且原持有者租约过期，各进程同时认领，检查每局只被认领一次
+   （即“游戏已自动结束”只会由一个进程发出）。
+不依赖 AstrBot。
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from fakes import load_plugin_module
+
+
+def open_backend(path, lease_grace=0.0):
+    state_backend = load_plugin_module('state_backend')
+    backend = state_backend.SqliteStateBackend(path, lease_grace=lease_grace)
+    backend.open()
+    return backend
+
+
+def shoot_worker(path, groups, worker_index):
+    """随机挑群开枪直到所有群都没有游戏，返回 (群, 击发的弹膛, 是否命中) 列表"""
+    backend = open_backend(path)
+    owner = f"worker-{worker_index}"
+    rng = random.Random(worker_index)
+    remaining = list(groups)
+    shots = []
+    while remaining:
+        group_id = rng.choice(remaining)
+        outcome = backend._sync_fire(group_id, f"origin:{group_id}", owner, time.time() + 60)
+        if outcome is None:
+            remaining.remove(group_id)
+            continue
+        state = outcome.state
+        fired_index = (state.current_chamber_index - 1) % state.chamber_count
+        shots.append((group_id, fired_index, outcome.hit))
+    return shots, backend.cas_retries
+
+
+def claim_worker(path, groups, worker_index):
+    backend = open_backend(path)
+    owner = f"worker-{worker_index}"
+    order = list(groups)
+    random.Random(worker_index).shuffle(order)
+    return [group_id for group_id in order if backend._sync_claim_timeout(group_id, owner) is not None]
+
+
+def run_shots(pool, path, args):
+    game_state = load_plugin_module('game_state')
+    backend = open_backend(path)
+    groups = list(range(1, args.groups + 1))
+    loaded = {}
+    for group_id in groups:
+        state = game_state.GameState.load(args.bullets, args.chambers)
+        loaded[group_id] = state.chambers
+        backend._sync_create_game(group_id, state, f"origin:{group_id}", 'loader', time.time() + 60)
+
+    start = time.perf_counter()
+    results = pool.starmap(shoot_worker, [(path, groups, index) for index in range(args.workers)])
+    elapsed = time.perf_counter() - start
+
+    errors = []
+    fired = Counter()
+    hits = Counter()
+    retries = 0
+    for shots, worker_retries in results:
+        retries += worker_retries
+        for group_id, index, hit in shots:
+            fired[(group_id, index)] += 1
+            hits[group_id] += hit
+            if hit != bool(loaded[group_id] >> index & 1):
+                errors.append(f"group {group_id}: chamber {index} reported hit={hit}")
+    for group_id in groups:
+        last_live = loaded[group_id].bit_length() - 1
+        for index in range(last_live + 1):
+            if fired[(group_id, index)] != 1:
+                errors.append(f"group {group_id}: chamber {index} fired {fired[(group_id, index)]} times")
+        if hits[group_id] != args.bullets:
+            errors.append(f"group {group_id}: {hits[group_id]} hits, expected {args.bullets}")
+    total = sum(fired.values())
+    print(f"shots: workers={args.workers} groups={args.groups} total={total} "
+          f"elapsed={elapsed:.2f}s ({total / elapsed:.0f} shots/s) cas_retries={retries}")
+    return errors
+
+
+def run_claims(pool, path, args):
+    game_state = load_plugin_module('game_state')
+    backend = open_backend(path)
+    groups = list(range(1001, 1001 + args.groups))
+    expired = time.time() - 1
+    for group_id in groups:
+        state = game_state.GameState.load(1, args.chambers)
+        backend._sync_create_game(group_id, state, f"origin:{group_id}", 'dead-worker', expired)
+
+    results = pool.starmap(claim_worker, [(path, groups, index) for index in range(args.workers)])
+    claims = Counter(group_id for claimed in results for group_id in claimed)
+    errors = [f"group {group_id}: claimed {claims[group_id]} times" for group_id in groups if claims[group_id] != 1]
+    print(f"claims: per worker {[len(claimed) for claimed in results]}, total {sum(claims.values())}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--chambers', type=int, default=32)
+    parser.add_argument('--bullets', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'rg_state.db')
+        with multiprocessing.Pool(args.workers) as pool:
+            errors = run_shots(pool, path, args) + run_claims(pool, path, args)
+    if errors:
+        for error in errors[:20]:
+            print("  " + error)
+        print(f"FAIL: {len(errors)} invariant violations")
+        return 1
+    print("OK: every chamber fired once and every timeout claimed once")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
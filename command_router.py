@@ -0,0 +1,59 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class CommandRoute(NamedTuple):
+    name: str
+    # 插件上处理该指令的方法名
+    handler: str
+    aliases: Tuple[str, ...] = ()
+    admin_only: bool = False
+    # 是否经过按用户、按群的流控
+    rate_limited: bool = False
+
+
+class CommandTable:
+    """按首字符分桶的指令前缀表，一次扫描完成消息分类
+
+    开头的 / 及其后的空白会被跳过；指令名之后必须是消息结尾或空白字符，
+    同一首字符下按长度从长到短比较，取最长的指令名。
+    普通消息只做一次不产生临时对象的首字符判断，不切分、不复制消息字符串。
+    """
+
+    __slots__ = ('_buckets', '_first_chars', 'routes')
+
+    def __init__(self, routes: Iterable[CommandRoute] = ()):
+        self._buckets: Dict[str, List[Tuple[str, CommandRoute]]] = {}
+        self._first_chars: Tuple[str, ...] = ()
+        self.routes: Tuple[CommandRoute, ...] = ()
+        for route in routes:
+            self.add(route)
+
+    def add(self, route: CommandRoute):
+        for keyword in (route.name,) + route.aliases:
+            keyword = keyword.lstrip('/')
+            if not keyword:
+                continue
+            bucket = self._buckets.setdefault(keyword[0], [])
+            bucket.append((keyword, route))
+            bucket.sort(key=lambda entry: -len(entry[0]))
+        self._first_chars = tuple(self._buckets)
+        self.routes += (route,)
+
+    def match(self, text: str) -> Optional[Tuple[CommandRoute, int]]:
+        """返回 (指令路由, 参数起始位置)，不是指令时返回 None"""
+        index = 0
+        while text.startswith('/', index):
+            index += 1
+        length = len(text)
+        if index:
+            while index < length and text[index].isspace():
+                index += 1
+        # 用 startswith 判断首字符，普通消息不产生任何临时对象
+        if not text.startswith(self._first_chars, index):
+            return None
+        for keyword, route in self._buckets[text[index]]:
+            if text.startswith(keyword, index):
+                end = index + len(keyword)
+                if end == length or text[end].isspace():
+                    return route, end
+        return None
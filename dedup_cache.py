@@ -0,0 +1,58 @@
+import time
+from typing import Any, Callable, Dict, Hashable, List
+
+DEFAULT_DEDUP_TTL = 300.0
+DEFAULT_DEDUP_CAPACITY = 16384
+
+
+class DedupCache:
+    """按平台消息 id 去重的定长环形缓存
+
+    capacity 个槽位在构造时一次分配，索引字典最多 capacity 项，内存上限固定。
+    登记新 id 时覆盖写指针处最旧的槽位，插入与过期都是 O(1)：
+    过期的 id 不主动清理，查询时按时间戳判断，随环形覆盖自然淘汰。
+    ttl 内的消息数超过 capacity 时，实际去重窗口缩短为最近 capacity 条。
+    """
+
+    __slots__ = ('ttl', 'capacity', '_clock', '_keys', '_stamps', '_slots', '_next', 'checked', 'duplicates')
+
+    def __init__(self, ttl: float = DEFAULT_DEDUP_TTL, capacity: int = DEFAULT_DEDUP_CAPACITY,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.capacity = max(1, capacity)
+        self._clock = clock
+        self._keys: List[Any] = [None] * self.capacity
+        self._stamps: List[float] = [0.0] * self.capacity
+        self._slots: Dict[Hashable, int] = {}
+        self._next = 0
+        self.checked = 0
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.duplicates / self.checked if self.checked else 0.0
+
+    def seen(self, key: Hashable) -> bool:
+        """登记一条消息，ttl 内已登记过时返回 True"""
+        self.checked += 1
+        now = self._clock()
+        slot = self._slots.get(key)
+        if slot is not None:
+            if now - self._stamps[slot] < self.ttl:
+                self.duplicates += 1
+                return True
+            # 已过期，原槽位原地续用
+            self._stamps[slot] = now
+            return False
+        slot = self._next
+        self._next = slot + 1 if slot + 1 < self.capacity else 0
+        oldest = self._keys[slot]
+        if oldest is not None:
+            del self._slots[oldest]
+        self._keys[slot] = key
+        self._stamps[slot] = now
+        self._slots[key] = slot
+        return False
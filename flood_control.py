@@ -0,0 +1,137 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+DEFAULT_USER_PER_MINUTE = 12
+DEFAULT_GROUP_PER_MINUTE = 60
+DEFAULT_USER_BURST = 4
+DEFAULT_GROUP_BURST = 15
+DEFAULT_NOTICE_INTERVAL = 30.0
+DEFAULT_BUCKET_CAPACITY = 10000
+
+# 流控判定结果
+FLOOD_ALLOWED = 0
+FLOOD_DROPPED = 1
+# 丢弃，且本群在提醒间隔内还没有提醒过
+FLOOD_DROPPED_NOTIFY = 2
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class TokenBuckets:
+    """按键的令牌桶集合，最多保留 capacity 个桶（LRU）
+
+    被淘汰的桶视为已装满：桶在空闲 burst / rate 秒后本来就会回满，
+    只有活跃键数超过 capacity 时才会提前放行少量请求。
+    """
+
+    __slots__ = ('rate', 'burst', 'capacity', '_clock', '_buckets')
+
+    def __init__(self, per_minute: float, burst: int, capacity: int = DEFAULT_BUCKET_CAPACITY,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.burst = float(max(1, burst))
+        self.capacity = max(1, capacity)
+        self._clock = clock
+        self._buckets: 'OrderedDict[Any, _Bucket]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key) -> bool:
+        """取走一个令牌，桶空时返回 False"""
+        bucket = self._refill(key)
+        if bucket.tokens < 1.0:
+            return False
+        bucket.tokens -= 1.0
+        return True
+
+    def wait_time(self, key) -> float:
+        """距离下一个令牌可用还需的秒数，当前有令牌时为 0，不取走令牌"""
+        bucket = self._refill(key)
+        if bucket.tokens >= 1.0:
+            return 0.0
+        return (1.0 - bucket.tokens) / self.rate
+
+    def _refill(self, key) -> _Bucket:
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.burst, now)
+            while len(self._buckets) > self.capacity:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        return bucket
+
+    def refund(self, key):
+        """退回刚取走的令牌"""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.tokens = min(self.burst, bucket.tokens + 1.0)
+
+
+class FloodControl:
+    """游戏指令的按用户、按群两级限流
+
+    先扣用户桶再扣群桶，群桶不足时退回用户令牌，被丢弃的请求不占用任何一级的额度。
+    每个群在 notice_interval 秒内最多得到一次“慢一点”提醒，其余超限请求静默丢弃。
+    per_minute 为 0 表示不限制该级。
+    """
+
+    def __init__(self, user_per_minute: float = DEFAULT_USER_PER_MINUTE,
+                 group_per_minute: float = DEFAULT_GROUP_PER_MINUTE,
+                 user_burst: int = DEFAULT_USER_BURST, group_burst: int = DEFAULT_GROUP_BURST,
+                 notice_interval: float = DEFAULT_NOTICE_INTERVAL,
+                 capacity: int = DEFAULT_BUCKET_CAPACITY, clock: Callable[[], float] = time.monotonic):
+        self._users: Optional[TokenBuckets] = None
+        self._groups: Optional[TokenBuckets] = None
+        if user_per_minute > 0:
+            self._users = TokenBuckets(user_per_minute, user_burst, capacity, clock)
+        if group_per_minute > 0:
+            self._groups = TokenBuckets(group_per_minute, group_burst, capacity, clock)
+        self.notice_interval = notice_interval
+        self.capacity = max(1, capacity)
+        self._clock = clock
+        self._noticed: 'OrderedDict[Any, float]' = OrderedDict()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._users is not None or self._groups is not None
+
+    @property
+    def buckets(self) -> int:
+        return len(self._users or ()) + len(self._groups or ())
+
+    def check(self, group_id, user_id) -> int:
+        """判定一次指令请求，返回 FLOOD_* 之一"""
+        users = self._users
+        user_key = (group_id, user_id)
+        if users is not None and not users.take(user_key):
+            return self._drop(group_id)
+        if self._groups is not None and not self._groups.take(group_id):
+            if users is not None:
+                users.refund(user_key)
+            return self._drop(group_id)
+        return FLOOD_ALLOWED
+
+    def _drop(self, group_id) -> int:
+        self.dropped += 1
+        now = self._clock()
+        noticed = self._noticed.get(group_id)
+        if noticed is not None and now - noticed < self.notice_interval:
+            return FLOOD_DROPPED
+        self._noticed[group_id] = now
+        self._noticed.move_to_end(group_id)
+        while len(self._noticed) > self.capacity:
+            self._noticed.popitem(last=False)
+        return FLOOD_DROPPED_NOTIFY
@@ -0,0 +1,58 @@
+import random
+from typing import Optional
+
+CHAMBER_COUNT = 6
+MAX_CHAMBER_COUNT = 32
+
+
+class GameState:
+    """单个群的左轮手枪状态，弹膛以整数位图保存
+
+    第 i 位为 1 表示第 i 个弹膛装有实弹；live_rounds 与位图同步维护，
+    因此“剩余实弹数”和“游戏是否进行中”都是 O(1) 查询。
+    """
+
+    __slots__ = ('chamber_count', 'chambers', 'live_rounds', 'current_chamber_index')
+
+    def __init__(self, chamber_count: int = CHAMBER_COUNT, chambers: int = 0,
+                 current_chamber_index: int = 0, live_rounds: Optional[int] = None):
+        self.chamber_count = chamber_count
+        self.chambers = chambers
+        self.current_chamber_index = current_chamber_index
+        self.live_rounds = bin(chambers).count('1') if live_rounds is None else live_rounds
+
+    @classmethod
+    def load(cls, bullets: int, chamber_count: int = CHAMBER_COUNT, rng: Optional[random.Random] = None):
+        """随机选取 bullets 个弹膛装入实弹"""
+        sample = (rng or random).sample
+        chambers = 0
+        for position in sample(range(chamber_count), bullets):
+            chambers |= 1 << position
+        return cls(chamber_count, chambers, 0, bullets)
+
+    @property
+    def is_active(self) -> bool:
+        return self.live_rounds > 0
+
+    @property
+    def remaining(self) -> int:
+        return self.live_rounds
+
+    def is_live(self, index: int) -> bool:
+        return bool(self.chambers >> index & 1)
+
+    def fire(self) -> bool:
+        """扣动扳机并转到下一个弹膛，返回是否击发实弹"""
+        index = self.current_chamber_index
+        bit = 1 << index
+        hit = bool(self.chambers & bit)
+        if hit:
+            self.chambers ^= bit
+            self.live_rounds -= 1
+        index += 1
+        self.current_chamber_index = 0 if index == self.chamber_count else index
+        return hit
+
+    def __repr__(self) -> str:
+        return (f"GameState(chamber_count={self.chamber_count}, chambers={self.chambers:#b}, "
+                f"current_chamber_index={self.current_chamber_index}, live_rounds={self.live_rounds})")
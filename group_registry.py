@@ -0,0 +1,96 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_GROUP_CACHE_SIZE = 10000
+
+
+class GroupRegistry:
+    """容量受限的群走火开关表
+
+    - 内存中只保留最近活跃的 capacity 个群（LRU），空闲的群被淘汰，
+      再次出现时从状态存储按需读取，机器人所在的群再多也不会无限增长；
+    - 与默认值相同的开关不落盘（删除已保存的记录），数据库里只有改过设置的群。
+    """
+
+    def __init__(self, store, default: bool, capacity: int = DEFAULT_GROUP_CACHE_SIZE,
+                 on_evict: Optional[Callable[[Any], None]] = None):
+        self._store = store
+        self.default = bool(default)
+        self.capacity = max(1, capacity)
+        self._on_evict = on_evict
+        self._switches: 'OrderedDict[Any, bool]' = OrderedDict()
+        self._loads: Dict[Any, asyncio.Future] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._switches)
+
+    def __contains__(self, group_id) -> bool:
+        return group_id in self._switches
+
+    def cached(self, group_id) -> Optional[bool]:
+        """已缓存时返回开关并标记为最近使用，未缓存返回 None，不做任何 I/O"""
+        enabled = self._switches.get(group_id)
+        if enabled is not None:
+            self._switches.move_to_end(group_id)
+        return enabled
+
+    async def get(self, group_id) -> bool:
+        """读取群走火开关，未缓存时从状态存储加载"""
+        enabled = self.cached(group_id)
+        if enabled is not None:
+            return enabled
+        # 同一群的并发首次访问共用一次数据库读取
+        loading = self._loads.get(group_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load(group_id))
+            self._loads[group_id] = loading
+            loading.add_done_callback(lambda _future: self._loads.pop(group_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load(self, group_id) -> bool:
+        self.loads += 1
+        saved = await self._store.call(self._store.load_switch, group_id)
+        # 等待期间开关可能已被修改
+        enabled = self._switches.get(group_id)
+        if enabled is not None:
+            return enabled
+        enabled = self.default if saved is None else saved
+        self._put(group_id, enabled)
+        return enabled
+
+    def set(self, group_id, enabled: bool):
+        """修改群走火开关，由状态存储延迟批量写入"""
+        enabled = bool(enabled)
+        self._put(group_id, enabled)
+        self._store.set_switch(group_id, None if enabled == self.default else enabled)
+
+    def _put(self, group_id, enabled: bool):
+        self._switches[group_id] = enabled
+        self._switches.move_to_end(group_id)
+        while len(self._switches) > self.capacity:
+            evicted, _ = self._switches.popitem(last=False)
+            self.evictions += 1
+            if self._on_evict is not None:
+                self._on_evict(evicted)
+
+    async def refresh(self) -> List[Any]:
+        """重新读取已缓存群的开关，返回值发生变化的群（共享后端下同步其他进程的修改）"""
+        group_ids = list(self._switches)
+        if not group_ids:
+            return []
+        saved = await self._store.call(self._store.load_switches, group_ids)
+        saved = {str(group_id): enabled for group_id, enabled in saved.items()}
+        changed = []
+        for group_id in group_ids:
+            current = self._switches.get(group_id)
+            if current is None:
+                continue
+            enabled = saved.get(str(group_id), self.default)
+            if enabled != current:
+                # 只更新值，不改变最近使用顺序
+                self._switches[group_id] = enabled
+                changed.append(group_id)
+        return changed
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Dict
+
+
+class _GroupSlot:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class _GroupTurn:
+    """一次串行执行的占位，离开时释放，无人等待时回收该群的锁"""
+
+    __slots__ = ('_slots', '_group_id', '_slot')
+
+    def __init__(self, slots: Dict[Any, _GroupSlot], group_id):
+        self._slots = slots
+        self._group_id = group_id
+        self._slot = None
+
+    async def __aenter__(self):
+        slot = self._slots.get(self._group_id)
+        if slot is None:
+            slot = _GroupSlot()
+            self._slots[self._group_id] = slot
+        slot.users += 1
+        self._slot = slot
+        try:
+            await slot.lock.acquire()
+        except BaseException:
+            self._leave()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._slot.lock.release()
+        self._leave()
+        return False
+
+    def _leave(self):
+        slot = self._slot
+        slot.users -= 1
+        if not slot.users and self._slots.get(self._group_id) is slot:
+            del self._slots[self._group_id]
+
+
+class GroupSerializer:
+    """按群串行处理指令，不同群之间完全并行
+
+    每个群的锁在第一次使用时创建，最后一个持有者离开后立即回收，
+    空闲群不占用任何内存。
+    """
+
+    __slots__ = ('_slots',)
+
+    def __init__(self):
+        self._slots: Dict[Any, _GroupSlot] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def hold(self, group_id) -> _GroupTurn:
+        """用法: async with serializer.hold(group_id): ..."""
+        return _GroupTurn(self._slots, group_id)
+
+    def is_busy(self, group_id) -> bool:
+        return group_id in self._slots
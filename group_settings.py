@@ -0,0 +1,166 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .game_state import MAX_CHAMBER_COUNT
+
+
+class GroupSettings(NamedTuple):
+    """单个群生效的游戏参数"""
+
+    misfire_probability: float
+    timeout_seconds: int
+    min_ban_seconds: int
+    max_ban_seconds: int
+    chamber_count: int
+
+
+# 可按群覆盖的参数：(字段名, 显示名, 类型)
+OVERRIDE_FIELDS: Tuple[Tuple[str, str, type], ...] = (
+    ('misfire_probability', '走火概率', float),
+    ('timeout_seconds', '超时秒数', int),
+    ('min_ban_seconds', '最短禁言秒数', int),
+    ('max_ban_seconds', '最长禁言秒数', int),
+    ('chamber_count', '弹膛数', int),
+)
+OVERRIDE_TYPES: Dict[str, type] = {name: kind for name, _label, kind in OVERRIDE_FIELDS}
+OVERRIDE_LABELS: Dict[str, str] = {name: label for name, label, _kind in OVERRIDE_FIELDS}
+# 指令中可用的参数名，含中文别名
+OVERRIDE_ALIASES: Dict[str, str] = {
+    **{name: name for name in OVERRIDE_TYPES},
+    '走火概率': 'misfire_probability',
+    '走火': 'misfire_probability',
+    '超时': 'timeout_seconds',
+    '超时秒数': 'timeout_seconds',
+    '最短禁言': 'min_ban_seconds',
+    '最短禁言秒数': 'min_ban_seconds',
+    '最长禁言': 'max_ban_seconds',
+    '最长禁言秒数': 'max_ban_seconds',
+    '弹膛': 'chamber_count',
+    '弹膛数': 'chamber_count',
+}
+
+
+def parse_override(name: str, raw: str):
+    """把指令或数据库中的文本解析为参数值，不合法时抛出 ValueError（消息可直接回复给用户）"""
+    label = OVERRIDE_LABELS[name]
+    try:
+        value = OVERRIDE_TYPES[name](raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{label}必须是{'数字' if OVERRIDE_TYPES[name] is float else '整数'}")
+    if name == 'misfire_probability':
+        if not 0.0 <= value <= 1.0:
+            raise ValueError(f"{label}必须在 0 到 1 之间")
+    elif value < 1:
+        raise ValueError(f"{label}必须大于 0")
+    elif name == 'chamber_count' and value > MAX_CHAMBER_COUNT:
+        raise ValueError(f"{label}不能超过 {MAX_CHAMBER_COUNT}")
+    return value
+
+
+def resolve_settings(defaults: GroupSettings, overrides: Dict[str, Any]) -> GroupSettings:
+    """合并默认值与覆盖项并检查禁言上下限，不合法时抛出 ValueError"""
+    settings = defaults._replace(**overrides)
+    if settings.min_ban_seconds > settings.max_ban_seconds:
+        raise ValueError(
+            f"最短禁言 {settings.min_ban_seconds} 秒不能大于最长禁言 {settings.max_ban_seconds} 秒"
+        )
+    return settings
+
+
+class GroupSettingsTable:
+    """按群覆盖的游戏参数，预先解析为每个群的生效记录
+
+    - 只有设置过覆盖项的群才有独立记录，其余群共用同一份默认记录，内存随覆盖群数增长；
+    - 合并与校验只在修改时进行，热路径上的 get 只是一次字典查找；
+    - 修改某个群只重新解析该群，修改默认值时只重新解析有覆盖项的群。
+    on_change(group_id, settings) 在某个群的生效记录变化后调用。
+    """
+
+    def __init__(self, defaults: GroupSettings,
+                 on_change: Optional[Callable[[Any, GroupSettings], None]] = None):
+        self.defaults = defaults
+        self._on_change = on_change
+        self._overrides: Dict[Any, Dict[str, Any]] = {}
+        self._resolved: Dict[Any, GroupSettings] = {}
+
+    def __len__(self) -> int:
+        return len(self._resolved)
+
+    def get(self, group_id) -> GroupSettings:
+        return self._resolved.get(group_id, self.defaults)
+
+    def overrides(self, group_id) -> Dict[str, Any]:
+        return dict(self._overrides.get(group_id, ()))
+
+    def set(self, group_id, name: str, value):
+        """设置单项覆盖，与其他参数冲突时抛出 ValueError 且不做任何修改"""
+        overrides = dict(self._overrides.get(group_id, ()))
+        overrides[name] = value
+        self._apply(group_id, overrides, resolve_settings(self.defaults, overrides))
+
+    def clear(self, group_id, name: Optional[str] = None):
+        """删除单项或全部覆盖，清除后与默认值冲突时抛出 ValueError"""
+        overrides = dict(self._overrides.get(group_id, ()))
+        if name is None:
+            overrides.clear()
+        else:
+            overrides.pop(name, None)
+        self._apply(group_id, overrides, resolve_settings(self.defaults, overrides))
+
+    def load(self, rows: Dict[Any, Dict[str, str]]) -> List[Any]:
+        """用状态存储中的全部覆盖项替换当前内容，返回生效记录发生变化的群"""
+        changed = []
+        for group_id in set(self._overrides) - set(rows):
+            self._overrides.pop(group_id)
+            if self._resolved.pop(group_id) != self.defaults:
+                changed.append(group_id)
+                self._notify(group_id, self.defaults)
+        for group_id, raw in rows.items():
+            overrides = {}
+            for name, text in raw.items():
+                if name in OVERRIDE_TYPES:
+                    try:
+                        overrides[name] = parse_override(name, text)
+                    except ValueError:
+                        continue
+            if overrides == self._overrides.get(group_id):
+                continue
+            try:
+                settings = resolve_settings(self.defaults, overrides)
+            except ValueError:
+                continue
+            previous = self.get(group_id)
+            self._store(group_id, overrides, settings)
+            if settings != previous:
+                changed.append(group_id)
+                self._notify(group_id, settings)
+        return changed
+
+    def set_defaults(self, defaults: GroupSettings):
+        """更新全局默认值，只重新解析有覆盖项的群；与新默认值冲突的覆盖群保留原记录"""
+        self.defaults = defaults
+        for group_id, overrides in self._overrides.items():
+            try:
+                settings = resolve_settings(defaults, overrides)
+            except ValueError:
+                continue
+            if settings != self._resolved[group_id]:
+                self._resolved[group_id] = settings
+                self._notify(group_id, settings)
+
+    def _apply(self, group_id, overrides: Dict[str, Any], settings: GroupSettings):
+        previous = self.get(group_id)
+        self._store(group_id, overrides, settings)
+        if settings != previous:
+            self._notify(group_id, settings)
+
+    def _store(self, group_id, overrides: Dict[str, Any], settings: GroupSettings):
+        if overrides:
+            self._overrides[group_id] = overrides
+            self._resolved[group_id] = settings
+        else:
+            self._overrides.pop(group_id, None)
+            self._resolved.pop(group_id, None)
+
+    def _notify(self, group_id, settings: GroupSettings):
+        if self._on_change is not None:
+            self._on_change(group_id, settings)
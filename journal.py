@@ -0,0 +1,273 @@
+import asyncio
+import glob
+import heapq
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from astrbot.api import logger
+
+JOURNAL_MAGIC = b'RGJ1'
+JOURNAL_PREFIX = 'journal-'
+JOURNAL_SUFFIX = '.rgj'
+DEFAULT_MAX_FILE_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_FILES = 5
+DEFAULT_FLUSH_INTERVAL = 1.0
+# 缓冲超过该大小时不等刻度立即写入
+FLUSH_THRESHOLD_BYTES = 256 * 1024
+# 多进程共用日志目录时，其他进程超过该时长未写入的文件视为已退出进程的遗留文件，可随轮转清理
+STALE_JOURNAL_SECONDS = 24 * 3600
+
+EVENT_LOAD = 1
+EVENT_SHOT = 2
+EVENT_MISFIRE = 3
+EVENT_BAN_REQUEST = 4
+EVENT_BAN_RESULT = 5
+EVENT_TIMEOUT = 6
+EVENT_MISFIRE_SWITCH = 7
+EVENT_NAMES = {
+    EVENT_LOAD: 'load',
+    EVENT_SHOT: 'shot',
+    EVENT_MISFIRE: 'misfire',
+    EVENT_BAN_REQUEST: 'ban_request',
+    EVENT_BAN_RESULT: 'ban_result',
+    EVENT_TIMEOUT: 'timeout',
+    EVENT_MISFIRE_SWITCH: 'misfire_switch',
+}
+
+# 开枪结果
+SHOT_EMPTY_GUN = 0
+SHOT_MISS = 1
+SHOT_HIT = 2
+
+# 定长记录头：时间、事件类型、标志、数值、群号/用户/文本的 UTF-8 字节数，其后紧跟三段字符串
+_RECORD = struct.Struct('<dBBiHHH')
+
+
+class JournalEvent(NamedTuple):
+    timestamp: float
+    kind: int
+    # 开枪结果 / 禁言是否成功 / 开关状态
+    flag: int
+    # 装填数 / 剩余实弹 / 禁言秒数
+    value: int
+    group_id: Any
+    user_id: Any
+    # 昵称等附加文本
+    text: str
+
+    @property
+    def name(self) -> str:
+        return EVENT_NAMES.get(self.kind, str(self.kind))
+
+
+def _encode_id(value) -> bytes:
+    return b'' if value is None else str(value).encode('utf-8')
+
+
+def _decode_id(raw: bytes):
+    if not raw:
+        return None
+    text = raw.decode('utf-8')
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def encode_event(timestamp: float, kind: int, group_id=None, user_id=None, value: int = 0,
+                 flag: int = 0, text: str = '') -> bytes:
+    group = _encode_id(group_id)
+    user = _encode_id(user_id)
+    extra = text.encode('utf-8')[:0xFFFF]
+    return _RECORD.pack(timestamp, kind, flag, value, len(group), len(user), len(extra)) + group + user + extra
+
+
+def read_journal(path: str) -> Iterator[JournalEvent]:
+    """按顺序读取单个日志文件，末尾写了一半的记录会被忽略"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if not data.startswith(JOURNAL_MAGIC):
+        raise ValueError(f"{path} is not a revolver game journal")
+    offset = len(JOURNAL_MAGIC)
+    size = _RECORD.size
+    while offset + size <= len(data):
+        timestamp, kind, flag, value, group_len, user_len, text_len = _RECORD.unpack_from(data, offset)
+        offset += size
+        end = offset + group_len + user_len + text_len
+        if end > len(data):
+            break
+        group = data[offset:offset + group_len]
+        user = data[offset + group_len:offset + group_len + user_len]
+        text = data[offset + group_len + user_len:end].decode('utf-8')
+        offset = end
+        yield JournalEvent(timestamp, kind, flag, value, _decode_id(group), _decode_id(user), text)
+
+
+def journal_worker(path: str) -> str:
+    """日志文件所属进程的标识，旧版本不带标识的文件返回空串"""
+    stem = os.path.basename(path)[len(JOURNAL_PREFIX):-len(JOURNAL_SUFFIX)]
+    return stem.rpartition('-')[0]
+
+
+def journal_files(directory: str, worker: Optional[str] = None) -> List[str]:
+    """目录中的日志文件，同一进程的文件按写入顺序排列；指定 worker 时只返回该进程的文件"""
+    paths = sorted(glob.glob(os.path.join(directory, f'{JOURNAL_PREFIX}*{JOURNAL_SUFFIX}')))
+    if worker is None:
+        return paths
+    return [path for path in paths if journal_worker(path) == worker]
+
+
+def read_journal_dir(directory: str) -> Iterator[JournalEvent]:
+    """按时间顺序合并目录中各进程的日志"""
+    workers: Dict[str, List[str]] = {}
+    for path in journal_files(directory):
+        workers.setdefault(journal_worker(path), []).append(path)
+    streams = [
+        (event for path in paths for event in read_journal(path))
+        for paths in workers.values()
+    ]
+    yield from heapq.merge(*streams, key=lambda event: event.timestamp)
+
+
+class GameJournal:
+    """只追加的游戏事件日志
+
+    处理器只把编码好的记录追加到内存缓冲；后台任务每隔 flush_interval 秒
+    在独立线程里一次写入并 fsync。单个文件超过 max_file_bytes 后轮转，
+    最多保留 max_files 个文件。文件名带进程标识 worker，多个进程共用目录时各写各的文件；
+    exclusive 为 False 时轮转只清理本进程与已停止写入的遗留文件，不会删除其他进程正在写的文件。
+    """
+
+    def __init__(self, directory: str, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                 max_files: int = DEFAULT_MAX_FILES, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 clock=time.time, worker: Optional[str] = None, exclusive: bool = True):
+        self.directory = directory
+        self.worker = worker or str(os.getpid())
+        self.exclusive = exclusive
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._buffer: List[bytes] = []
+        self._buffered_bytes = 0
+        self._file = None
+        self._file_bytes = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.events = 0
+        self.dropped = 0
+
+    def record(self, kind: int, group_id=None, user_id=None, value: int = 0, flag: int = 0, text: str = ''):
+        """登记一条事件，不做任何 I/O"""
+        data = encode_event(self._clock(), kind, group_id, user_id, value, flag, text)
+        self._buffer.append(data)
+        self._buffered_bytes += len(data)
+        self.events += 1
+        if self._task is None or self._task.done():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        elif self._buffered_bytes >= FLUSH_THRESHOLD_BYTES:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def _take_buffer(self) -> List[bytes]:
+        buffer, self._buffer = self._buffer, []
+        self._buffered_bytes = 0
+        return buffer
+
+    async def flush(self):
+        """把缓冲写入日志文件并 fsync"""
+        buffer = self._take_buffer()
+        if not buffer:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rg-journal")
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self._write, buffer)
+        except Exception as e:
+            # 日志只用于排查与回放，写入失败时丢弃这一批而不是无限堆积
+            self.dropped += len(buffer)
+            logger.error(f"Failed to write game journal: {e}")
+
+    def _open_next_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.makedirs(self.directory, exist_ok=True)
+        own = journal_files(self.directory, self.worker)
+        sequence = 1
+        if own:
+            sequence = int(os.path.basename(own[-1])[:-len(JOURNAL_SUFFIX)].rpartition('-')[2]) + 1
+        while True:
+            path = os.path.join(self.directory, f'{JOURNAL_PREFIX}{self.worker}-{sequence:06d}{JOURNAL_SUFFIX}')
+            try:
+                # 'xb' 保证不会截断任何已存在的文件
+                self._file = open(path, 'xb')
+                break
+            except FileExistsError:
+                sequence += 1
+        self._file.write(JOURNAL_MAGIC)
+        self._file_bytes = len(JOURNAL_MAGIC)
+        for stale in self._rotation_candidates(own)[:-self.max_files]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    def _rotation_candidates(self, own: List[str]) -> List[str]:
+        """可参与轮转的文件（含刚打开的当前文件），按修改时间从旧到新排列"""
+        now = time.time()
+        candidates = []
+        for path in journal_files(self.directory):
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if (journal_worker(path) == self.worker or self.exclusive
+                    or now - mtime > STALE_JOURNAL_SECONDS):
+                candidates.append((mtime, path in own, path))
+        # 修改时间相同的文件中本进程旧文件先被清理，当前文件总是排在最后
+        candidates.sort(key=lambda item: (item[0], not item[1]))
+        return [path for _, _, path in candidates]
+
+    def _write(self, buffer: List[bytes]):
+        if (self._file is None or self._file_bytes >= self.max_file_bytes
+                or os.fstat(self._file.fileno()).st_nlink == 0):
+            # 文件被其他进程当作遗留文件清理后换一个新文件，避免写入已删除的文件
+            self._open_next_file()
+        data = b''.join(buffer)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file_bytes += len(data)
+
+    async def close(self):
+        """写入剩余事件并关闭文件"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,12 +1,9 @@
-import datetime
+import asyncio
 import os
 import random
 import shutil
-import yaml
-from typing import Any, Dict, List, Optional, Tuple
-
-from apscheduler.jobstores.base import JobLookupError
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from astrbot.api.all import (
     AstrMessageEvent,
@@ -19,9 +16,83 @@ from astrbot.api.all import (
 )
 from astrbot.api import AstrBotConfig, logger
 
+from .ban_dispatcher import BanDispatcher
+from .command_router import CommandRoute, CommandTable
+from .dedup_cache import DEFAULT_DEDUP_TTL, DedupCache
+from .flood_control import (
+    DEFAULT_GROUP_PER_MINUTE,
+    DEFAULT_USER_PER_MINUTE,
+    FLOOD_ALLOWED,
+    FLOOD_DROPPED_NOTIFY,
+    FloodControl,
+)
+from .game_state import CHAMBER_COUNT, MAX_CHAMBER_COUNT, GameState
+from .group_registry import DEFAULT_GROUP_CACHE_SIZE, GroupRegistry
+from .group_settings import OVERRIDE_ALIASES, OVERRIDE_FIELDS, GroupSettings, GroupSettingsTable, parse_override
+from .group_serializer import GroupSerializer
+from .metrics import (
+    HANDLER_LOAD,
+    HANDLER_MISFIRE_SWITCH,
+    HANDLER_ON_ALL_MESSAGES,
+    HANDLER_NAMES,
+    HANDLER_SHOOT,
+    HANDLER_TIMEOUT,
+    MESSAGE_TIMING_SAMPLE,
+    HandlerTimer,
+    PluginMetrics,
+    format_seconds,
+    write_snapshot,
+)
+from .journal import (
+    EVENT_BAN_REQUEST,
+    EVENT_BAN_RESULT,
+    EVENT_LOAD,
+    EVENT_MISFIRE,
+    EVENT_MISFIRE_SWITCH,
+    EVENT_SHOT,
+    EVENT_TIMEOUT,
+    SHOT_EMPTY_GUN,
+    SHOT_HIT,
+    SHOT_MISS,
+    GameJournal,
+)
+from .misfire import MisfireCountdown
+from .outbox import (
+    DEFAULT_PLATFORM_PER_MINUTE,
+    DEFAULT_SESSION_PER_MINUTE,
+    PRIORITY_ERROR,
+    PRIORITY_REPORT,
+    PRIORITY_TIMEOUT,
+    Outbox,
+)
+from .player_stats import StatsBook
+from .profiler import DEFAULT_PROFILE_SECONDS, MAX_PROFILE_SECONDS, PROFILE_DIRNAME, RuntimeProfiler
+from .reply_composer import ReplyComposer
+from .snapshot import GameSnapshot, SnapshotError, encode_snapshot, read_snapshot_file, write_snapshot_file
+from .state_backend import STATE_BACKEND_MEMORY, STATE_BACKENDS, create_state_backend
+from .state_store import PluginStateStore
+from .text_pool import TextFileWatcher, TextPool, compile_texts
+from .timeout_wheel import TimeoutWheel
+
 DEFAULT_TEXTS_FILE = os.path.join(os.path.dirname(__file__), 'revolver_game_texts.yml')
+STATE_DB_FILENAME = 'rg_state.db'
+TEXT_RELOAD_INTERVAL = 5.0
+METRICS_FILENAME = 'metrics.prom'
+METRICS_WORKER_FILENAME = 'metrics-{worker}.prom'
+METRICS_SNAPSHOT_INTERVAL = 60.0
+GAMES_SNAPSHOT_FILENAME = 'active_games.snapshot'
+GAMES_SNAPSHOT_INTERVAL = 30.0
+JOURNAL_DIRNAME = 'journal'
+# 关闭时等待排队中的超时提示发出的秒数：基础时间加每条积压提示的额外时间，总计不超过上限
+OUTBOX_DRAIN_SECONDS = 5.0
+OUTBOX_DRAIN_SECONDS_PER_MESSAGE = 0.05
+OUTBOX_DRAIN_MAX_SECONDS = 60.0
+# 关闭时等待性能分析报告任务结束的最长秒数
+REPORT_TASK_GRACE_SECONDS = 1.0
+SWITCH_MIGRATION_META_KEY = 'texts_misfire_switches_migrated'
+# 共享状态后端下接管过期租约、同步走火开关的间隔
+LEASE_SWEEP_INTERVAL = 5.0
 
-CHAMBER_COUNT = 6
 DEFAULT_MIN_BAN_DURATION = 60
 DEFAULT_MAX_BAN_DURATION = 300
 DEFAULT_TIMEOUT_SECONDS = 60
@@ -33,8 +104,30 @@ DEFAULT_PLUGIN_CONFIG: Dict[str, Any] = {
     'min_ban_seconds': DEFAULT_MIN_BAN_DURATION,
     'max_ban_seconds': DEFAULT_MAX_BAN_DURATION,
     'misfire_enabled_by_default': False,
+    'chamber_count': CHAMBER_COUNT,
+    'state_backend': STATE_BACKEND_MEMORY,
+    'coalesce_replies': True,
+    'journal_enabled': True,
+    'group_cache_size': DEFAULT_GROUP_CACHE_SIZE,
+    'flood_user_per_minute': DEFAULT_USER_PER_MINUTE,
+    'flood_group_per_minute': DEFAULT_GROUP_PER_MINUTE,
+    'dedup_ttl_seconds': DEFAULT_DEDUP_TTL,
+    'outbound_platform_per_minute': DEFAULT_PLATFORM_PER_MINUTE,
+    'outbound_group_per_minute': DEFAULT_SESSION_PER_MINUTE,
 }
 
+# 插件指令，由 on_all_messages 经指令前缀表统一分发
+COMMAND_ROUTES = (
+    CommandRoute("装填", "command_load", rate_limited=True),
+    CommandRoute("开枪", "command_shoot", rate_limited=True),
+    CommandRoute("走火开", "command_misfire_on", rate_limited=True),
+    CommandRoute("走火关", "command_misfire_off", rate_limited=True),
+    CommandRoute("rg状态", "command_status", admin_only=True),
+    CommandRoute("rg性能", "command_profile", admin_only=True),
+    CommandRoute("rg群设置", "command_group_settings", admin_only=True),
+    CommandRoute("排行榜", "command_leaderboard", rate_limited=True),
+)
+
 DEFAULT_FALLBACK_TEXTS: Dict[str, List[str]] = {
     'misfire_descriptions': ['手枪突然走火。'],
     'user_reactions': ['{sender_nickname} 吓得不轻。'],
@@ -50,96 +143,144 @@ DEFAULT_FALLBACK_TEXTS: Dict[str, List[str]] = {
     "https://github.com/piexian/astrbot_plugin_rg",
 )
 class RevolverGamePlugin(Star):
-    COMMAND_KEYWORDS = {"装填", "开枪", "走火开", "走火关"}
+    command_table = CommandTable(COMMAND_ROUTES)
 
     def __init__(self, context: Context, config: Optional[AstrBotConfig] = None):
         super().__init__(context)
         self.config = self._initialize_config(config)
         self.plugin_dir = context.get_plugin_data_dir()
-        os.makedirs(self.plugin_dir, exist_ok=True)
         self.texts_file = os.path.join(self.plugin_dir, 'revolver_game_texts.yml')
+        self.games_snapshot_file = os.path.join(self.plugin_dir, GAMES_SNAPSHOT_FILENAME)
+        # 运行指标
+        self.metrics = PluginMetrics()
 
-        # 缓存初始化与文本加载
+        # 文本、走火开关与快照在预热任务中加载，构造阶段不做任何文件 I/O
         self._cached_texts: Optional[Dict[str, Any]] = None
         self._default_texts: Optional[Dict[str, Any]] = None
-        self._ensure_texts_file()
-        self.texts = self._load_texts()
-
-        # 群游戏状态
-        self.group_states: Dict[int, Dict[str, Any]] = {}
-        # 加载走火开关
-        self.group_misfire_switches = self._load_misfire_switches()
-        # 走火概率
+        self._text_watcher = TextFileWatcher(self.texts_file)
+        self.text_pool: TextPool = compile_texts({}, DEFAULT_FALLBACK_TEXTS)
+        self.texts: Dict[str, Any] = {}
+        self._ready = False
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._background_tasks: List[asyncio.Task] = []
+        # 等待性能分析结束后发送报告的任务
+        self._report_tasks: Set[asyncio.Task] = set()
+
+        # 群游戏状态后端（内存或多进程共享），同一群的状态变更在本进程内经由 group_serializer 串行执行
+        self.worker_id = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self.state_backend = create_state_backend(
+            self._load_state_backend_name(), os.path.join(self.plugin_dir, STATE_DB_FILENAME)
+        )
+        self.group_states: Dict[str, GameState] = self.state_backend.games
+        # 多进程共用数据目录时各进程写自己的指标文件，并以 worker 标签区分
+        self.metric_labels: Dict[str, str] = {}
+        self.metrics_file = os.path.join(self.plugin_dir, METRICS_FILENAME)
+        if self.state_backend.shared:
+            self.metric_labels = {'worker': self.worker_id}
+            self.metrics_file = os.path.join(self.plugin_dir, METRICS_WORKER_FILENAME.format(worker=self.worker_id))
+        self.group_serializer = GroupSerializer()
+        # 持久化状态存储（首次访问时才打开数据库）
+        self.state_store = PluginStateStore(os.path.join(self.plugin_dir, STATE_DB_FILENAME))
+        # 玩家统计与排行榜，增量累计后分批写入状态存储
+        self.player_stats = StatsBook(self.state_store)
+        # 走火概率与走火倒计时（共用倒计时，单独设置概率的群各自计数）
         self.misfire_probability = self._load_misfire_probability()
+        self.misfire_countdown = MisfireCountdown(self.misfire_probability)
         # 惩罚与超时时间配置
         self.min_ban_seconds, self.max_ban_seconds = self._load_ban_duration_bounds()
         self.timeout_seconds = self._load_timeout_seconds()
+        self.chamber_count = self._load_chamber_count()
         self.default_misfire_enabled = self._load_default_misfire_switch()
-        # 初始化定时器调度器
-        if not hasattr(context, 'scheduler'):
-            context.scheduler = AsyncIOScheduler()
-            context.scheduler.start()
-        self.scheduler = context.scheduler
+        # 管理员按群覆盖的游戏参数，未覆盖的群共用全局配置
+        self.group_settings = GroupSettingsTable(
+            GroupSettings(
+                self.misfire_probability, self.timeout_seconds, self.min_ban_seconds, self.max_ban_seconds,
+                self.chamber_count,
+            ),
+            on_change=self._on_group_settings_changed,
+        )
+        # 群走火开关（LRU 缓存，被淘汰的群连同走火倒计时一起丢弃，再次出现时按需读取）
+        self.group_switches = GroupRegistry(
+            self.state_store, self.default_misfire_enabled, self._load_group_cache_size(),
+            on_evict=self.misfire_countdown.reset,
+        )
+        # 游戏超时时间轮（单调时钟），推进任务在有超时登记后才启动
+        self.timeout_wheel = TimeoutWheel(self.timeout_callback)
+        # 游戏事件日志（只追加，后台批量 fsync）
+        self.journal: Optional[GameJournal] = None
+        if self._get_bool_config('journal_enabled', True):
+            self.journal = GameJournal(
+                os.path.join(self.plugin_dir, JOURNAL_DIRNAME),
+                worker=self.worker_id, exclusive=not self.state_backend.shared,
+            )
+        # 适配器重连后重投的消息按平台消息 id 去重
+        dedup_ttl = self._get_float_config('dedup_ttl_seconds', DEFAULT_DEDUP_TTL)
+        self.dedup: Optional[DedupCache] = DedupCache(dedup_ttl) if dedup_ttl > 0 else None
+        # 游戏指令的按用户、按群令牌桶限流
+        self.flood_control = FloodControl(*self._load_flood_limits())
+        # 管理员按需开启的限时性能分析
+        self.profiler = RuntimeProfiler(os.path.join(self.plugin_dir, PROFILE_DIRNAME))
+        # 主动发送的超时与错误提示按优先级排队，按平台、按群令牌桶限速
+        self.outbox = Outbox(self.context.send_message, *self._load_outbound_limits())
+        # 后台禁言调度
+        self.ban_dispatcher = BanDispatcher(self.outbox.sender(PRIORITY_ERROR), on_result=self._on_ban_result)
+        # 同一事件的多段回复合并为一条消息
+        self.reply_composer = ReplyComposer(self.outbox.sender(PRIORITY_ERROR), self._load_coalesce_replies())
         # 群消息来源映射
-        self.group_umo_mapping: Dict[int, Any] = {}
-        # 注册插件指令
-        self._register_commands()
-
-    def _register_commands(self):
-        """按照 AstrBot 文档注册插件指令，兼容不同的上下文实现"""
-        register_command = getattr(self.context, "register_command", None)
-        if not callable(register_command):
+        self.group_umo_mapping: Dict[str, Any] = self.state_backend.origins
+        self._games_snapshot_count = 0
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            self._start_warm_up()
+
+    def _start_warm_up(self) -> asyncio.Task:
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.ensure_future(self._warm_up())
+        return self._warm_up_task
+
+    async def _ensure_ready(self):
+        """等待预热完成，处理器在访问文本、开关或游戏状态前调用"""
+        if self._ready:
             return
+        await asyncio.shield(self._start_warm_up())
 
-        def _safe_register(name: str, handler, description: str, usage: str, aliases: List[str]):
-            try:
-                register_command(
-                    name=name,
-                    handler=handler,
-                    description=description,
-                    usage=usage,
-                    aliases=aliases,
-                )
-            except TypeError:
-                try:
-                    register_command(
-                        name,
-                        handler,
-                        description=description,
-                        usage=usage,
-                        aliases=aliases,
-                    )
-                except TypeError:
-                    register_command(name, handler)
-
-        _safe_register(
-            name="装填",
-            handler=self.command_load,
-            description="装填左轮手枪的实弹数量",
-            usage="/装填 [1-6]",
-            aliases=["装填", "/装填"],
-        )
-        _safe_register(
-            name="开枪",
-            handler=self.command_shoot,
-            description="扣动扳机进行射击",
-            usage="/开枪",
-            aliases=["开枪", "/开枪"],
-        )
-        _safe_register(
-            name="走火开",
-            handler=self.command_misfire_on,
-            description="开启当前群聊的随机走火功能",
-            usage="/走火开",
-            aliases=["走火开", "/走火开"],
-        )
-        _safe_register(
-            name="走火关",
-            handler=self.command_misfire_off,
-            description="关闭当前群聊的随机走火功能",
-            usage="/走火关",
-            aliases=["走火关", "/走火关"],
-        )
+    async def _warm_up(self):
+        """在线程池中完成文件加载，再回到事件循环恢复游戏与启动后台任务"""
+        loop = asyncio.get_running_loop()
+        snapshot = None
+        try:
+            snapshot = await loop.run_in_executor(None, self._load_persistent_state)
+        except Exception as e:
+            logger.error(f"Failed to initialize revolver game state: {e}")
+        if snapshot is not None:
+            self._apply_games_snapshot(*snapshot)
+        self._ready = True
+        self._ensure_background_tasks()
+
+    def _load_persistent_state(self):
+        """同步加载文本与游戏快照、迁移旧版走火开关（在线程池中执行）"""
+        os.makedirs(self.plugin_dir, exist_ok=True)
+        self.state_backend.open()
+        try:
+            self._ensure_texts_file()
+            self._load_texts()
+        except Exception as e:
+            logger.error(f"Failed to load texts: {e}")
+        try:
+            self._migrate_legacy_misfire_switches()
+        except Exception as e:
+            logger.error(f"Failed to migrate misfire switches: {e}")
+        try:
+            self.group_settings.load(self.state_store.load_group_overrides())
+        except Exception as e:
+            logger.error(f"Failed to load group settings: {e}")
+        if self.state_backend.shared:
+            # 共享后端中的游戏本身已持久化，不读取本地快照
+            return None
+        return self._read_games_snapshot()
 
     def _initialize_config(self, config: Optional[AstrBotConfig]) -> Dict[str, Any]:
         """解析并缓存插件配置"""
@@ -223,37 +364,224 @@ class RevolverGamePlugin(Star):
     def _load_timeout_seconds(self) -> int:
         return self._get_int_config('timeout_seconds', DEFAULT_TIMEOUT_SECONDS, minimum=1)
 
+    def _load_chamber_count(self) -> int:
+        chamber_count = self._get_int_config('chamber_count', CHAMBER_COUNT, minimum=1)
+        return min(chamber_count, MAX_CHAMBER_COUNT)
+
     def _load_default_misfire_switch(self) -> bool:
         return self._get_bool_config('misfire_enabled_by_default', False)
 
+    def _load_group_cache_size(self) -> int:
+        return self._get_int_config('group_cache_size', DEFAULT_GROUP_CACHE_SIZE, minimum=1)
+
+    def _load_flood_limits(self) -> Tuple[float, float]:
+        user_per_minute = max(0.0, self._get_float_config('flood_user_per_minute', DEFAULT_USER_PER_MINUTE))
+        group_per_minute = max(0.0, self._get_float_config('flood_group_per_minute', DEFAULT_GROUP_PER_MINUTE))
+        return user_per_minute, group_per_minute
+
+    def _load_outbound_limits(self) -> Tuple[float, float]:
+        platform_per_minute = max(
+            0.0, self._get_float_config('outbound_platform_per_minute', DEFAULT_PLATFORM_PER_MINUTE)
+        )
+        group_per_minute = max(0.0, self._get_float_config('outbound_group_per_minute', DEFAULT_SESSION_PER_MINUTE))
+        return platform_per_minute, group_per_minute
+
+    def _load_coalesce_replies(self) -> bool:
+        return self._get_bool_config('coalesce_replies', True)
+
+    def _load_state_backend_name(self) -> str:
+        name = str(self.config.get('state_backend', STATE_BACKEND_MEMORY) if self.config else STATE_BACKEND_MEMORY)
+        name = name.strip().lower()
+        if name not in STATE_BACKENDS:
+            logger.error(f"Unknown state backend {name!r}, falling back to {STATE_BACKEND_MEMORY}")
+            return STATE_BACKEND_MEMORY
+        return name
+
     def _load_texts(self):
-        """加载游戏文本，多编码尝试"""
+        """加载游戏文本，文件缺失或为空时使用默认文本"""
         if self._cached_texts is not None:
             return self._cached_texts
-
-        encodings = ['utf-8', 'gbk', 'gb2312']
-        for encoding in encodings:
-            try:
-                with open(self.texts_file, 'r', encoding=encoding) as file:
-                    loaded = yaml.safe_load(file) or {}
-                    self._cached_texts = loaded
-                    break
-            except UnicodeDecodeError:
-                continue
-            except FileNotFoundError:
-                break
-        else:
-            self._cached_texts = {}
-
+        self._reload_text_pool()
         if not self._cached_texts:
             self._cached_texts = self._load_default_texts()
         self.texts = self._cached_texts
         return self._cached_texts
 
+    def _reload_text_pool(self) -> bool:
+        """文本文件内容变化时重新编译文本池并整体替换"""
+        result = self._text_watcher.read_if_changed()
+        if result is None:
+            return False
+        loaded, digest = result
+        self.text_pool = compile_texts(
+            loaded, self._load_default_texts(), DEFAULT_FALLBACK_TEXTS, digest=digest
+        )
+        self._cached_texts = loaded or self._load_default_texts()
+        self.texts = self._cached_texts
+        return True
+
+    async def _text_reload_loop(self):
+        """定期检查文本文件，变化时在线程池中重新解析"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(TEXT_RELOAD_INTERVAL)
+            if not self._text_watcher.changed():
+                continue
+            try:
+                if await loop.run_in_executor(None, self._reload_text_pool):
+                    logger.info(f"Reloaded revolver game texts ({self.text_pool.digest[:8]})")
+            except Exception as e:
+                logger.error(f"Failed to reload texts: {e}")
+
+    def _ensure_background_tasks(self):
+        """在事件循环中启动插件后台任务"""
+        if self._background_tasks:
+            return
+        self._background_tasks.append(asyncio.ensure_future(self._text_reload_loop()))
+        self._background_tasks.append(asyncio.ensure_future(self._metrics_snapshot_loop()))
+        if self.state_backend.shared:
+            self._background_tasks.append(asyncio.ensure_future(self._lease_sweep_loop()))
+        else:
+            self._background_tasks.append(asyncio.ensure_future(self._games_snapshot_loop()))
+        self.timeout_wheel.start()
+
+    async def _lease_sweep_loop(self):
+        """共享后端下定期接管租约过期的超时，并同步其他进程修改的走火开关与按群参数"""
+        while True:
+            await asyncio.sleep(LEASE_SWEEP_INTERVAL)
+            try:
+                await self._sweep_shared_state()
+            except Exception as e:
+                logger.error(f"Failed to sweep shared revolver state: {e}")
+
+    async def _sweep_shared_state(self):
+        for group_id in await self.state_backend.expired_leases():
+            await self.timeout_callback(group_id)
+        for group_id in await self.group_switches.refresh():
+            self.misfire_countdown.reset(group_id)
+        self.group_settings.load(await self.state_store.call(self.state_store.load_group_overrides))
+
+    def _collect_games_snapshot(self) -> List[GameSnapshot]:
+        """收集仍在等待超时的游戏及其剩余时间"""
+        games = []
+        for group_id, state in self.group_states.items():
+            remaining = self.timeout_wheel.remaining(group_id)
+            origin = self.group_umo_mapping.get(group_id)
+            if remaining is None or not origin:
+                continue
+            games.append(GameSnapshot(
+                group_id, state.chamber_count, state.current_chamber_index,
+                state.live_rounds, state.chambers, remaining, str(origin),
+            ))
+        return games
+
+    def _read_games_snapshot(self):
+        """读取游戏快照文件，返回 (保存时间, 游戏列表)，不存在或损坏时返回 None"""
+        try:
+            return read_snapshot_file(self.games_snapshot_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, SnapshotError, UnicodeDecodeError) as e:
+            logger.error(f"Failed to restore games snapshot: {e}")
+            return None
+
+    def _apply_games_snapshot(self, saved_at: float, games: List[GameSnapshot]):
+        """按剩余时间重新计时恢复的游戏，已过期的会在下一个刻度超时"""
+        elapsed = max(time.time() - saved_at, 0.0)
+        for game in games:
+            # 旧版本的快照可能以整数群号保存
+            group_id = str(game.group_id)
+            self.group_states[group_id] = GameState(
+                game.chamber_count, game.chambers, game.current_chamber_index, game.live_rounds
+            )
+            self.group_umo_mapping[group_id] = game.origin
+            self.timeout_wheel.schedule(group_id, max(game.remaining - elapsed, 0.0))
+        self._games_snapshot_count = len(games)
+        if games:
+            logger.info(f"Restored {len(games)} revolver games from snapshot")
+
+    def _save_games_snapshot(self) -> Optional[bytes]:
+        """编码游戏快照，没有游戏且上次也为空时返回 None 跳过写入"""
+        if self.state_backend.shared:
+            return None
+        games = self._collect_games_snapshot()
+        if not games and not self._games_snapshot_count:
+            return None
+        self._games_snapshot_count = len(games)
+        return encode_snapshot(games)
+
+    async def _games_snapshot_loop(self):
+        """定期保存进行中的游戏，写文件在线程池中执行"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(GAMES_SNAPSHOT_INTERVAL)
+            data = self._save_games_snapshot()
+            if data is None:
+                continue
+            try:
+                await loop.run_in_executor(None, write_snapshot_file, self.games_snapshot_file, data)
+            except Exception as e:
+                logger.error(f"Failed to write games snapshot: {e}")
+
+    def _metric_gauges(self) -> Dict[str, Tuple[float, str]]:
+        ban_stats = self.ban_dispatcher.stats()
+        outbox_stats = self.outbox.stats()
+        return {
+            'active_games': (len(self.group_states), '进行中的游戏数'),
+            'tracked_groups': (len(self.group_switches), '内存中的群走火开关数'),
+            'group_cache_loads_total': (self.group_switches.loads, '从状态存储读取群走火开关的次数'),
+            'group_overrides': (len(self.group_settings), '设置了独立游戏参数的群数'),
+            'dedup_entries': (len(self.dedup) if self.dedup else 0, '去重缓存中的消息 id 数'),
+            'dedup_checked_total': (self.dedup.checked if self.dedup else 0, '经过去重检查的消息数'),
+            'dedup_duplicates_total': (self.dedup.duplicates if self.dedup else 0, '被识别为重投而丢弃的消息数'),
+            'dedup_hit_rate': (round(self.dedup.hit_rate, 6) if self.dedup else 0.0, '去重缓存命中率'),
+            'flood_buckets': (self.flood_control.buckets, '内存中的限流令牌桶数'),
+            'flood_dropped_total': (self.flood_control.dropped, '被限流丢弃的指令数'),
+            'group_cache_evictions_total': (self.group_switches.evictions, '被淘汰的空闲群数'),
+            'pending_timeouts': (len(self.timeout_wheel), '等待超时的群数'),
+            'ban_queue_depth': (ban_stats['queue_depth'], '等待执行的禁言数'),
+            'ban_in_flight': (ban_stats['in_flight'], '执行中的禁言数'),
+            'bans_succeeded_total': (ban_stats['succeeded'], '禁言成功次数'),
+            'bans_failed_total': (ban_stats['failed'], '禁言最终失败次数'),
+            'bans_coalesced_total': (ban_stats['coalesced'], '被合并的禁言请求数'),
+            'ban_retries_total': (ban_stats['retries'], '禁言重试次数'),
+            'ban_latency_avg_seconds': (round(ban_stats['latency_avg'], 6), '禁言从提交到完成的平均耗时'),
+            'ban_latency_max_seconds': (round(ban_stats['latency_max'], 6), '禁言从提交到完成的最大耗时'),
+            'outbound_queue_depth': (outbox_stats['queue_depth'], '等待发送的主动消息数'),
+            'outbound_queue_depth_reply': (outbox_stats['depth_reply'], '等待发送的回复数'),
+            'outbound_queue_depth_timeout': (outbox_stats['depth_timeout'], '等待发送的超时提示数'),
+            'outbound_queue_depth_error': (outbox_stats['depth_error'], '等待发送的错误提示数'),
+            'outbound_queue_depth_report': (outbox_stats['depth_report'], '等待发送的管理员报告数'),
+            'outbound_sent_total': (outbox_stats['sent'], '主动发送成功的消息数'),
+            'outbound_failed_total': (outbox_stats['failed'], '主动发送失败的消息数'),
+            'outbound_dropped_stale_total': (outbox_stats['dropped_stale'], '排队过久而丢弃的提示数'),
+            'outbound_dropped_full_total': (outbox_stats['dropped_full'], '队列已满而拒绝的提示数'),
+            'outbound_throttled_total': (outbox_stats['throttled'], '因令牌不足被推迟发送的次数'),
+            'outbound_wait_max_seconds': (round(outbox_stats['wait_max'], 6), '主动消息的最长排队时间'),
+            'replies_saved_total': (self.reply_composer.saved, '合并回复节省的消息发送次数'),
+            'stats_cached_players': (self.player_stats.cached_players, '内存中缓存的玩家统计数'),
+            'stats_pending_players': (self.player_stats.pending_players, '等待写入的玩家统计数'),
+            'journal_events_total': (self.journal.events if self.journal else 0, '写入游戏事件日志的事件数'),
+            'journal_dropped_total': (self.journal.dropped if self.journal else 0, '写入失败而丢弃的日志事件数'),
+        }
+
+    async def _metrics_snapshot_loop(self):
+        """定期把指标快照写入插件数据目录"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(METRICS_SNAPSHOT_INTERVAL)
+            content = self.metrics.render_prometheus(self._metric_gauges(), self.metric_labels)
+            try:
+                await loop.run_in_executor(None, write_snapshot, self.metrics_file, content)
+            except Exception as e:
+                logger.error(f"Failed to write metrics snapshot: {e}")
+
     def _load_default_texts(self) -> Dict[str, Any]:
         if self._default_texts is not None:
             return self._default_texts
 
+        import yaml
+
         try:
             with open(DEFAULT_TEXTS_FILE, 'r', encoding='utf-8') as file:
                 self._default_texts = yaml.safe_load(file) or {}
@@ -264,168 +592,482 @@ class RevolverGamePlugin(Star):
     def _ensure_texts_file(self):
         if os.path.exists(self.texts_file):
             return
-        default_texts = self._load_default_texts()
         if os.path.exists(DEFAULT_TEXTS_FILE):
             shutil.copy(DEFAULT_TEXTS_FILE, self.texts_file)
         else:
+            import yaml
+
             default_texts = {key: value[:] for key, value in DEFAULT_FALLBACK_TEXTS.items()}
             with open(self.texts_file, 'w', encoding='utf-8') as file:
                 yaml.dump(default_texts, file, allow_unicode=True)
-        self._cached_texts = {
-            key: (value[:] if isinstance(value, list) else value)
-            for key, value in default_texts.items()
-        }
-
-    def _get_text_list(self, key: str) -> List[str]:
-        texts = self._load_texts()
-        values = texts.get(key)
-        if not values or not isinstance(values, list):
-            values = self._load_default_texts().get(key, [])
-        return values if isinstance(values, list) else []
 
     def _choose_text(self, key: str) -> str:
-        choices = self._get_text_list(key)
-        if choices:
-            return random.choice(choices)
-        fallback_choices = DEFAULT_FALLBACK_TEXTS.get(key, [])
-        return random.choice(fallback_choices) if fallback_choices else ""
-
-    def _load_misfire_switches(self):
-        """从配置文件加载走火开关信息"""
-        texts = self._load_texts()
-        switches = texts.get('misfire_switches', {}) or {}
-        normalized: Dict[Any, bool] = {}
-        for key, value in dict(switches).items():
+        template = self.text_pool.choose(key)
+        return template.raw if template is not None else ""
+
+    def _render_text(self, key: str, sender_nickname: str) -> str:
+        template = self.text_pool.choose(key)
+        return template.render(sender_nickname) if template is not None else ""
+
+    def _migrate_legacy_misfire_switches(self):
+        """将旧版本保存在文本文件里的 misfire_switches 一次性导入状态存储"""
+        if self.state_store.get_meta(SWITCH_MIGRATION_META_KEY):
+            return
+        legacy = self._load_texts().get('misfire_switches') or {}
+        if isinstance(legacy, dict):
+            # 与默认值相同的开关不需要保存
+            legacy = {key: value for key, value in legacy.items() if bool(value) != self.default_misfire_enabled}
+        if isinstance(legacy, dict) and legacy:
+            self.state_store.import_switches(legacy)
+            logger.info(f"Migrated {len(legacy)} misfire switches into {STATE_DB_FILENAME}")
+        self.state_store.set_meta(SWITCH_MIGRATION_META_KEY, '1')
+
+    async def terminate(self):
+        """插件卸载时停止后台任务并提交尚未落盘的状态"""
+        for task in self._background_tasks:
+            task.cancel()
+        self._background_tasks.clear()
+        self.timeout_wheel.stop()
+        # 已结束的游戏不会进入快照，其超时提示若随关闭丢弃便无从补发：停止限速，按积压数量放宽等待时间
+        self.outbox.unthrottle()
+        drain_seconds = min(
+            OUTBOX_DRAIN_SECONDS + self.outbox.depths[PRIORITY_TIMEOUT] * OUTBOX_DRAIN_SECONDS_PER_MESSAGE,
+            OUTBOX_DRAIN_MAX_SECONDS,
+        )
+        if not await self.outbox.drain(PRIORITY_TIMEOUT, drain_seconds):
+            logger.warning(f"{self.outbox.depths[PRIORITY_TIMEOUT]} timeout notices still queued at shutdown")
+        data = self._save_games_snapshot()
+        if data is not None:
             try:
-                normalized[int(key)] = bool(value)
-            except (TypeError, ValueError):
-                normalized[key] = bool(value)
-        return normalized
-
-    def _save_misfire_switches(self):
-        """保存走火开关信息到配置文件"""
-        texts = self._load_texts()
-        if 'misfire_switches' not in texts:
-            texts['misfire_switches'] = {}
-        texts['misfire_switches'].update(self.group_misfire_switches)
-        with open(self.texts_file, 'w', encoding='utf-8') as file:
-            yaml.dump(texts, file, allow_unicode=True)
-        self._cached_texts = texts
-        self.texts = texts
+                write_snapshot_file(self.games_snapshot_file, data)
+            except Exception as e:
+                logger.error(f"Failed to write games snapshot: {e}")
+        await self.profiler.close()
+        # 分析已经结束，报告任务随即把报告放入发送队列；仍未完成的直接取消
+        if self._report_tasks:
+            _done, pending = await asyncio.wait(list(self._report_tasks), timeout=REPORT_TASK_GRACE_SECONDS)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self.ban_dispatcher.close()
+        await self.outbox.close()
+        await self.player_stats.close()
+        if self.journal is not None:
+            await self.journal.close()
+        await self.state_store.close()
+        await self.state_backend.close()
+        try:
+            if self.state_backend.shared:
+                # 进程退出后不再留下会被一直采集的旧指标文件
+                if os.path.exists(self.metrics_file):
+                    os.remove(self.metrics_file)
+            else:
+                write_snapshot(self.metrics_file, self.metrics.render_prometheus(self._metric_gauges()))
+        except Exception as e:
+            logger.error(f"Failed to write metrics snapshot: {e}")
 
     @event_message_type(EventMessageType.ALL)
     async def on_all_messages(self, event: AstrMessageEvent, message: str = ""):
-        """处理所有消息，仅用于检查随机走火"""
-        group_id = self._get_group_id(event)
-        is_private = not group_id  # 判断是否为私聊
+        """所有消息的唯一入口：指令只经前缀表匹配一次并交给对应处理器，其余群消息检查随机走火"""
+        self.metrics.messages += 1
         raw_message = message if message is not None else ""
         message_str = (raw_message or event.message_str or "").strip()
-
-        if is_private:
-            if self._is_registered_command(message_str):
-                yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+        matched = self.command_table.match(message_str)
+        if matched is not None:
+            # 是否唤醒只看框架的唤醒标记（唤醒前缀可自定义，且可能已被框架去掉）；未唤醒的指令词既不执行也不触发走火
+            if getattr(event, 'is_at_or_wake_command', False):
+                if self._is_redelivery(event):
+                    return
+                route, argument_start = matched
+                async for result in self._dispatch_command(event, route, message_str[argument_start:].strip()):
+                    # 回复经框架直接发出，只扣除发送额度，排队中的提示随之让路
+                    self.outbox.charge(event.unified_msg_origin)
+                    yield result
             return
 
-        self._init_group_misfire_switch(group_id)
+        # 普通消息每 MESSAGE_TIMING_SAMPLE 条计时一次，走火分支总是计时；只用局部变量，不为每条消息分配对象
+        started = None if self.metrics.messages % MESSAGE_TIMING_SAMPLE else time.perf_counter()
+        elapsed = 0.0
+        try:
+            if not self._ready:
+                await self._ensure_ready()
+            group_id = self._get_group_id(event)
+            if not group_id:
+                # 私聊中的普通消息不参与游戏
+                return
+
+            enabled = self.group_switches.cached(group_id)
+            if enabled is None:
+                enabled = await self.group_switches.get(group_id)
+            if not enabled:
+                return
+
+            # 内联 MisfireCountdown.tick：普通消息只做一次递减，归零时才调用 fire
+            countdown = self.misfire_countdown
+            countdown.remaining -= 1
+            if not countdown.remaining and countdown.fire(group_id):
+                if self._is_redelivery(event):
+                    return
+                self.metrics.misfires += 1
+                if started is None:
+                    started = time.perf_counter()
+                async for result in self._handle_misfire(event, group_id):
+                    self.outbox.charge(event.unified_msg_origin)
+                    # 停在 yield 处由框架发送回复的时间不计入
+                    elapsed += time.perf_counter() - started
+                    started = None
+                    yield result
+                    started = time.perf_counter()
+        finally:
+            if started is not None:
+                self.metrics.observe(HANDLER_ON_ALL_MESSAGES, elapsed + time.perf_counter() - started)
+
+    # 以下方法只向框架登记指令，使其出现在指令列表与帮助中；实际处理统一由 on_all_messages 经指令前缀表分发
+    @command("装填")
+    async def registered_load(self, event: AstrMessageEvent, message: str = ""):
+        """装填左轮手枪的实弹数量：/装填 [子弹数]"""
+
+    @command("开枪")
+    async def registered_shoot(self, event: AstrMessageEvent, message: str = ""):
+        """扣动扳机进行射击：/开枪"""
+
+    @command("走火开")
+    async def registered_misfire_on(self, event: AstrMessageEvent, message: str = ""):
+        """开启当前群聊的随机走火功能：/走火开"""
+
+    @command("走火关")
+    async def registered_misfire_off(self, event: AstrMessageEvent, message: str = ""):
+        """关闭当前群聊的随机走火功能：/走火关"""
+
+    @command("排行榜")
+    async def registered_leaderboard(self, event: AstrMessageEvent, message: str = ""):
+        """查看本群累计禁言时长排行：/排行榜"""
+
+    @command("rg状态")
+    async def registered_status(self, event: AstrMessageEvent, message: str = ""):
+        """（管理员）查看插件运行指标：/rg状态"""
+
+    @command("rg性能")
+    async def registered_profile(self, event: AstrMessageEvent, message: str = ""):
+        """（管理员）限时采集性能剖析：/rg性能 [秒数] [内存] 或 /rg性能 停止"""
+
+    @command("rg群设置")
+    async def registered_group_settings(self, event: AstrMessageEvent, message: str = ""):
+        """（管理员）查看或修改本群游戏参数：/rg群设置 [参数 值|重置]"""
+
+    def _is_redelivery(self, event: AstrMessageEvent) -> bool:
+        """登记会产生副作用的消息（执行的指令、触发走火的消息），重投时返回 True 以丢弃，避免重复开枪或重复禁言
+
+        普通聊天消息不登记，去重缓存的容量只留给这类消息，实际去重窗口不会被闲聊挤短。
+        """
+        if self.dedup is None:
+            return False
+        message_id = getattr(event.message_obj, 'message_id', None)
+        return bool(message_id) and self.dedup.seen((event.unified_msg_origin, message_id))
 
-        if self._is_registered_command(message_str):
+    async def _dispatch_command(self, event: AstrMessageEvent, route: CommandRoute, argument_text: str):
+        """把指令交给对应处理器，argument_text 为指令名之后的文本"""
+        if route.admin_only and not event.is_admin():
+            yield event.plain_result("该指令仅限管理员使用。")
             return
+        if route.rate_limited and self.flood_control.enabled:
+            group_id = self._get_group_id(event)
+            if group_id:
+                verdict = self.flood_control.check(group_id, event.get_sender_id())
+                if verdict != FLOOD_ALLOWED:
+                    # 超限请求直接丢弃，每个群在提醒间隔内只提醒一次
+                    if verdict == FLOOD_DROPPED_NOTIFY:
+                        yield event.plain_result(f"{event.get_sender_name()}，操作太频繁了，请稍后再试。")
+                    return
+        handler = getattr(self, route.handler)
+        async for result in handler(event, argument_text):
+            yield result
 
-        if not self.group_misfire_switches[group_id]:
-            return
+    async def command_load(self, event: AstrMessageEvent, message: str = ""):
+        # 耗时只统计插件自身的处理，不含等待群锁与框架发送回复
+        timer = HandlerTimer()
+        try:
+            if not self._ready:
+                await self._ensure_ready()
+            group_id = self._get_group_id(event)
+            if not group_id:
+                timer.pause()
+                yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+                return
+            num_bullets = self._parse_bullet_count(message)
+            if num_bullets is None:
+                timer.pause()
+                yield event.plain_result("你输入的装填子弹数量不是有效的整数，请重新输入。")
+                return
+            # 锁内只算出回复，释放锁后再交给框架发送，同群后续操作不必等待网络发送
+            timer.pause()
+            async with self.group_serializer.hold(group_id):
+                timer.resume()
+                results = [result async for result in self.load_bullets(event, num_bullets)]
+            timer.pause()
+            for result in results:
+                yield result
+        finally:
+            self.metrics.observe(HANDLER_LOAD, timer.stop())
 
-        if random.random() <= self.misfire_probability:
-            async for result in self._handle_misfire(event, group_id):
+    async def command_shoot(self, event: AstrMessageEvent, message: str = ""):
+        timer = HandlerTimer()
+        try:
+            if not self._ready:
+                await self._ensure_ready()
+            group_id = self._get_group_id(event)
+            if not group_id:
+                timer.pause()
+                yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+                return
+            timer.pause()
+            async with self.group_serializer.hold(group_id):
+                timer.resume()
+                results = [result async for result in self.execute_shot(event)]
+            timer.pause()
+            for result in results:
                 yield result
+        finally:
+            self.metrics.observe(HANDLER_SHOOT, timer.stop())
 
-    def _is_registered_command(self, message_str: str) -> bool:
-        """判断消息是否为已注册的指令，避免和随机走火冲突"""
-        if not message_str:
-            return False
-        normalized = message_str.lstrip('/').split()
-        if not normalized:
-            return False
-        return normalized[0] in self.COMMAND_KEYWORDS
+    async def command_misfire_on(self, event: AstrMessageEvent, message: str = ""):
+        timer = HandlerTimer()
+        try:
+            if not self._ready:
+                await self._ensure_ready()
+            group_id = self._get_group_id(event)
+            if not group_id:
+                timer.pause()
+                yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+                return
+            result = await self._handle_misfire_switch_on(event, group_id)
+            timer.pause()
+            yield result
+        finally:
+            self.metrics.observe(HANDLER_MISFIRE_SWITCH, timer.stop())
 
-    @command("装填", aliases=["/装填"])
-    async def command_load(self, event: AstrMessageEvent, message: str = ""):
-        group_id = self._get_group_id(event)
-        if not group_id:
-            yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+    async def command_misfire_off(self, event: AstrMessageEvent, message: str = ""):
+        timer = HandlerTimer()
+        try:
+            if not self._ready:
+                await self._ensure_ready()
+            group_id = self._get_group_id(event)
+            if not group_id:
+                timer.pause()
+                yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+                return
+            result = await self._handle_misfire_switch_off(event, group_id)
+            timer.pause()
+            yield result
+        finally:
+            self.metrics.observe(HANDLER_MISFIRE_SWITCH, timer.stop())
+
+    async def command_status(self, event: AstrMessageEvent, message: str = ""):
+        """管理员查看插件运行指标"""
+        yield event.plain_result(self._format_status())
+
+    async def command_profile(self, event: AstrMessageEvent, message: str = ""):
+        """管理员按需开启限时性能分析：/rg性能 [秒数] [内存]，/rg性能 停止"""
+        arguments = (message or "").split()
+        if arguments and arguments[0] in ("停止", "stop"):
+            if self.profiler.stop():
+                yield event.plain_result("正在结束性能分析，结果写入后会发送到本会话。")
+            else:
+                yield event.plain_result("当前没有进行中的性能分析。")
             return
-        self._init_group_misfire_switch(group_id)
-        num_bullets = self._parse_bullet_count(message)
-        if num_bullets is None:
-            yield event.plain_result("你输入的装填子弹数量不是有效的整数，请重新输入。")
+        seconds = DEFAULT_PROFILE_SECONDS
+        trace_memory = False
+        for argument in arguments:
+            if argument in ("内存", "memory"):
+                trace_memory = True
+            elif argument.isdigit() and int(argument) > 0:
+                seconds = min(int(argument), MAX_PROFILE_SECONDS)
+            else:
+                yield event.plain_result(f"用法：/rg性能 [秒数，最长 {MAX_PROFILE_SECONDS}] [内存]，或 /rg性能 停止")
+                return
+        try:
+            task = self.profiler.start(seconds, trace_memory)
+        except Exception as e:
+            logger.error(f"Failed to start profiler: {e}")
+            yield event.plain_result("性能分析启动失败，请查看日志。")
             return
-        async for result in self.load_bullets(event, num_bullets):
-            yield result
-
-    @command("开枪", aliases=["/开枪"])
-    async def command_shoot(self, event: AstrMessageEvent, message: str = ""):
-        group_id = self._get_group_id(event)
-        if not group_id:
-            yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+        if task is None:
+            yield event.plain_result("已有性能分析在进行中，可用 /rg性能 停止 提前结束。")
             return
-        self._init_group_misfire_switch(group_id)
-        async for result in self.execute_shot(event):
-            yield result
-
-    @command("走火开", aliases=["/走火开"])
-    async def command_misfire_on(self, event: AstrMessageEvent, message: str = ""):
+        report_task = asyncio.ensure_future(self._report_profile(task, event.unified_msg_origin))
+        self._report_tasks.add(report_task)
+        report_task.add_done_callback(self._report_tasks.discard)
+        memory_note = "，同时记录内存分配差异" if trace_memory else ""
+        yield event.plain_result(f"已开始 {seconds} 秒的性能分析{memory_note}，结束后结果写入插件数据目录的 {PROFILE_DIRNAME}/。")
+
+    async def _report_profile(self, task: asyncio.Task, origin):
+        """分析结束后把输出文件与插件内耗时最多的函数发回发起会话"""
+        try:
+            report = await task
+        except Exception as e:
+            logger.error(f"Failed to profile revolver game plugin: {e}")
+            message = "性能分析失败，请查看日志。"
+        else:
+            lines = [f"性能分析完成（{report.seconds:.1f} 秒），已写入："]
+            lines.extend(f"- {os.path.basename(path)}" for path in report.files)
+            if report.summary:
+                lines.append("插件内自身耗时最多的函数：")
+                lines.extend(f"- {line}" for line in report.summary)
+            message = "\n".join(lines)
+        self.outbox.send(origin, message, PRIORITY_REPORT)
+
+    async def command_group_settings(self, event: AstrMessageEvent, message: str = ""):
+        """管理员查看或覆盖本群的游戏参数：/rg群设置 [参数 值|参数 默认]，/rg群设置 重置"""
+        if not self._ready:
+            await self._ensure_ready()
         group_id = self._get_group_id(event)
         if not group_id:
-            yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
+            yield event.plain_result("该指令仅限群聊中使用。")
             return
-        self._init_group_misfire_switch(group_id)
-        result = await self._handle_misfire_switch_on(event, group_id)
-        yield result
-
-    @command("走火关", aliases=["/走火关"])
-    async def command_misfire_off(self, event: AstrMessageEvent, message: str = ""):
+        arguments = (message or "").split()
+        if not arguments:
+            yield event.plain_result(self._format_group_settings(group_id))
+            return
+        try:
+            if len(arguments) == 1 and arguments[0] in ("重置", "reset"):
+                self.group_settings.clear(group_id)
+            elif len(arguments) == 2 and arguments[0] in OVERRIDE_ALIASES:
+                name = OVERRIDE_ALIASES[arguments[0]]
+                if arguments[1] in ("默认", "default"):
+                    self.group_settings.clear(group_id, name)
+                else:
+                    self.group_settings.set(group_id, name, parse_override(name, arguments[1]))
+            else:
+                yield event.plain_result(
+                    "用法：/rg群设置 [走火概率|超时|最短禁言|最长禁言|弹膛数] [值|默认]，或 /rg群设置 重置"
+                )
+                return
+        except ValueError as e:
+            yield event.plain_result(f"设置失败：{e}。")
+            return
+        try:
+            await self.state_store.call(
+                self.state_store.write_group_overrides, group_id, self.group_settings.overrides(group_id)
+            )
+        except Exception as e:
+            logger.error(f"Failed to save group settings: {e}")
+            yield event.plain_result("设置已生效，但保存失败，重启后会丢失，请查看日志。")
+            return
+        yield event.plain_result(self._format_group_settings(group_id))
+
+    def _format_group_settings(self, group_id) -> str:
+        settings = self.group_settings.get(group_id)
+        overrides = self.group_settings.overrides(group_id)
+        lines = ["本群游戏参数（标注“本群”的为独立设置，其余跟随全局配置）："]
+        for name, label, _kind in OVERRIDE_FIELDS:
+            source = "本群" if name in overrides else "全局"
+            lines.append(f"- {label}：{getattr(settings, name)}（{source}）")
+        return "\n".join(lines)
+
+    async def command_leaderboard(self, event: AstrMessageEvent, message: str = ""):
+        """查看本群累计禁言时长排行"""
+        if not self._ready:
+            await self._ensure_ready()
         group_id = self._get_group_id(event)
         if not group_id:
             yield event.plain_result("该游戏仅限群聊中使用，请在群内游玩。")
             return
-        self._init_group_misfire_switch(group_id)
-        result = await self._handle_misfire_switch_off(event, group_id)
-        yield result
+        players = await self.player_stats.top(str(group_id))
+        if not players:
+            yield event.plain_result("本群还没有人玩过左轮手枪。")
+            return
+        lines = ["本群左轮手枪排行榜（按累计禁言时长）："]
+        for rank, player in enumerate(players, 1):
+            lines.append(
+                f"{rank}. {player.nickname or player.user_id}：禁言 {self._format_duration(player.ban_seconds)}，"
+                f"中弹 {player.hits}/{player.shots} 枪，走火 {player.misfires} 次"
+            )
+        yield event.plain_result("\n".join(lines))
+
+    def _format_duration(self, seconds: int) -> str:
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f"{hours} 小时 {minutes} 分"
+        if minutes:
+            return f"{minutes} 分 {seconds} 秒"
+        return f"{seconds} 秒"
+
+    def _format_status(self) -> str:
+        metrics = self.metrics
+        gauges = self._metric_gauges()
+        uptime = int(time.time() - metrics.started_at)
+        lines = [
+            f"左轮手枪插件状态（运行 {uptime // 3600} 小时 {uptime % 3600 // 60} 分）",
+            f"消息 {metrics.messages}，走火 {metrics.misfires}，装填 {metrics.loads}，超时 {metrics.timeouts}",
+            f"开枪 {metrics.shots}（击中 {metrics.hits}，空枪 {metrics.misses}）",
+            f"禁言成功 {gauges['bans_succeeded_total'][0]}，失败 {gauges['bans_failed_total'][0]}，"
+            f"排队 {gauges['ban_queue_depth'][0]}，合并 {gauges['bans_coalesced_total'][0]}，"
+            f"平均耗时 {format_seconds(gauges['ban_latency_avg_seconds'][0])}",
+            f"进行中的游戏 {gauges['active_games'][0]}，缓存群 {gauges['tracked_groups'][0]}，"
+            f"合并回复节省发送 {gauges['replies_saved_total'][0]} 次，限流丢弃 {gauges['flood_dropped_total'][0]} 条，"
+            f"重投丢弃 {gauges['dedup_duplicates_total'][0]} 条",
+            f"待发送提示 {gauges['outbound_queue_depth'][0]} 条，已发送 {gauges['outbound_sent_total'][0]}，"
+            f"过期丢弃 {gauges['outbound_dropped_stale_total'][0]}，限速推迟 {gauges['outbound_throttled_total'][0]} 次",
+            "处理器耗时（次数 p50/p99）：",
+        ]
+        for name, histogram in zip(HANDLER_NAMES, metrics.handler_latency):
+            if not histogram.count:
+                continue
+            lines.append(
+                f"- {name}: {histogram.count} 次 "
+                f"{format_seconds(histogram.quantile(0.5))}/{format_seconds(histogram.quantile(0.99))}"
+            )
+        return "\n".join(lines)
 
-    def _get_group_id(self, event: AstrMessageEvent) -> Optional[int]:
-        """获取群id"""
-        return event.message_obj.group_id if hasattr(event.message_obj, "group_id") else None
+    def _get_group_id(self, event: AstrMessageEvent) -> Optional[str]:
+        """获取群id，统一为字符串：插件内以群号为键的表与状态库读回的记录都使用这一形式"""
+        group_id = getattr(event.message_obj, "group_id", None)
+        return str(group_id) if group_id else None
+
+    def _refresh_misfire_probability(self):
+        """重新读取走火概率，概率变化时倒计时会重新抽样"""
+        self.misfire_probability = self._load_misfire_probability()
+        self.misfire_countdown.set_probability(self.misfire_probability)
+        if self.group_settings.defaults.misfire_probability != self.misfire_probability:
+            self.group_settings.set_defaults(
+                self.group_settings.defaults._replace(misfire_probability=self.misfire_probability)
+            )
 
-    def _init_group_misfire_switch(self, group_id):
-        """初始化群走火开关"""
-        if group_id not in self.group_misfire_switches:
-            self.group_misfire_switches[group_id] = self.default_misfire_enabled
+    def _on_group_settings_changed(self, group_id, settings: GroupSettings):
+        """群的生效参数变化后，按需为该群设置独立的走火概率"""
+        overridden = 'misfire_probability' in self.group_settings.overrides(group_id)
+        self.misfire_countdown.set_group_probability(group_id, settings.misfire_probability if overridden else None)
 
     async def _handle_misfire_switch_on(self, event: AstrMessageEvent, group_id):
-        """开启群走火开关并保存信息"""
-        self.group_misfire_switches[group_id] = True
-        self._save_misfire_switches()
+        """开启群走火开关，由状态存储延迟保存"""
+        self.group_switches.set(group_id, True)
+        self._journal(EVENT_MISFIRE_SWITCH, group_id, event.get_sender_id(), flag=1)
+        self.misfire_countdown.reset(group_id)
+        self._refresh_misfire_probability()
         return event.plain_result("本群左轮手枪走火功能已开启！")
 
     async def _handle_misfire_switch_off(self, event: AstrMessageEvent, group_id):
-        """关闭群走火开关并保存信息"""
-        self.group_misfire_switches[group_id] = False
-        self._save_misfire_switches()
+        """关闭群走火开关，由状态存储延迟保存"""
+        self.group_switches.set(group_id, False)
+        self._journal(EVENT_MISFIRE_SWITCH, group_id, event.get_sender_id(), flag=0)
+        self.misfire_countdown.reset(group_id)
+        self._refresh_misfire_probability()
         return event.plain_result("本群左轮手枪走火功能已关闭！")
 
     async def _handle_misfire(self, event: AstrMessageEvent, group_id):
         """处理走火事件，禁言用户"""
-        sender_nickname = event.get_sender_name()
-        client = event.bot
+        async for result in self.reply_composer.compose(event, self._misfire_texts(event)):
+            yield result
 
+    async def _misfire_texts(self, event: AstrMessageEvent):
+        sender_nickname = event.get_sender_name()
+        self._journal(EVENT_MISFIRE, self._get_group_id(event), event.get_sender_id(), text=sender_nickname)
         misfire_desc = self._choose_text('misfire_descriptions')
-        user_reaction = self._choose_text('user_reactions').format(sender_nickname=sender_nickname)
-        message = f"{misfire_desc} {user_reaction} 不幸被击中！".strip()
-        try:
-            yield event.plain_result(message)
-        except Exception as e:
-            logger.error(f"Failed to handle misfire: {e}")
-            await self.context.send_message(event.unified_msg_origin, "消息发送失败，请稍后重试。")
-        await self._ban_user(event, client, int(event.get_sender_id()))
+        user_reaction = self._render_text('user_reactions', sender_nickname)
+        yield f"{misfire_desc} {user_reaction} 不幸被击中！".strip()
+        await self._ban_user(event, event.bot, int(event.get_sender_id()))
+        self._record_stats(event, misfires=1)
 
     def _parse_bullet_count(self, argument_text: str):
         """解析装填子弹数量，默认装填一发"""
@@ -441,149 +1083,165 @@ class RevolverGamePlugin(Star):
     async def load_bullets(self, event: AstrMessageEvent, x: int = 1):
         """装填子弹，检查并启动定时器"""
         sender_nickname = event.get_sender_name()
-        group_id = event.message_obj.group_id
-        group_state = self.group_states.get(group_id)
-
-        job_id = f"timeout_{group_id}"
-        self._remove_timer_job(job_id)
+        group_id = self._get_group_id(event)
+        group_state = await self.state_backend.get_game(group_id)
 
-        if group_state and 'chambers' in group_state and any(group_state['chambers']):
+        if group_state and group_state.is_active:
             yield event.plain_result(f"{sender_nickname}，游戏还未结束，不能重新装填，请继续射击！")
             return
 
-        if x < 1 or x > CHAMBER_COUNT:
-            yield event.plain_result(f"{sender_nickname}，装填的实弹数量必须在 1 到 6 之间，请重新输入。")
+        settings = self.group_settings.get(group_id)
+        chamber_count = settings.chamber_count
+        timeout_seconds = settings.timeout_seconds
+        if x < 1 or x > chamber_count:
+            yield event.plain_result(f"{sender_nickname}，装填的实弹数量必须在 1 到 {chamber_count} 之间，请重新输入。")
             return
 
-        chambers = [False] * CHAMBER_COUNT
-        positions = random.sample(range(CHAMBER_COUNT), x)
-        for pos in positions:
-            chambers[pos] = True
-
-        group_state = {
-            'chambers': chambers,
-            'current_chamber_index': 0
-        }
-        self.group_states[group_id] = group_state
+        created = await self.state_backend.create_game(
+            group_id, GameState.load(x, chamber_count), event.unified_msg_origin,
+            self.worker_id, time.time() + timeout_seconds,
+        )
+        if not created:
+            # 其他工作进程抢先装填
+            yield event.plain_result(f"{sender_nickname}，游戏还未结束，不能重新装填，请继续射击！")
+            return
+        self._cancel_timer(group_id)
+        self.metrics.loads += 1
+        self._journal(EVENT_LOAD, group_id, event.get_sender_id(), value=x, text=sender_nickname)
 
         load_message = (
-            f"{sender_nickname} 装填了 {x} 发实弹到 {CHAMBER_COUNT} 弹膛的左轮手枪，"
-            f"输入 /开枪 在 {self.timeout_seconds} 秒内开始游戏！"
+            f"{sender_nickname} 装填了 {x} 发实弹到 {chamber_count} 弹膛的左轮手枪，"
+            f"输入 /开枪 在 {timeout_seconds} 秒内开始游戏！"
         )
         yield event.plain_result(load_message)
-        self.start_timer(event, group_id, self.timeout_seconds)
+        self.start_timer(event, group_id, timeout_seconds)
 
     async def execute_shot(self, event: AstrMessageEvent):
-        """射击操作，处理结果"""
+        """射击操作，处理结果，命中与游戏结束提示合并为一条消息"""
+        async for result in self.reply_composer.compose(event, self._shot_texts(event)):
+            yield result
+
+    async def _shot_texts(self, event: AstrMessageEvent):
+        """依次产出一次射击的各段回复文本"""
         sender_nickname = event.get_sender_name()
-        group_id = event.message_obj.group_id
-        group_state = self.group_states.get(group_id)
+        group_id = self._get_group_id(event)
 
-        job_id = f"timeout_{group_id}"
-        self._remove_timer_job(job_id)
+        self._cancel_timer(group_id)
+        timeout_seconds = self.group_settings.get(group_id).timeout_seconds
 
-        if not group_state or 'chambers' not in group_state:
-            yield event.plain_result(f"{sender_nickname}，枪里好像没有子弹呢，请先装填。")
+        # 读出、击发、写回由状态后端原子完成
+        outcome = await self.state_backend.fire(
+            group_id, event.unified_msg_origin, self.worker_id, time.time() + timeout_seconds
+        )
+        if outcome is None:
+            self._journal(EVENT_SHOT, group_id, event.get_sender_id(), flag=SHOT_EMPTY_GUN, text=sender_nickname)
+            yield f"{sender_nickname}，枪里好像没有子弹呢，请先装填。"
             return
 
         client = event.bot
-        self.start_timer(event, group_id, self.timeout_seconds)
-
-        chambers = group_state['chambers']
-        current_index = group_state['current_chamber_index']
+        group_state = outcome.state
+        self._journal(
+            EVENT_SHOT, group_id, event.get_sender_id(), value=group_state.live_rounds,
+            flag=SHOT_HIT if outcome.hit else SHOT_MISS, text=sender_nickname,
+        )
+        self.start_timer(event, group_id, timeout_seconds)
 
-        if chambers[current_index]:
-            async for result in self._handle_real_shot(event, group_state, chambers, current_index, sender_nickname, client):
-                yield result
+        self.metrics.shots += 1
+        if outcome.hit:
+            self.metrics.hits += 1
+            async for text in self._handle_real_shot(event, sender_nickname, client):
+                yield text
         else:
-            async for result in self._handle_empty_shot(event, group_state, chambers, current_index, sender_nickname):
-                yield result
+            self.metrics.misses += 1
+            async for text in self._handle_empty_shot(event, sender_nickname):
+                yield text
 
-        remaining_bullets = sum(group_state['chambers'])
-        if remaining_bullets == 0:
-            self._remove_timer_job(job_id)
-            del self.group_states[group_id]
-            yield event.plain_result(f"{sender_nickname}，弹匣内的所有实弹都已射出，游戏结束。若想继续，可再次装填。")
+        if not group_state.is_active:
+            self._cancel_timer(group_id)
+            yield f"{sender_nickname}，弹匣内的所有实弹都已射出，游戏结束。若想继续，可再次装填。"
 
-    async def _handle_real_shot(self, event: AstrMessageEvent, group_state, chambers, current_index, sender_nickname, client):
-        """处理击中目标，更新状态并禁言用户"""
-        chambers[current_index] = False
-        group_state['current_chamber_index'] = (current_index + 1) % CHAMBER_COUNT
+    async def _handle_real_shot(self, event: AstrMessageEvent, sender_nickname, client):
+        """处理击中目标并禁言用户"""
         trigger_desc = self._choose_text('trigger_descriptions')
-        user_reaction = self._choose_text('user_reactions').format(sender_nickname=sender_nickname)
-        message = f"{trigger_desc}，{user_reaction}".strip('，').strip()
-        try:
-            yield event.plain_result(message)
-        except Exception as e:
-            logger.error(f"Failed to handle real shot: {e}")
-            await self.context.send_message(event.unified_msg_origin, "消息发送失败，请稍后重试。")
+        user_reaction = self._render_text('user_reactions', sender_nickname)
+        yield f"{trigger_desc}，{user_reaction}".strip('，').strip()
         await self._ban_user(event, client, int(event.get_sender_id()))
+        self._record_stats(event, shots=1, hits=1)
 
-    async def _handle_empty_shot(self, event: AstrMessageEvent, group_state, chambers, current_index, sender_nickname):
-        """处理未击中目标，更新状态"""
-        group_state['current_chamber_index'] = (current_index + 1) % CHAMBER_COUNT
-        miss_message = self._choose_text('miss_messages').format(sender_nickname=sender_nickname).strip()
-        try:
-            yield event.plain_result(miss_message)
-        except Exception as e:
-            logger.error(f"Failed to handle empty shot: {e}")
-            await self.context.send_message(event.unified_msg_origin, "消息发送失败，请稍后重试。")
+    async def _handle_empty_shot(self, event: AstrMessageEvent, sender_nickname):
+        """处理未击中目标"""
+        yield self._render_text('miss_messages', sender_nickname).strip()
+        self._record_stats(event, shots=1, misses=1)
 
     def start_timer(self, event: AstrMessageEvent, group_id, seconds):
-        """启动群定时器"""
-        umo = event.unified_msg_origin
-        self.group_umo_mapping[group_id] = umo
-
-        run_time = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
-        job_id = f"timeout_{group_id}"
-        self.scheduler.add_job(
-            self.timeout_callback,
-            'date',
-            run_date=run_time,
-            args=[group_id],
-            id=job_id,
-            replace_existing=True
-        )
+        """启动群定时器，消息来源已由状态后端随游戏一起保存"""
+        self.timeout_wheel.schedule(group_id, seconds)
 
     async def timeout_callback(self, group_id):
         """定时器超时，移除群游戏状态"""
-        umo = self.group_umo_mapping.pop(group_id, None)
-        if group_id in self.group_states:
-            del self.group_states[group_id]
-        if not umo:
-            return
-        timeout_message = "长时间未操作，当前左轮手枪游戏已自动结束。"
+        timer = HandlerTimer()
         try:
-            await self.context.send_message(umo, timeout_message)
-        except Exception as e:
-            logger.error(f"Failed to send timeout message: {e}")
-
-    async def _ban_user(self, event: AstrMessageEvent, client, user_id):
-        """禁言用户"""
+            timer.pause()
+            async with self.group_serializer.hold(group_id):
+                timer.resume()
+                if group_id in self.timeout_wheel:
+                    # 等待期间有人开枪或装填，超时已被重新计时
+                    return
+                # 共享后端下只有超时持有者（或租约过期后的接管者）能认领成功
+                umo = await self.state_backend.claim_timeout(group_id, self.worker_id)
+                if umo is not None:
+                    self.metrics.timeouts += 1
+                    self._journal(EVENT_TIMEOUT, group_id)
+            if not umo:
+                return
+            self.outbox.send(umo, "长时间未操作，当前左轮手枪游戏已自动结束。", PRIORITY_TIMEOUT)
+        finally:
+            self.metrics.observe(HANDLER_TIMEOUT, timer.stop())
+
+    async def _ban_user(self, event: AstrMessageEvent, client, user_id) -> int:
+        """提交禁言请求，由后台调度器执行与重试，返回禁言秒数（无法禁言时为 0）"""
         ban_method = getattr(client, 'set_group_ban', None)
-        ban_duration = random.randint(self.min_ban_seconds, self.max_ban_seconds)
+        settings = self.group_settings.get(self._get_group_id(event))
+        ban_duration = random.randint(settings.min_ban_seconds, settings.max_ban_seconds)
         if not callable(ban_method):
-            await self.context.send_message(event.unified_msg_origin, "机器人缺少禁言能力，无法执行左轮手枪惩罚。")
-            return
+            self.outbox.send(event.unified_msg_origin, "机器人缺少禁言能力，无法执行左轮手枪惩罚。", PRIORITY_ERROR)
+            return 0
+
+        self.ban_dispatcher.submit(
+            client,
+            group_id=int(event.get_group_id()),
+            user_id=user_id,
+            self_id=int(event.get_self_id()),
+            duration=ban_duration,
+            origin=event.unified_msg_origin,
+        )
+        self._journal(EVENT_BAN_REQUEST, self._get_group_id(event), user_id, value=ban_duration)
+        return ban_duration
+
+    def _journal(self, kind: int, group_id=None, user_id=None, value: int = 0, flag: int = 0, text: str = ''):
+        """记录游戏事件，未启用事件日志时忽略"""
+        if self.journal is not None:
+            self.journal.record(kind, group_id, user_id, value, flag, text)
 
+    def _on_ban_result(self, request, duration: int, succeeded: bool):
+        self._journal(EVENT_BAN_RESULT, request.group_id, request.user_id, value=duration, flag=int(succeeded))
+        if not succeeded:
+            return
+        # 禁言时长只在平台确认后计入，权限不足等失败的禁言不进入排行榜
         try:
-            await ban_method(
-                group_id=int(event.get_group_id()),
-                user_id=user_id,
-                duration=ban_duration,
-                self_id=int(event.get_self_id())
-            )
-        except PermissionError:
-            await self.context.send_message(event.unified_msg_origin, "机器人权限不足，无法禁言该成员。")
+            self.player_stats.record_nowait(str(request.group_id), request.user_id, ban_seconds=duration)
         except Exception as e:
-            logger.error(f"Failed to ban user: {e}")
-            await self.context.send_message(event.unified_msg_origin, "禁言失败，请检查机器人权限或稍后再试。")
+            logger.error(f"Failed to record player stats: {e}")
 
-    def _remove_timer_job(self, job_id):
-        """移除定时器任务"""
+    def _record_stats(self, event: AstrMessageEvent, **increments: int):
+        """累加发送者的玩家统计，不等待数据库读取，统计失败不影响游戏"""
         try:
-            self.scheduler.remove_job(job_id)
-        except JobLookupError:
-            return
+            self.player_stats.record_nowait(
+                str(self._get_group_id(event)), int(event.get_sender_id()), event.get_sender_name(), **increments
+            )
         except Exception as e:
-            logger.error(f"Failed to remove timer job: {e}")
+            logger.error(f"Failed to record player stats: {e}")
+
+    def _cancel_timer(self, group_id):
+        """取消群定时器"""
+        self.timeout_wheel.cancel(group_id)
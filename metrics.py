@@ -0,0 +1,151 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 处理器延迟分桶上界（秒），覆盖 50 微秒到 2.5 秒
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+HANDLER_ON_ALL_MESSAGES = 0
+HANDLER_LOAD = 1
+HANDLER_SHOOT = 2
+HANDLER_MISFIRE_SWITCH = 3
+HANDLER_TIMEOUT = 4
+HANDLER_NAMES = ('on_all_messages', 'command_load', 'command_shoot', 'misfire_switch', 'timeout_callback')
+# 不走火的普通消息每隔多少条计时一次，其余普通消息不调用计时器也不写直方图
+MESSAGE_TIMING_SAMPLE = 64
+
+COUNTER_HELP: Dict[str, str] = {
+    'messages': '进入 on_all_messages 的消息数',
+    'misfires': '随机走火次数',
+    'loads': '成功装填次数',
+    'shots': '开枪次数',
+    'hits': '击中次数',
+    'misses': '空枪次数',
+    'timeouts': '超时结束的游戏数',
+}
+
+
+class Histogram:
+    """预分桶直方图，observe 只做一次二分查找和两次累加"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """按分桶上界估算分位数，落在最后一个桶时返回 None（超出上界）"""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        running = 0
+        for index, bucket in enumerate(self.counts):
+            running += bucket
+            if running >= threshold:
+                return self.bounds[index] if index < len(self.bounds) else None
+        return None
+
+    def cumulative(self) -> Iterable[Tuple[str, int]]:
+        running = 0
+        for bound, bucket in zip(self.bounds, self.counts):
+            running += bucket
+            yield repr(bound), running
+        yield '+Inf', self.count
+
+
+class HandlerTimer:
+    """只累计处理器自身的耗时：暂停期间（等待群锁、停在 yield 处由框架发送回复）不计入"""
+
+    __slots__ = ('elapsed', '_started')
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._started: Optional[float] = time.perf_counter()
+
+    def pause(self):
+        if self._started is not None:
+            self.elapsed += time.perf_counter() - self._started
+            self._started = None
+
+    def resume(self):
+        if self._started is None:
+            self._started = time.perf_counter()
+
+    def stop(self) -> float:
+        self.pause()
+        return self.elapsed
+
+
+class PluginMetrics:
+    """插件内置指标：计数器 + 各处理器延迟直方图"""
+
+    __slots__ = tuple(COUNTER_HELP) + ('handler_latency', 'started_at')
+
+    def __init__(self):
+        for name in COUNTER_HELP:
+            setattr(self, name, 0)
+        self.handler_latency = tuple(Histogram() for _ in HANDLER_NAMES)
+        self.started_at = time.time()
+
+    def observe(self, handler: int, seconds: float):
+        self.handler_latency[handler].observe(seconds)
+
+    def counters(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in COUNTER_HELP}
+
+    def render_prometheus(self, gauges: Optional[Dict[str, Tuple[float, str]]] = None,
+                          labels: Optional[Dict[str, str]] = None) -> str:
+        """输出 Prometheus 文本格式快照，gauges 为 {名称: (数值, 说明)}，以 _total 结尾的按计数器输出；
+        labels 附加到每个样本上，用于区分共用同一目录的多个进程"""
+        extra = ''.join(f',{key}="{value}"' for key, value in (labels or {}).items())
+        label_set = f"{{{extra[1:]}}}" if extra else ''
+        lines: List[str] = []
+        for name, help_text in COUNTER_HELP.items():
+            metric = f"rg_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{label_set} {getattr(self, name)}")
+        for name, (value, help_text) in (gauges or {}).items():
+            metric = f"rg_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {'counter' if name.endswith('_total') else 'gauge'}")
+            lines.append(f"{metric}{label_set} {value}")
+        metric = 'rg_handler_latency_seconds'
+        lines.append(f"# HELP {metric} 插件处理器耗时")
+        lines.append(f"# TYPE {metric} histogram")
+        for handler, histogram in zip(HANDLER_NAMES, self.handler_latency):
+            for bound, count in histogram.cumulative():
+                lines.append(f'{metric}_bucket{{handler="{handler}"{extra},le="{bound}"}} {count}')
+            lines.append(f'{metric}_sum{{handler="{handler}"{extra}}} {histogram.sum:.6f}')
+            lines.append(f'{metric}_count{{handler="{handler}"{extra}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return f">{LATENCY_BUCKETS[-1]}s"
+    if value < 0.001:
+        return f"{value * 1e6:.0f}us"
+    if value < 1:
+        return f"{value * 1e3:.1f}ms"
+    return f"{value:.2f}s"
+
+
+def write_snapshot(path: str, content: str):
+    """原子写入指标快照文件"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(content)
+    os.replace(temp_path, path)
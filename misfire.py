@@ -0,0 +1,115 @@
+import math
+import random
+from typing import Any, Dict, Optional, Tuple
+
+
+class MisfireCountdown:
+    """用“距离下次走火还剩几条消息”的倒计时判定走火
+
+    逐条消息做伯努利试验等价于一次性抽取几何分布的间隔。各条消息的试验相互独立，
+    与消息来自哪个群无关，因此使用全局概率的群共用一个倒计时。
+    热路径只需把 remaining 减一，归零时才调用 fire 判定并重新抽样：
+    没有群单独设置走火概率时 remaining 就是共用倒计时；
+    存在单独设置的群时 remaining 固定为 1，每条消息都经 fire 按所在群分别计数。
+    """
+
+    __slots__ = ('remaining', '_shared', '_countdowns', '_group_rates', '_probability', '_log_miss', '_random')
+
+    def __init__(self, probability: float, rng: Optional[random.Random] = None):
+        # 概率为 0 时抽样结果为 0，递减后始终非零，永不走火
+        self.remaining = 0
+        self._shared = 0
+        self._countdowns: Dict[Any, int] = {}
+        # 群号 -> (概率, log(1 - 概率))
+        self._group_rates: Dict[Any, Tuple[float, float]] = {}
+        self._random = rng.random if rng is not None else random.random
+        self._probability = -1.0
+        self._log_miss = 0.0
+        self.set_probability(probability)
+
+    @property
+    def probability(self) -> float:
+        return self._probability
+
+    def set_probability(self, probability: float):
+        """更新走火概率，概率变化时重新抽取共用倒计时"""
+        probability, log_miss = _rate(probability)
+        if probability == self._probability:
+            return
+        self._probability = probability
+        self._log_miss = log_miss
+        self._rearm_shared()
+
+    def set_group_probability(self, group_id, probability: Optional[float]):
+        """为单个群设置独立的走火概率，None 表示跟随全局概率；该群的倒计时会重新抽样"""
+        had_overrides = bool(self._group_rates)
+        if probability is None:
+            self._group_rates.pop(group_id, None)
+        else:
+            self._group_rates[group_id] = _rate(probability)
+        self._countdowns.pop(group_id, None)
+        if self._group_rates and not had_overrides:
+            self._shared, self.remaining = self.remaining, 1
+        elif had_overrides and not self._group_rates:
+            self.remaining = self._shared
+
+    def reset(self, group_id):
+        """丢弃某个群的独立倒计时，下次消息到来时重新抽样；共用倒计时无记忆性，无需重置"""
+        self._countdowns.pop(group_id, None)
+
+    def clear(self):
+        self._countdowns.clear()
+        self._rearm_shared()
+
+    def draw(self) -> int:
+        """抽取下一次走火前需要经过的消息条数（含走火的那一条）"""
+        return self._draw(self._probability, self._log_miss)
+
+    def tick(self, group_id) -> bool:
+        """记录一条可走火的消息，返回本条消息是否走火；热路径可直接内联这两行"""
+        self.remaining -= 1
+        return not self.remaining and self.fire(group_id)
+
+    def fire(self, group_id) -> bool:
+        """remaining 归零时调用，返回本条消息是否走火并重新设置 remaining"""
+        if not self._group_rates:
+            self.remaining = self.draw()
+            return True
+        self.remaining = 1
+        rate = self._group_rates.get(group_id)
+        if rate is None:
+            self._shared -= 1
+            if self._shared:
+                return False
+            self._shared = self.draw()
+            return True
+        remaining = self._countdowns.get(group_id)
+        if remaining is None:
+            remaining = self._draw(*rate)
+            if not remaining:
+                return False
+        remaining -= 1
+        if remaining:
+            self._countdowns[group_id] = remaining
+            return False
+        self._countdowns[group_id] = self._draw(*rate)
+        return True
+
+    def _rearm_shared(self):
+        if self._group_rates:
+            self._shared = self.draw()
+        else:
+            self.remaining = self.draw()
+
+    def _draw(self, probability: float, log_miss: float) -> int:
+        if probability <= 0.0:
+            return 0
+        if probability >= 1.0:
+            return 1
+        # 1 - U 落在 (0, 1]，避免 log(0)
+        return int(math.log(1.0 - self._random()) / log_miss) + 1
+
+
+def _rate(probability: float) -> Tuple[float, float]:
+    probability = min(max(float(probability), 0.0), 1.0)
+    return probability, math.log1p(-probability) if 0.0 < probability < 1.0 else 0.0
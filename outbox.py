@@ -0,0 +1,328 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from astrbot.api import logger
+
+from .flood_control import TokenBuckets
+
+# 发送优先级，数值越小越先发送
+PRIORITY_REPLY = 0
+PRIORITY_TIMEOUT = 1
+PRIORITY_ERROR = 2
+# 管理员指令的异步结果（如性能分析报告），不急于送达，排在所有提示之后
+PRIORITY_REPORT = 3
+PRIORITY_NAMES = ('reply', 'timeout', 'error', 'report')
+
+DEFAULT_PLATFORM_PER_MINUTE = 120
+DEFAULT_PLATFORM_BURST = 20
+DEFAULT_SESSION_PER_MINUTE = 20
+DEFAULT_SESSION_BURST = 5
+# 各优先级消息的最长排队秒数，超过后出队时直接丢弃；None 表示不过期
+DEFAULT_MAX_AGES: Tuple[Optional[float], ...] = (None, 300.0, 60.0, 600.0)
+DEFAULT_MAX_QUEUED = 2000
+QUEUE_DEPTH_WARNING = 200
+
+
+class OutboundMessage:
+    __slots__ = ('priority', 'origin', 'text', 'enqueued_at')
+
+    def __init__(self, priority: int, origin: Any, text: str, enqueued_at: float):
+        self.priority = priority
+        self.origin = origin
+        self.text = text
+        self.enqueued_at = enqueued_at
+
+
+class _Session:
+    """一个会话的待发消息，按 (优先级, 入队顺序) 排列的小顶堆"""
+
+    __slots__ = ('key', 'platform', 'messages', 'waiting')
+
+    def __init__(self, key: str, platform: '_Platform'):
+        self.key = key
+        self.platform = platform
+        self.messages: List[Tuple[int, int, OutboundMessage]] = []
+        # 被会话令牌桶推迟或正在发送，暂不参与排队
+        self.waiting = False
+
+
+class _Platform:
+    """一个平台上可立即发送的会话，按各会话队首的 (优先级, 入队顺序) 排列"""
+
+    __slots__ = ('name', 'ready', 'waiting')
+
+    def __init__(self, name: str):
+        self.name = name
+        # (优先级, 入队顺序, 会话)，会话队首变化后旧条目在出堆时跳过
+        self.ready: List[Tuple[int, int, _Session]] = []
+        # 被平台令牌桶推迟
+        self.waiting = False
+
+
+def _platform_of(key: str) -> str:
+    """unified_msg_origin 形如 平台:消息类型:会话，取平台部分"""
+    return key.split(':', 1)[0]
+
+
+class Outbox:
+    """插件主动发送的消息（超时提示、错误提示等）统一经过的优先级发送队列
+
+    - 每个会话一个小顶堆，每个平台再按各会话队首排序，每次发送各平台中优先级最高、入队最早的消息；
+    - 按平台、按会话两级令牌桶限速：平台令牌不足时整个平台推迟，会话令牌不足时只推迟该会话，
+      推迟到令牌可用时再排队，不阻塞其他平台与会话；
+    - 排队超过 max_ages 的低优先级消息在出队时丢弃，队列已满时拒绝新的非回复消息；
+    - 经框架直接发出的回复用 charge 扣除令牌，使排队中的提示让路给正在进行的游戏。
+    单个后台任务在有消息时启动、队列清空后退出，依次调用 send 发送。per_minute 为 0 表示不限制该级。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Any, str], Awaitable[Any]],
+        platform_per_minute: float = DEFAULT_PLATFORM_PER_MINUTE,
+        session_per_minute: float = DEFAULT_SESSION_PER_MINUTE,
+        platform_burst: int = DEFAULT_PLATFORM_BURST,
+        session_burst: int = DEFAULT_SESSION_BURST,
+        max_ages: Tuple[Optional[float], ...] = DEFAULT_MAX_AGES,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._send = send
+        self._platform_buckets: Optional[TokenBuckets] = None
+        self._session_buckets: Optional[TokenBuckets] = None
+        if platform_per_minute > 0:
+            self._platform_buckets = TokenBuckets(platform_per_minute, platform_burst, clock=clock)
+        if session_per_minute > 0:
+            self._session_buckets = TokenBuckets(session_per_minute, session_burst, clock=clock)
+        self.max_ages = max_ages
+        self.max_queued = max_queued
+        self._clock = clock
+        self._sequence = itertools.count()
+        self._platforms: Dict[str, _Platform] = {}
+        self._sessions: Dict[str, _Session] = {}
+        # (可发送时间, 序号, 平台或会话)：被令牌桶推迟的平台与会话
+        self._waiting: List[Tuple[float, int, Union[_Platform, _Session]]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # 每发出或丢弃一条消息置位，供 drain 等待
+        self._progress = asyncio.Event()
+        # 正在发送的消息的优先级
+        self._sending: Optional[int] = None
+        # 统计信息
+        self.depths = [0] * len(PRIORITY_NAMES)
+        self.sent = 0
+        self.failed = 0
+        self.dropped_stale = 0
+        self.dropped_full = 0
+        self.throttled = 0
+        self.wait_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self.depths)
+
+    def send(self, origin, text: str, priority: int = PRIORITY_ERROR) -> bool:
+        """把消息放入队列，立即返回；队列已满而被拒绝时返回 False"""
+        if priority != PRIORITY_REPLY and self.queue_depth >= self.max_queued:
+            self.dropped_full += 1
+            return False
+        key = str(origin)
+        session = self._sessions.get(key)
+        if session is None:
+            name = _platform_of(key)
+            platform = self._platforms.get(name)
+            if platform is None:
+                platform = self._platforms[name] = _Platform(name)
+            session = self._sessions[key] = _Session(key, platform)
+        sequence = next(self._sequence)
+        heapq.heappush(session.messages, (priority, sequence, OutboundMessage(priority, origin, text, self._clock())))
+        if session.messages[0][1] == sequence:
+            self._requeue(session)
+        self.depths[priority] += 1
+        if self.queue_depth == QUEUE_DEPTH_WARNING:
+            logger.warning(f"Outbound queue depth reached {QUEUE_DEPTH_WARNING}")
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        else:
+            self._wakeup.set()
+        return True
+
+    def sender(self, priority: int) -> Callable[[Any, str], Awaitable[bool]]:
+        """返回按指定优先级入队的发送函数，可替代 context.send_message 传给其他组件"""
+        async def send(origin, text: str) -> bool:
+            return self.send(origin, text, priority)
+        return send
+
+    def charge(self, origin):
+        """从令牌桶扣除一次经框架直接发出的回复，不排队也不等待"""
+        key = str(origin)
+        if self._session_buckets is not None:
+            self._session_buckets.take(key)
+        if self._platform_buckets is not None:
+            self._platform_buckets.take(_platform_of(key))
+
+    def unthrottle(self):
+        """停止限速并立即放出所有被推迟的平台与会话，用于关闭插件前尽快发完积压消息"""
+        self._platform_buckets = None
+        self._session_buckets = None
+        waiting, self._waiting = self._waiting, []
+        for _until, _sequence, target in waiting:
+            target.waiting = False
+            if isinstance(target, _Session):
+                self._requeue(target)
+        self._wakeup.set()
+
+    def _requeue(self, session: _Session):
+        """会话队首变化后重新排入所在平台，空会话直接移除"""
+        if session.waiting:
+            return
+        if session.messages:
+            priority, sequence, _message = session.messages[0]
+            heapq.heappush(session.platform.ready, (priority, sequence, session))
+        else:
+            del self._sessions[session.key]
+
+    def _defer(self, target: Union[_Platform, _Session], until: float):
+        self.throttled += 1
+        target.waiting = True
+        heapq.heappush(self._waiting, (until, next(self._sequence), target))
+
+    def _release(self, now: float):
+        waiting = self._waiting
+        while waiting and waiting[0][0] <= now:
+            target = heapq.heappop(waiting)[2]
+            target.waiting = False
+            if isinstance(target, _Session):
+                self._requeue(target)
+
+    def _next_session(self) -> Optional[_Session]:
+        """各个未被推迟的平台中队首优先级最高、入队最早的会话"""
+        best = None
+        best_session = None
+        for platform in self._platforms.values():
+            if platform.waiting:
+                continue
+            ready = platform.ready
+            while ready:
+                priority, sequence, session = ready[0]
+                if not session.waiting and session.messages and session.messages[0][1] == sequence:
+                    break
+                # 队首已发送或被更高优先级的消息取代
+                heapq.heappop(ready)
+            if ready and (best is None or ready[0][:2] < best):
+                best = ready[0][:2]
+                best_session = ready[0][2]
+        return best_session
+
+    def _pop(self, session: _Session) -> OutboundMessage:
+        heapq.heappop(session.platform.ready)
+        _priority, _sequence, message = heapq.heappop(session.messages)
+        self.depths[message.priority] -= 1
+        return message
+
+    async def _run(self):
+        while True:
+            now = self._clock()
+            self._release(now)
+            session = self._next_session()
+            if session is None:
+                if not self._waiting:
+                    # 每个非空会话都在平台堆或推迟堆中，两者皆空即队列已清空
+                    return
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._waiting[0][0] - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            message = session.messages[0][2]
+            max_age = self.max_ages[message.priority]
+            if max_age is not None and now - message.enqueued_at > max_age:
+                self._pop(session)
+                self.dropped_stale += 1
+                self._requeue(session)
+                self._progress.set()
+                continue
+            platform = session.platform
+            if self._platform_buckets is not None:
+                delay = self._platform_buckets.wait_time(platform.name)
+                if delay > 0.0:
+                    self._defer(platform, now + delay)
+                    continue
+            if self._session_buckets is not None:
+                delay = self._session_buckets.wait_time(session.key)
+                if delay > 0.0:
+                    heapq.heappop(platform.ready)
+                    self._defer(session, now + delay)
+                    continue
+                self._session_buckets.take(session.key)
+            if self._platform_buckets is not None:
+                self._platform_buckets.take(platform.name)
+            self._pop(session)
+            # 发送期间入队的消息照常进入会话堆，发送完成后再排队
+            session.waiting = True
+            self._sending = message.priority
+            try:
+                await self._send(message.origin, message.text)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to send {PRIORITY_NAMES[message.priority]} message: {e}")
+            finally:
+                session.waiting = False
+                self._sending = None
+                self._progress.set()
+            waited = now - message.enqueued_at
+            if waited > self.wait_max:
+                self.wait_max = waited
+            self._requeue(session)
+
+    def stats(self) -> Dict[str, float]:
+        stats = {f'depth_{name}': depth for name, depth in zip(PRIORITY_NAMES, self.depths)}
+        stats.update({
+            'queue_depth': self.queue_depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped_stale': self.dropped_stale,
+            'dropped_full': self.dropped_full,
+            'throttled': self.throttled,
+            'wait_max': self.wait_max,
+        })
+        return stats
+
+    def _pending(self, priority: int) -> bool:
+        """是否还有优先级不低于 priority 的消息在排队或正在发送"""
+        sending = self._sending
+        return any(self.depths[:priority + 1]) or (sending is not None and sending <= priority)
+
+    async def drain(self, priority: int, timeout: Optional[float] = 5.0) -> bool:
+        """等待优先级不低于 priority 的消息全部发出或丢弃，低优先级的消息不等待；超时返回 False"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while self._pending(priority):
+            if self._task is None or self._task.done():
+                return False
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0.0:
+                return False
+            self._progress.clear()
+            try:
+                await asyncio.wait_for(self._progress.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def close(self, timeout: Optional[float] = 5.0):
+        """等待队列发送完毕，超时后丢弃剩余消息并按优先级记录丢弃数"""
+        if self._task is None or self._task.done():
+            return
+        _done, not_done = await asyncio.wait([self._task], timeout=timeout)
+        if not_done:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            counts = ", ".join(f"{name}={depth}" for name, depth in zip(PRIORITY_NAMES, self.depths) if depth)
+            logger.warning(f"Dropped {self.queue_depth} queued outbound messages on shutdown ({counts})")
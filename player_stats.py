@@ -0,0 +1,305 @@
+import asyncio
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_LEADERBOARD_SIZE = 10
+DEFAULT_FLUSH_DELAY = 5.0
+DEFAULT_FLUSH_BATCH = 256
+
+STAT_FIELDS = ('shots', 'hits', 'misses', 'misfires', 'ban_seconds')
+
+
+class PlayerStats:
+    """单个群内单个玩家的累计统计"""
+
+    __slots__ = ('group_id', 'user_id', 'nickname') + STAT_FIELDS
+
+    def __init__(self, group_id, user_id, nickname: str = '', shots: int = 0, hits: int = 0,
+                 misses: int = 0, misfires: int = 0, ban_seconds: int = 0):
+        self.group_id = group_id
+        self.user_id = user_id
+        self.nickname = nickname
+        self.shots = shots
+        self.hits = hits
+        self.misses = misses
+        self.misfires = misfires
+        self.ban_seconds = ban_seconds
+
+    def add(self, other: 'PlayerStats'):
+        for name in STAT_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if other.nickname:
+            self.nickname = other.nickname
+
+    def rank_key(self) -> Tuple[int, int, str]:
+        return -self.ban_seconds, -self.hits, str(self.user_id)
+
+    def as_row(self) -> Tuple:
+        return (str(self.group_id), str(self.user_id), self.nickname, self.shots, self.hits,
+                self.misses, self.misfires, self.ban_seconds)
+
+
+def _apply(stats: PlayerStats, nickname: str, increments: Dict[str, int]):
+    for name, value in increments.items():
+        setattr(stats, name, getattr(stats, name) + value)
+    if nickname:
+        stats.nickname = nickname
+
+
+class Leaderboard:
+    """单个群按累计禁言时长排序的前 size 名
+
+    各项计数只增不减，玩家名次只会上升，因此只保留前 size 名即可精确维护：
+    不在索引中的玩家更新后只需与末位比较一次。定位与插入均为二分查找。
+    """
+
+    __slots__ = ('size', '_keys', '_key_of', '_players')
+
+    def __init__(self, size: int = DEFAULT_LEADERBOARD_SIZE):
+        self.size = size
+        self._keys: List[Tuple[int, int, str]] = []
+        self._key_of: Dict[str, Tuple[int, int, str]] = {}
+        self._players: Dict[str, PlayerStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, user_id) -> Optional[PlayerStats]:
+        return self._players.get(str(user_id))
+
+    def update(self, player: PlayerStats):
+        """玩家统计变化后调整其名次"""
+        user = str(player.user_id)
+        key = player.rank_key()
+        old_key = self._key_of.get(user)
+        if old_key is not None:
+            del self._keys[bisect_left(self._keys, old_key)]
+        elif len(self._keys) >= self.size:
+            if key >= self._keys[-1]:
+                return
+            evicted = self._keys.pop()[2]
+            del self._key_of[evicted]
+            del self._players[evicted]
+        insort(self._keys, key)
+        self._key_of[user] = key
+        self._players[user] = player
+
+    def top(self, limit: Optional[int] = None) -> List[PlayerStats]:
+        keys = self._keys if limit is None else self._keys[:limit]
+        return [self._players[key[2]] for key in keys]
+
+
+class StatsBook:
+    """按群、按玩家增量累计统计，并分批写入状态存储
+
+    - 内存中只保留最近活跃的 cache_size 名玩家（LRU）和每个群的前 N 名索引，
+      成员上万的群也不会把所有人读进内存；未缓存的玩家在首次更新时于后台从数据库读取，不阻塞调用方；
+    - 变更以增量形式合并，达到 flush_batch 条或经过 flush_delay 秒后一次事务写入，
+      多个工作进程共用数据库时不会互相覆盖。
+    """
+
+    def __init__(self, store, cache_size: int = DEFAULT_CACHE_SIZE,
+                 leaderboard_size: int = DEFAULT_LEADERBOARD_SIZE,
+                 flush_delay: float = DEFAULT_FLUSH_DELAY, flush_batch: int = DEFAULT_FLUSH_BATCH):
+        self._store = store
+        self.cache_size = cache_size
+        self.leaderboard_size = leaderboard_size
+        self.flush_delay = flush_delay
+        self.flush_batch = flush_batch
+        self._players: 'OrderedDict[Tuple[Any, Any], PlayerStats]' = OrderedDict()
+        self._pending: Dict[Tuple[Any, Any], PlayerStats] = {}
+        # 写入批次按提交顺序编号；进行中的读取只包含其开始前提交的批次，
+        # 之后提交的批次保留到这些读取结束，供读取结果补齐增量
+        self._write_seq = 0
+        self._batches: Dict[int, Dict[Tuple[Any, Any], PlayerStats]] = {}
+        self._reads: List[int] = []
+        self._leaderboards: Dict[Any, Leaderboard] = {}
+        self._board_loads: Dict[Any, asyncio.Future] = {}
+        self._player_loads: Dict[Tuple[Any, Any], asyncio.Task] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def cached_players(self) -> int:
+        return len(self._players)
+
+    @property
+    def pending_players(self) -> int:
+        return len(self._pending)
+
+    def record_nowait(self, group_id, user_id, nickname: str = '', **increments: int):
+        """累加一名玩家的统计并立即返回，increments 为 STAT_FIELDS 中的字段
+
+        增量先进入待写缓冲；玩家已缓存时同步更新名次，未缓存时在后台读取，读取时合并缓冲中的增量。
+        """
+        key = (group_id, user_id)
+        delta = self._pending.get(key)
+        if delta is None:
+            delta = self._pending[key] = PlayerStats(group_id, user_id)
+        _apply(delta, nickname, increments)
+        self._schedule_flush()
+        board = self._leaderboards.get(group_id)
+        player = None
+        if board is not None:
+            player = self._players.get(key) or board.get(user_id)
+        if player is None:
+            if key not in self._player_loads:
+                task = asyncio.ensure_future(self._resolve(group_id, user_id))
+                self._player_loads[key] = task
+                task.add_done_callback(lambda _task: self._player_loads.pop(key, None))
+            return
+        _apply(player, nickname, increments)
+        self._touch(key, player)
+        board.update(player)
+
+    async def record(self, group_id, user_id, nickname: str = '', **increments: int):
+        """同 record_nowait，并等待该玩家的后台读取完成"""
+        self.record_nowait(group_id, user_id, nickname, **increments)
+        loading = self._player_loads.get((group_id, user_id))
+        if loading is not None:
+            await asyncio.shield(loading)
+
+    async def settle(self):
+        """等待所有后台读取完成"""
+        while self._player_loads:
+            await asyncio.gather(*list(self._player_loads.values()), return_exceptions=True)
+
+    async def _resolve(self, group_id, user_id):
+        """后台读取未缓存的玩家，读取结果已包含此前缓冲中的增量"""
+        try:
+            board = await self._leaderboard(group_id)
+            board.update(await self._player(board, group_id, user_id))
+        except Exception as e:
+            logger.error(f"Failed to load player stats: {e}")
+
+    async def top(self, group_id, limit: Optional[int] = None) -> List[PlayerStats]:
+        return (await self._leaderboard(group_id)).top(limit)
+
+    async def _leaderboard(self, group_id) -> Leaderboard:
+        board = self._leaderboards.get(group_id)
+        if board is not None:
+            return board
+        # 同一群的并发首次访问共用一次数据库读取
+        loading = self._board_loads.get(group_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load_leaderboard(group_id))
+            self._board_loads[group_id] = loading
+            loading.add_done_callback(lambda _future: self._board_loads.pop(group_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load_leaderboard(self, group_id) -> Leaderboard:
+        since = self._begin_read()
+        try:
+            rows = await self._store.call(self._store.load_top_players, group_id, self.leaderboard_size)
+            board = Leaderboard(self.leaderboard_size)
+            for row in rows:
+                key = (group_id, row[0])
+                player = self._players.get(key)
+                if player is None:
+                    player = PlayerStats(group_id, *row)
+                    self._merge_unwritten(player, key, since)
+                board.update(player)
+        finally:
+            self._end_read(since)
+        self._leaderboards[group_id] = board
+        return board
+
+    async def _player(self, board: Leaderboard, group_id, user_id) -> PlayerStats:
+        key = (group_id, user_id)
+        player = self._players.get(key) or board.get(user_id)
+        if player is None:
+            since = self._begin_read()
+            try:
+                row = await self._store.call(self._store.load_player_stats, group_id, user_id)
+                # 等待期间可能已被并发加载
+                player = self._players.get(key) or board.get(user_id)
+                if player is None:
+                    player = PlayerStats(group_id, user_id, *row[1:]) if row else PlayerStats(group_id, user_id)
+                    self._merge_unwritten(player, key, since)
+            finally:
+                self._end_read(since)
+        self._touch(key, player)
+        return player
+
+    def _begin_read(self) -> int:
+        """登记一次数据库读取，返回此刻的写入序号；调用后须立即提交读取，中间不能让出事件循环"""
+        self._reads.append(self._write_seq)
+        return self._write_seq
+
+    def _end_read(self, since: int):
+        self._reads.remove(since)
+        oldest = min(self._reads, default=self._write_seq)
+        for seq in [seq for seq in self._batches if seq <= oldest]:
+            del self._batches[seq]
+
+    def _merge_unwritten(self, player: PlayerStats, key, since: int):
+        """补上读取结果中没有的增量：读取开始后才提交的批次（含已写完的）与仍在缓冲中的增量"""
+        for seq, batch in self._batches.items():
+            if seq > since:
+                delta = batch.get(key)
+                if delta is not None:
+                    player.add(delta)
+        delta = self._pending.get(key)
+        if delta is not None:
+            player.add(delta)
+
+    def _touch(self, key, player: PlayerStats):
+        self._players[key] = player
+        self._players.move_to_end(key)
+        while len(self._players) > self.cache_size:
+            self._players.popitem(last=False)
+
+    def _schedule_flush(self):
+        if len(self._pending) >= self.flush_batch:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            self._start_flush()
+            return
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
+        elif self._flush_handle is None:
+            # 上一批仍在写入，稍后再合并提交
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._start_flush)
+
+    async def flush(self):
+        """把累计的增量写入状态存储"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self._write_seq += 1
+        seq = self._write_seq
+        if self._reads:
+            self._batches[seq] = pending
+        try:
+            await self._store.call(self._store.add_player_stats, [delta.as_row() for delta in pending.values()])
+        except Exception as e:
+            logger.error(f"Failed to persist player stats: {e}")
+            # 未写入的批次回到缓冲，由缓冲参与合并
+            self._batches.pop(seq, None)
+            # 写入失败时与新的增量合并后重试
+            for key, delta in self._pending.items():
+                if key in pending:
+                    pending[key].add(delta)
+                else:
+                    pending[key] = delta
+            self._pending = pending
+            self._schedule_flush()
+
+    async def close(self):
+        await self.settle()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
@@ -0,0 +1,146 @@
+import asyncio
+import glob
+import os
+import time
+from typing import Any, List, NamedTuple, Optional
+
+PROFILE_DIRNAME = 'profiles'
+DEFAULT_PROFILE_SECONDS = 30
+MAX_PROFILE_SECONDS = 600
+# 每次分析最多保留的输出文件组数，旧文件按时间删除
+MAX_PROFILE_RUNS = 20
+TRACEMALLOC_FRAMES = 10
+ALLOCATION_DIFF_LIMIT = 50
+SUMMARY_FUNCTIONS = 5
+
+
+class ProfileReport(NamedTuple):
+    seconds: float
+    # 写入的文件路径
+    files: List[str]
+    # 插件内自身耗时最多的函数摘要
+    summary: List[str]
+
+
+class RuntimeProfiler:
+    """按需开启、限时结束的运行时性能分析
+
+    开启后在事件循环线程上启用 cProfile，可选用 tracemalloc 记录前后两次内存快照；
+    到时（或被提前停止）后在线程池中把 .pstats 与内存分配差异写入 directory。
+    未开启时不挂任何钩子，处理器没有额外开销。cProfile 与 tracemalloc 按需导入。
+    """
+
+    def __init__(self, directory: str, plugin_dir: Optional[str] = None):
+        self.directory = directory
+        self.plugin_dir = plugin_dir or os.path.dirname(os.path.abspath(__file__))
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, seconds: float, trace_memory: bool = False) -> Optional[asyncio.Task]:
+        """开始一次分析，已有分析在进行时返回 None；任务结果为 ProfileReport"""
+        if self.active:
+            return None
+        seconds = min(max(float(seconds), 1.0), MAX_PROFILE_SECONDS)
+        self._stop = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run(seconds, trace_memory))
+        return self._task
+
+    def stop(self) -> bool:
+        """提前结束正在进行的分析，结果照常写入"""
+        if not self.active:
+            return False
+        self._stop.set()
+        return True
+
+    async def close(self):
+        if self.stop():
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self, seconds: float, trace_memory: bool) -> ProfileReport:
+        import cProfile
+
+        tracemalloc = None
+        started_tracing = False
+        memory_before = None
+        if trace_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            memory_before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profile.enable()
+        except ValueError:
+            # 已有其他分析工具占用了本线程
+            if started_tracing:
+                tracemalloc.stop()
+            raise
+        try:
+            await asyncio.wait_for(self._stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            profile.disable()
+        elapsed = time.perf_counter() - started
+        memory_after = None
+        if trace_memory:
+            memory_after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+        loop = asyncio.get_running_loop()
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        files, summary = await loop.run_in_executor(
+            None, self._write, stamp, profile, memory_before, memory_after, elapsed
+        )
+        return ProfileReport(elapsed, files, summary)
+
+    def _write(self, stamp: str, profile, memory_before, memory_after, elapsed: float):
+        import pstats
+
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f'profile-{stamp}')
+        files = [f'{prefix}.pstats']
+        profile.dump_stats(files[0])
+        if memory_before is not None and memory_after is not None:
+            files.append(f'{prefix}-allocations.txt')
+            self._write_allocation_diff(files[1], memory_before, memory_after, elapsed)
+        self._remove_old_runs()
+        return files, self._summarize(pstats.Stats(profile))
+
+    def _write_allocation_diff(self, path: str, before, after, elapsed: float):
+        differences = after.compare_to(before, 'lineno')
+        total = sum(stat.size_diff for stat in differences)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(f"# tracemalloc diff over {elapsed:.1f}s, net {total / 1024:+.1f} KiB, "
+                       f"top {ALLOCATION_DIFF_LIMIT} lines by size change\n")
+            for stat in differences[:ALLOCATION_DIFF_LIMIT]:
+                file.write(f"{stat}\n")
+
+    def _summarize(self, stats) -> List[str]:
+        """插件自身代码中 tottime 最高的几个函数"""
+        rows: List[Any] = []
+        for (filename, line, name), (_cc, calls, tottime, cumtime, _callers) in stats.stats.items():
+            if filename.startswith(self.plugin_dir):
+                rows.append((tottime, cumtime, calls, f"{os.path.basename(filename)}:{line}({name})"))
+        rows.sort(reverse=True)
+        return [
+            f"{label} 自身 {tottime * 1000:.1f}ms 累计 {cumtime * 1000:.1f}ms {calls} 次"
+            for tottime, cumtime, calls, label in rows[:SUMMARY_FUNCTIONS]
+        ]
+
+    def _remove_old_runs(self):
+        runs = sorted(glob.glob(os.path.join(self.directory, 'profile-*.pstats')))
+        for path in runs[:-MAX_PROFILE_RUNS]:
+            prefix = path[:-len('.pstats')]
+            for stale in (path, f'{prefix}-allocations.txt'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
@@ -0,0 +1,48 @@
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from astrbot.api import logger
+
+REPLY_SEPARATOR = "\n"
+SEND_FAILED_MESSAGE = "消息发送失败，请稍后重试。"
+
+
+class ReplyComposer:
+    """把一次事件处理产生的多段文本合并为一条消息发送
+
+    每段回复都是一次平台接口调用，且平台按群限流；合并后一次事件只发送一条消息。
+    关闭合并时逐段发送，供需要分条消息的平台使用。saved 统计合并节省的发送次数。
+    """
+
+    __slots__ = ('enabled', 'separator', 'saved', '_notify')
+
+    def __init__(self, notify: Callable[[Any, str], Awaitable[Any]], enabled: bool = True,
+                 separator: str = REPLY_SEPARATOR):
+        self._notify = notify
+        self.enabled = enabled
+        self.separator = separator
+        self.saved = 0
+
+    async def compose(self, event, texts: AsyncIterator[str]):
+        """消费文本片段，产出待发送的消息结果"""
+        if not self.enabled:
+            async for text in texts:
+                if text:
+                    async for result in self._send(event, text):
+                        yield result
+            return
+        parts = [text async for text in texts if text]
+        if not parts:
+            return
+        self.saved += len(parts) - 1
+        async for result in self._send(event, self.separator.join(parts)):
+            yield result
+
+    async def _send(self, event, text: str):
+        try:
+            yield event.plain_result(text)
+        except Exception as e:
+            logger.error(f"Failed to send reply: {e}")
+            try:
+                await self._notify(event.unified_msg_origin, SEND_FAILED_MESSAGE)
+            except Exception as notify_error:
+                logger.error(f"Failed to send reply failure notice: {notify_error}")
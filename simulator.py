@@ -0,0 +1,250 @@
+import random
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .game_state import CHAMBER_COUNT, GameState
+from .misfire import MisfireCountdown
+
+# 与插件默认配置一致
+DEFAULT_MISFIRE_PROBABILITY = 0.005
+DEFAULT_MIN_BAN_SECONDS = 60
+DEFAULT_MAX_BAN_SECONDS = 300
+DEFAULT_BATCH_SIZE = 262144
+
+
+class BalanceConfig(NamedTuple):
+    misfire_probability: float = DEFAULT_MISFIRE_PROBABILITY
+    min_ban_seconds: int = DEFAULT_MIN_BAN_SECONDS
+    max_ban_seconds: int = DEFAULT_MAX_BAN_SECONDS
+    chamber_count: int = CHAMBER_COUNT
+    # 每局装填数量，0 表示在 1 到 chamber_count 之间均匀随机
+    bullets: int = 1
+
+
+class TrafficProfile(NamedTuple):
+    # 普通聊天消息数（不含指令）
+    messages: int = 1_000_000
+    # 每 1000 条普通消息对应开始的游戏局数
+    games_per_1000_messages: float = 5.0
+    # 每次开枪前无人继续、游戏超时结束的概率
+    abandon_probability: float = 0.0
+
+
+class SimulationResult(NamedTuple):
+    messages: int
+    games: int
+    misfire_bans: int
+    game_bans: int
+    timed_out_games: int
+    # ban_seconds_histogram[i] 为时长 min_ban_seconds + i 秒的禁言次数
+    ban_seconds_histogram: List[int]
+    # game_length_histogram[k] 为恰好开了 k 枪的对局数
+    game_length_histogram: List[int]
+    min_ban_seconds: int
+
+    @property
+    def bans(self) -> int:
+        return self.misfire_bans + self.game_bans
+
+    def per_1000_messages(self, value: float) -> float:
+        return value * 1000.0 / self.messages if self.messages else 0.0
+
+    @property
+    def ban_seconds_total(self) -> int:
+        return sum((self.min_ban_seconds + offset) * count
+                   for offset, count in enumerate(self.ban_seconds_histogram))
+
+    def ban_seconds_quantile(self, fraction: float) -> Optional[int]:
+        total = sum(self.ban_seconds_histogram)
+        if not total:
+            return None
+        threshold = fraction * total
+        running = 0
+        for offset, count in enumerate(self.ban_seconds_histogram):
+            running += count
+            if running >= threshold:
+                return self.min_ban_seconds + offset
+        return self.min_ban_seconds + len(self.ban_seconds_histogram) - 1
+
+    @property
+    def mean_game_length(self) -> float:
+        games = sum(self.game_length_histogram)
+        if not games:
+            return 0.0
+        return sum(length * count for length, count in enumerate(self.game_length_histogram)) / games
+
+    def summary(self) -> Dict[str, Any]:
+        """便于打印与写入 JSON 的汇总"""
+        bans = self.bans
+        return {
+            'messages': self.messages,
+            'games': self.games,
+            'bans_per_1000_messages': round(self.per_1000_messages(bans), 4),
+            'misfire_bans_per_1000_messages': round(self.per_1000_messages(self.misfire_bans), 4),
+            'game_bans_per_1000_messages': round(self.per_1000_messages(self.game_bans), 4),
+            'ban_seconds_per_1000_messages': round(self.per_1000_messages(self.ban_seconds_total), 1),
+            'ban_seconds_mean': round(self.ban_seconds_total / bans, 2) if bans else 0.0,
+            'ban_seconds_p50': self.ban_seconds_quantile(0.5),
+            'ban_seconds_p90': self.ban_seconds_quantile(0.9),
+            'ban_seconds_p99': self.ban_seconds_quantile(0.99),
+            'game_length_mean': round(self.mean_game_length, 4),
+            'game_length_histogram': list(self.game_length_histogram),
+            'timed_out_share': round(self.timed_out_games / self.games, 4) if self.games else 0.0,
+        }
+
+
+def game_count(profile: TrafficProfile) -> int:
+    return int(round(profile.messages * profile.games_per_1000_messages / 1000.0))
+
+
+def _validate(config: BalanceConfig):
+    if not 0 <= config.bullets <= config.chamber_count:
+        raise ValueError(f"bullets must be between 0 and {config.chamber_count}")
+    if config.max_ban_seconds < config.min_ban_seconds:
+        raise ValueError("max_ban_seconds must not be below min_ban_seconds")
+
+
+def simulate(config: BalanceConfig, profile: TrafficProfile, seed: Optional[int] = None,
+             batch_size: int = DEFAULT_BATCH_SIZE) -> SimulationResult:
+    """以 NumPy 数组批量模拟，规则与 load_bullets / execute_shot / 随机走火一致
+
+    NumPy 仅在这里导入；内存占用与 batch_size 成正比。
+    """
+    import numpy as np
+
+    _validate(config)
+    rng = np.random.default_rng(seed)
+    chamber_count = config.chamber_count
+    ban_span = config.max_ban_seconds - config.min_ban_seconds + 1
+    ban_histogram = np.zeros(ban_span, dtype=np.int64)
+    length_histogram = np.zeros(chamber_count + 1, dtype=np.int64)
+
+    def record_bans(count: int):
+        if count:
+            offsets = rng.integers(0, ban_span, size=count)
+            ban_histogram[:] += np.bincount(offsets, minlength=ban_span)
+
+    # 走火：按 MisfireCountdown 的方式批量抽取几何分布间隔，累加到消息总数为止
+    misfire_bans = 0
+    probability = config.misfire_probability
+    if probability >= 1:
+        misfire_bans = profile.messages
+    elif probability > 0:
+        position = 0
+        chunk = max(1024, int(profile.messages * probability * 1.1))
+        while True:
+            arrivals = position + np.cumsum(rng.geometric(probability, size=chunk))
+            inside = int(np.searchsorted(arrivals, profile.messages, side='right'))
+            misfire_bans += inside
+            if inside < chunk:
+                break
+            position = int(arrivals[-1])
+    for start in range(0, misfire_bans, batch_size):
+        record_bans(min(batch_size, misfire_bans - start))
+
+    # 对局：每行一局，弹膛随机排名小于装填数的位置装有实弹
+    games = game_count(profile)
+    game_bans = 0
+    timed_out = 0
+    for start in range(0, games, batch_size):
+        size = min(batch_size, games - start)
+        if config.bullets:
+            bullets = np.full(size, config.bullets)
+        else:
+            bullets = rng.integers(1, chamber_count + 1, size=size)
+        ranks = np.argsort(np.argsort(rng.random((size, chamber_count)), axis=1), axis=1)
+        live = ranks < bullets[:, None]
+        # 所有实弹打完所需的枪数 = 最后一发实弹的位置 + 1
+        full_length = chamber_count - np.argmax(live[:, ::-1], axis=1)
+        if profile.abandon_probability > 0:
+            # 开枪前放弃的概率为 a，则放弃前开出的枪数服从从 0 开始的几何分布
+            before_abandon = rng.geometric(profile.abandon_probability, size=size) - 1
+            shots = np.minimum(full_length, before_abandon)
+        else:
+            shots = full_length
+        hits_so_far = np.concatenate((np.zeros((size, 1), dtype=np.int64), np.cumsum(live, axis=1)), axis=1)
+        hits = np.take_along_axis(hits_so_far, shots[:, None], axis=1)[:, 0]
+        batch_bans = int(hits.sum())
+        game_bans += batch_bans
+        timed_out += int((shots < full_length).sum())
+        length_histogram += np.bincount(shots, minlength=chamber_count + 1)
+        record_bans(batch_bans)
+
+    return SimulationResult(
+        profile.messages, games, misfire_bans, game_bans, timed_out,
+        ban_histogram.tolist(), length_histogram.tolist(), config.min_ban_seconds,
+    )
+
+
+def simulate_scalar(config: BalanceConfig, profile: TrafficProfile, seed: Optional[int] = None) -> SimulationResult:
+    """逐条消息、逐枪调用插件自身的 GameState 与 MisfireCountdown，速度慢，仅用于校验
+
+    每次开枪前以 abandon_probability 的概率无人继续（游戏超时结束）。
+    """
+    _validate(config)
+    rng = random.Random(seed)
+    chamber_count = config.chamber_count
+    ban_span = config.max_ban_seconds - config.min_ban_seconds + 1
+    ban_histogram = [0] * ban_span
+    length_histogram = [0] * (chamber_count + 1)
+
+    countdown = MisfireCountdown(config.misfire_probability, rng)
+    misfire_bans = 0
+    for _ in range(profile.messages):
+        if countdown.tick(0):
+            misfire_bans += 1
+            ban_histogram[rng.randint(config.min_ban_seconds, config.max_ban_seconds) - config.min_ban_seconds] += 1
+
+    games = game_count(profile)
+    game_bans = 0
+    timed_out = 0
+    for _ in range(games):
+        bullets = config.bullets or rng.randint(1, chamber_count)
+        state = GameState.load(bullets, chamber_count, rng)
+        shots = 0
+        while state.is_active:
+            if profile.abandon_probability and rng.random() < profile.abandon_probability:
+                timed_out += 1
+                break
+            shots += 1
+            if state.fire():
+                game_bans += 1
+                ban_histogram[rng.randint(config.min_ban_seconds, config.max_ban_seconds) - config.min_ban_seconds] += 1
+        length_histogram[shots] += 1
+
+    return SimulationResult(
+        profile.messages, games, misfire_bans, game_bans, timed_out,
+        ban_histogram, length_histogram, config.min_ban_seconds,
+    )
+
+
+def _total_variation(left: List[int], right: List[int]) -> float:
+    left_total = sum(left) or 1
+    right_total = sum(right) or 1
+    return 0.5 * sum(abs(a / left_total - b / right_total) for a, b in zip(left, right))
+
+
+def compare_results(vectorized: SimulationResult, scalar: SimulationResult,
+                    tolerance: float = 0.05) -> List[Tuple[str, float, float, bool]]:
+    """比较两次模拟的关键统计量，返回 (名称, 向量化结果, 标量结果, 是否一致)
+
+    比率按相对误差比较，分布按总变差距离比较，tolerance 需结合样本量选取。
+    """
+    checks = []
+
+    def relative(name: str, left: float, right: float):
+        scale = max(abs(left), abs(right), 1e-12)
+        checks.append((name, left, right, abs(left - right) / scale <= tolerance))
+
+    vector_summary = vectorized.summary()
+    scalar_summary = scalar.summary()
+    for name in ('misfire_bans_per_1000_messages', 'game_bans_per_1000_messages',
+                 'ban_seconds_mean', 'game_length_mean'):
+        relative(name, vector_summary[name], scalar_summary[name])
+    checks.append(('timed_out_share', vector_summary['timed_out_share'], scalar_summary['timed_out_share'],
+                   abs(vector_summary['timed_out_share'] - scalar_summary['timed_out_share']) <= tolerance))
+    distance = _total_variation(vectorized.game_length_histogram, scalar.game_length_histogram)
+    checks.append(('game_length_tv_distance', distance, 0.0, distance <= tolerance))
+    # 禁言时长桶多、单桶样本少，按分位数而不是逐桶比较
+    for name in ('ban_seconds_p50', 'ban_seconds_p90'):
+        relative(name, vector_summary[name] or 0, scalar_summary[name] or 0)
+    return checks
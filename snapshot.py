@@ -0,0 +1,98 @@
+import os
+import struct
+import time
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+SNAPSHOT_MAGIC = b'RGS1'
+SNAPSHOT_VERSION = 1
+
+# 文件头：魔数、版本、记录数、保存时的墙钟时间
+_HEADER = struct.Struct('<4sHId')
+# 定长记录：群号类型、弹膛数、当前弹膛、剩余实弹、弹膛位图、剩余秒数、群号字符数、来源字符数
+_RECORD = struct.Struct('<BBBBIdHH')
+
+_KEY_INT = 0
+_KEY_STR = 1
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class GameSnapshot(NamedTuple):
+    group_id: Any
+    chamber_count: int
+    current_chamber_index: int
+    live_rounds: int
+    chambers: int
+    remaining: float
+    origin: str
+
+
+def encode_snapshot(games: Iterable[GameSnapshot], saved_at: Optional[float] = None) -> bytes:
+    """把进行中的游戏编码为紧凑的二进制快照
+
+    定长字段按记录顺序排列，群号与消息来源字符串拼接成一整段 UTF-8 放在末尾，
+    读取时只需一次 iter_unpack 和一次解码。
+    """
+    records: List[bytes] = []
+    texts: List[str] = []
+    pack = _RECORD.pack
+    for game in games:
+        group_id = game.group_id
+        key_type = _KEY_INT if isinstance(group_id, int) else _KEY_STR
+        key_text = str(group_id)
+        origin = game.origin or ''
+        records.append(pack(
+            key_type, game.chamber_count, game.current_chamber_index, game.live_rounds,
+            game.chambers, game.remaining, len(key_text), len(origin),
+        ))
+        texts.append(key_text)
+        texts.append(origin)
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(records),
+                          time.time() if saved_at is None else saved_at)
+    return header + b''.join(records) + ''.join(texts).encode('utf-8')
+
+
+def decode_snapshot(data: bytes) -> Tuple[float, List[GameSnapshot]]:
+    """解析二进制快照，返回 (保存时间, 游戏列表)"""
+    if len(data) < _HEADER.size:
+        raise SnapshotError("snapshot too short")
+    magic, version, count, saved_at = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"unsupported snapshot format {magic!r} v{version}")
+    records_end = _HEADER.size + count * _RECORD.size
+    if len(data) < records_end:
+        raise SnapshotError("snapshot truncated")
+    text = data[records_end:].decode('utf-8')
+
+    games: List[GameSnapshot] = []
+    append = games.append
+    offset = 0
+    for key_type, chamber_count, index, live, chambers, remaining, key_len, origin_len in _RECORD.iter_unpack(
+        data[_HEADER.size:records_end]
+    ):
+        key_text = text[offset:offset + key_len]
+        offset += key_len
+        origin = text[offset:offset + origin_len]
+        offset += origin_len
+        append(GameSnapshot(
+            int(key_text) if key_type == _KEY_INT else key_text,
+            chamber_count, index, live, chambers, remaining, origin,
+        ))
+    return saved_at, games
+
+
+def write_snapshot_file(path: str, data: bytes):
+    """原子写入快照文件"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_snapshot_file(path: str) -> Tuple[float, List[GameSnapshot]]:
+    with open(path, 'rb') as file:
+        return decode_snapshot(file.read())
@@ -0,0 +1,289 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .game_state import GameState
+
+STATE_BACKEND_MEMORY = 'memory'
+STATE_BACKEND_SQLITE = 'sqlite'
+STATE_BACKENDS = (STATE_BACKEND_MEMORY, STATE_BACKEND_SQLITE)
+
+# 超时租约在截止时间之后的宽限期，持有者在宽限期内未处理时其他进程可以接管
+DEFAULT_LEASE_GRACE = 10.0
+# 单次开枪比较并交换失败后的最大重试次数
+MAX_CAS_ATTEMPTS = 16
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS games ("
+    " group_id TEXT PRIMARY KEY,"
+    " chamber_count INTEGER NOT NULL,"
+    " chambers INTEGER NOT NULL,"
+    " current_chamber_index INTEGER NOT NULL,"
+    " live_rounds INTEGER NOT NULL,"
+    " origin TEXT,"
+    " owner TEXT,"
+    " deadline REAL NOT NULL,"
+    " lease_until REAL NOT NULL,"
+    " version INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS games_lease_until ON games (lease_until)",
+)
+
+
+class ShotOutcome(NamedTuple):
+    hit: bool
+    state: GameState
+
+
+class MemoryStateBackend:
+    """单进程内存后端，游戏状态与消息来源直接保存在字典中
+
+    同一群的操作已由 GroupSerializer 串行化，这里不需要额外加锁；
+    超时完全由本进程的时间轮决定，因此不记录截止时间与租约。
+    """
+
+    shared = False
+
+    def __init__(self):
+        self.games: Dict[Any, GameState] = {}
+        self.origins: Dict[Any, Any] = {}
+
+    def open(self):
+        pass
+
+    async def get_game(self, group_id) -> Optional[GameState]:
+        return self.games.get(group_id)
+
+    async def create_game(self, group_id, state: GameState, origin, owner: str, deadline: float) -> bool:
+        """没有进行中的游戏时写入新游戏，返回是否成功"""
+        current = self.games.get(group_id)
+        if current is not None and current.is_active:
+            return False
+        self.games[group_id] = state
+        self.origins[group_id] = origin
+        return True
+
+    async def fire(self, group_id, origin, owner: str, deadline: float) -> Optional[ShotOutcome]:
+        """开一枪并写回，实弹打完时删除游戏；没有游戏返回 None"""
+        state = self.games.get(group_id)
+        if state is None:
+            return None
+        hit = state.fire()
+        if state.is_active:
+            self.origins[group_id] = origin
+        else:
+            # 游戏结束后不再需要消息来源，避免映射随群数无限增长
+            del self.games[group_id]
+            self.origins.pop(group_id, None)
+        return ShotOutcome(hit, state)
+
+    async def claim_timeout(self, group_id, owner: str) -> Optional[Any]:
+        """认领到期的游戏并删除，返回用于发送超时提示的消息来源"""
+        origin = self.origins.pop(group_id, None)
+        if self.games.pop(group_id, None) is None:
+            return None
+        return origin
+
+    async def expired_leases(self, limit: int = 100) -> List[str]:
+        return []
+
+    def forget(self, group_id):
+        pass
+
+    async def close(self):
+        pass
+
+
+def _encode_group_id(group_id) -> str:
+    return str(group_id)
+
+
+class SqliteStateBackend:
+    """多进程共享后端（SQLite WAL），多个机器人工作进程可服务同一批群
+
+    - 开枪是一次比较并交换：读出游戏与版本号，在本地击发，再按版本号条件写回，
+      版本不符（被其他进程抢先）时重读重试；
+    - 装填或开枪的进程成为该局的超时持有者，租约到截止时间加宽限期为止；
+      到期时只有持有者、或租约已过期后的任一进程能删除游戏并发送超时提示。
+
+    games / origins 仅缓存本进程最近操作过的游戏，供指标与状态展示使用。
+    """
+
+    shared = True
+
+    def __init__(self, path: str, lease_grace: float = DEFAULT_LEASE_GRACE, clock=time.time):
+        self.path = path
+        self.lease_grace = lease_grace
+        self._clock = clock
+        self._conn: Optional[Any] = None
+        self._conn_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.games: Dict[Any, GameState] = {}
+        self.origins: Dict[Any, Any] = {}
+        self.cas_retries = 0
+
+    def open(self):
+        if self._conn is not None:
+            return
+        import sqlite3
+
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        self._conn = conn
+
+    def _connection(self):
+        if self._conn is None:
+            self.open()
+        return self._conn
+
+    async def _call(self, function, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rg-state-backend")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def _lease_until(self, deadline: float) -> float:
+        return deadline + self.lease_grace
+
+    # 以下 _sync_* 方法在后端线程中执行，也可在没有事件循环的进程里直接调用
+
+    def _sync_get_game(self, group_id) -> Optional[GameState]:
+        with self._conn_lock:
+            row = self._connection().execute(
+                "SELECT chamber_count, chambers, current_chamber_index, live_rounds FROM games "
+                "WHERE group_id = ? AND deadline > ?",
+                (_encode_group_id(group_id), self._clock()),
+            ).fetchone()
+        return GameState(row[0], row[1], row[2], row[3]) if row else None
+
+    def _sync_create_game(self, group_id, state: GameState, origin, owner: str, deadline: float) -> bool:
+        # 已过截止时间但尚未被认领的旧局视为结束，可以直接覆盖
+        with self._conn_lock:
+            cursor = self._connection().execute(
+                "INSERT INTO games (group_id, chamber_count, chambers, current_chamber_index, live_rounds,"
+                " origin, owner, deadline, lease_until) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(group_id) DO UPDATE SET chamber_count = excluded.chamber_count,"
+                " chambers = excluded.chambers, current_chamber_index = excluded.current_chamber_index,"
+                " live_rounds = excluded.live_rounds, origin = excluded.origin, owner = excluded.owner,"
+                " deadline = excluded.deadline, lease_until = excluded.lease_until, version = games.version + 1 "
+                "WHERE games.live_rounds = 0 OR games.deadline <= ?",
+                (
+                    _encode_group_id(group_id), state.chamber_count, state.chambers,
+                    state.current_chamber_index, state.live_rounds, str(origin), owner,
+                    deadline, self._lease_until(deadline), self._clock(),
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def _sync_fire(self, group_id, origin, owner: str, deadline: float) -> Optional[ShotOutcome]:
+        key = _encode_group_id(group_id)
+        for _attempt in range(MAX_CAS_ATTEMPTS):
+            with self._conn_lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT chamber_count, chambers, current_chamber_index, live_rounds, version FROM games "
+                    "WHERE group_id = ? AND deadline > ?",
+                    (key, self._clock()),
+                ).fetchone()
+                if row is None:
+                    return None
+                state = GameState(row[0], row[1], row[2], row[3])
+                version = row[4]
+                hit = state.fire()
+                if state.is_active:
+                    cursor = conn.execute(
+                        "UPDATE games SET chambers = ?, current_chamber_index = ?, live_rounds = ?,"
+                        " origin = ?, owner = ?, deadline = ?, lease_until = ?, version = version + 1 "
+                        "WHERE group_id = ? AND version = ?",
+                        (
+                            state.chambers, state.current_chamber_index, state.live_rounds, str(origin),
+                            owner, deadline, self._lease_until(deadline), key, version,
+                        ),
+                    )
+                else:
+                    cursor = conn.execute("DELETE FROM games WHERE group_id = ? AND version = ?", (key, version))
+            if cursor.rowcount == 1:
+                return ShotOutcome(hit, state)
+            # 读出之后被其他进程改写，重新读取再击发
+            self.cas_retries += 1
+        raise RuntimeError(f"Too much contention firing in group {group_id}")
+
+    def _sync_claim_timeout(self, group_id, owner: str) -> Optional[Any]:
+        key = _encode_group_id(group_id)
+        now = self._clock()
+        with self._conn_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT origin FROM games WHERE group_id = ? AND deadline <= ? "
+                    "AND (owner = ? OR lease_until <= ?)",
+                    (key, now, owner, now),
+                ).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM games WHERE group_id = ?", (key,))
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return row[0] if row else None
+
+    def _sync_expired_leases(self, limit: int) -> List[str]:
+        # 群号按文本原样返回，与插件 _get_group_id 的形式一致，超时处理才会拿到同一把群锁与同一个时间轮键
+        with self._conn_lock:
+            rows = self._connection().execute(
+                "SELECT group_id FROM games WHERE lease_until <= ? LIMIT ?", (self._clock(), limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    async def get_game(self, group_id) -> Optional[GameState]:
+        return await self._call(self._sync_get_game, group_id)
+
+    async def create_game(self, group_id, state: GameState, origin, owner: str, deadline: float) -> bool:
+        created = await self._call(self._sync_create_game, group_id, state, origin, owner, deadline)
+        if created:
+            self.games[group_id] = state
+            self.origins[group_id] = origin
+        return created
+
+    async def fire(self, group_id, origin, owner: str, deadline: float) -> Optional[ShotOutcome]:
+        outcome = await self._call(self._sync_fire, group_id, origin, owner, deadline)
+        if outcome is None or not outcome.state.is_active:
+            self.forget(group_id)
+        else:
+            self.games[group_id] = outcome.state
+            self.origins[group_id] = origin
+        return outcome
+
+    async def claim_timeout(self, group_id, owner: str) -> Optional[Any]:
+        self.forget(group_id)
+        return await self._call(self._sync_claim_timeout, group_id, owner)
+
+    async def expired_leases(self, limit: int = 100) -> List[str]:
+        """租约已过期、持有者未处理的游戏（持有进程可能已退出）"""
+        return await self._call(self._sync_expired_leases, limit)
+
+    def forget(self, group_id):
+        """丢弃本进程的缓存（游戏已结束或已由其他进程接管）"""
+        self.games.pop(group_id, None)
+        self.origins.pop(group_id, None)
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_state_backend(name: str, path: str):
+    """按配置名称创建状态后端，未知名称回退到内存后端"""
+    if name == STATE_BACKEND_SQLITE:
+        return SqliteStateBackend(path)
+    return MemoryStateBackend()
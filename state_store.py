@@ -0,0 +1,277 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+DEFAULT_FLUSH_DELAY = 1.0
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS misfire_switches (group_id TEXT PRIMARY KEY, enabled INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS player_stats ("
+    " group_id TEXT NOT NULL, user_id TEXT NOT NULL, nickname TEXT NOT NULL DEFAULT '',"
+    " shots INTEGER NOT NULL DEFAULT 0, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0,"
+    " misfires INTEGER NOT NULL DEFAULT 0, ban_seconds INTEGER NOT NULL DEFAULT 0,"
+    " PRIMARY KEY (group_id, user_id))",
+    "CREATE INDEX IF NOT EXISTS player_stats_rank ON player_stats (group_id, ban_seconds DESC, hits DESC)",
+    "CREATE TABLE IF NOT EXISTS group_overrides ("
+    " group_id TEXT NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (group_id, name))",
+)
+
+# 按群批量读取走火开关时每条语句的参数个数，低于 SQLite 的变量上限
+_SWITCH_QUERY_CHUNK = 500
+
+_PLAYER_COLUMNS = "user_id, nickname, shots, hits, misses, misfires, ban_seconds"
+
+
+def _normalize_group_id(raw: str):
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return raw
+
+
+class PluginStateStore:
+    """插件运行状态的持久化存储（SQLite WAL）
+
+    写入先合并到内存中的待写缓冲，经过一段防抖延迟后在独立线程里
+    以单个事务批量提交，事件循环只负责登记变更。
+    """
+
+    def __init__(self, path: str, flush_delay: float = DEFAULT_FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._conn: Optional[Any] = None
+        self._conn_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending_switches: Dict[Any, Optional[bool]] = {}
+        # 已取出、正在写线程中提交的一批，读取时同样优先于数据库
+        self._writing_switches: Dict[Any, Optional[bool]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def open(self):
+        if self._conn is not None:
+            return
+        # sqlite3 只在预热阶段真正建库时导入，不拖慢插件模块导入
+        import sqlite3
+
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        self._conn = conn
+
+    def _connection(self):
+        if self._conn is None:
+            self.open()
+        return self._conn
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._conn_lock:
+            row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._conn_lock:
+            self._connection().execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def load_switch(self, group_id) -> Optional[bool]:
+        """读取单个群保存的走火开关，没有保存（即使用默认值）时返回 None"""
+        for pending in (self._pending_switches, self._writing_switches):
+            if group_id in pending:
+                return pending[group_id]
+        with self._conn_lock:
+            row = self._connection().execute(
+                "SELECT enabled FROM misfire_switches WHERE group_id = ?", (str(group_id),)
+            ).fetchone()
+        return bool(row[0]) if row else None
+
+    def load_switches(self, group_ids: Optional[List[Any]] = None) -> Dict[Any, bool]:
+        """读取保存的走火开关，指定 group_ids 时只读取这些群"""
+        with self._conn_lock:
+            conn = self._connection()
+            if group_ids is None:
+                rows = conn.execute("SELECT group_id, enabled FROM misfire_switches").fetchall()
+            else:
+                rows = []
+                keys = [str(group_id) for group_id in group_ids]
+                for start in range(0, len(keys), _SWITCH_QUERY_CHUNK):
+                    chunk = keys[start:start + _SWITCH_QUERY_CHUNK]
+                    rows.extend(conn.execute(
+                        "SELECT group_id, enabled FROM misfire_switches "
+                        f"WHERE group_id IN ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall())
+        switches = {_normalize_group_id(group_id): bool(enabled) for group_id, enabled in rows}
+        for pending in (self._writing_switches, self._pending_switches):
+            for group_id, enabled in pending.items():
+                group_id = _normalize_group_id(str(group_id))
+                if enabled is None:
+                    switches.pop(group_id, None)
+                else:
+                    switches[group_id] = enabled
+        return switches
+
+    def import_switches(self, switches: Dict[Any, Any]):
+        """同步导入一批走火开关，仅用于启动时的一次性迁移"""
+        self._write_switches({key: bool(value) for key, value in switches.items()})
+
+    def set_switch(self, group_id, enabled: Optional[bool]):
+        """登记走火开关变更，稍后批量落盘；enabled 为 None 表示删除记录、恢复默认值"""
+        self._pending_switches[group_id] = None if enabled is None else bool(enabled)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有运行中的事件循环时直接同步写入
+            self._write_switches(self._take_pending())
+            return
+        self._flush_handle = loop.call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
+        else:
+            # 上一批仍在写入，稍后再合并提交
+            self._schedule_flush()
+
+    def _take_pending(self) -> Dict[Any, Optional[bool]]:
+        pending, self._pending_switches = self._pending_switches, {}
+        return pending
+
+    async def flush(self):
+        """把待写缓冲提交到数据库"""
+        pending = self._take_pending()
+        if not pending:
+            return
+        self._writing_switches = pending
+        try:
+            await self.call(self._write_switches, pending)
+        except Exception as exc:
+            logger.error(f"Failed to persist misfire switches: {exc}")
+            # 写入失败时放回缓冲，新的变更优先
+            pending.update(self._pending_switches)
+            self._pending_switches = pending
+            self._schedule_flush()
+        finally:
+            self._writing_switches = {}
+
+    async def call(self, function, *args):
+        """在状态存储的写线程中执行 function，与批量写入串行"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rg-state-store")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def load_player_stats(self, group_id, user_id) -> Optional[Tuple]:
+        """读取单个玩家的累计统计，返回 (user_id, nickname, shots, hits, misses, misfires, ban_seconds)"""
+        with self._conn_lock:
+            return self._connection().execute(
+                f"SELECT {_PLAYER_COLUMNS} FROM player_stats WHERE group_id = ? AND user_id = ?",
+                (str(group_id), str(user_id)),
+            ).fetchone()
+
+    def load_top_players(self, group_id, limit: int) -> List[Tuple]:
+        """按累计禁言时长读取群内前 limit 名，走 player_stats_rank 索引"""
+        with self._conn_lock:
+            rows = self._connection().execute(
+                f"SELECT {_PLAYER_COLUMNS} FROM player_stats WHERE group_id = ? "
+                "ORDER BY ban_seconds DESC, hits DESC LIMIT ?",
+                (str(group_id), limit),
+            ).fetchall()
+        return [(_normalize_group_id(row[0]),) + tuple(row[1:]) for row in rows]
+
+    def add_player_stats(self, rows: List[Tuple]):
+        """以增量方式合并一批玩家统计，多个进程共用数据库时不会互相覆盖"""
+        if not rows:
+            return
+        with self._conn_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO player_stats (group_id, user_id, nickname, shots, hits, misses, misfires, ban_seconds)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(group_id, user_id) DO UPDATE SET"
+                    " nickname = CASE WHEN excluded.nickname != '' THEN excluded.nickname ELSE nickname END,"
+                    " shots = shots + excluded.shots, hits = hits + excluded.hits,"
+                    " misses = misses + excluded.misses, misfires = misfires + excluded.misfires,"
+                    " ban_seconds = ban_seconds + excluded.ban_seconds",
+                    rows,
+                )
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def load_group_overrides(self) -> Dict[str, Dict[str, str]]:
+        """读取全部按群覆盖的游戏参数（只有管理员设置过的群才有记录），群号与事件中一样为字符串"""
+        with self._conn_lock:
+            rows = self._connection().execute("SELECT group_id, name, value FROM group_overrides").fetchall()
+        overrides: Dict[str, Dict[str, str]] = {}
+        for group_id, name, value in rows:
+            overrides.setdefault(group_id, {})[name] = value
+        return overrides
+
+    def write_group_overrides(self, group_id, overrides: Dict[str, Any]):
+        """以单个事务替换一个群的全部覆盖项，overrides 为空时删除该群的记录"""
+        rows = [(str(group_id), name, str(value)) for name, value in overrides.items()]
+        with self._conn_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM group_overrides WHERE group_id = ?", (str(group_id),))
+                conn.executemany("INSERT INTO group_overrides (group_id, name, value) VALUES (?, ?, ?)", rows)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _write_switches(self, switches: Dict[Any, Optional[bool]]):
+        if not switches:
+            return
+        rows = [(str(group_id), int(enabled)) for group_id, enabled in switches.items() if enabled is not None]
+        removed = [(str(group_id),) for group_id, enabled in switches.items() if enabled is None]
+        with self._conn_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO misfire_switches (group_id, enabled) VALUES (?, ?) "
+                    "ON CONFLICT(group_id) DO UPDATE SET enabled = excluded.enabled",
+                    rows,
+                )
+                conn.executemany("DELETE FROM misfire_switches WHERE group_id = ?", removed)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    async def close(self):
+        """提交剩余变更并关闭数据库"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
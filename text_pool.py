@@ -0,0 +1,148 @@
+import hashlib
+import os
+import random
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+
+TEXT_ENCODINGS = ('utf-8', 'gbk', 'gb2312')
+NICKNAME_FIELD = 'sender_nickname'
+
+_formatter = Formatter()
+
+
+def decode_texts(data: bytes) -> Dict[str, Any]:
+    """按常见编码依次尝试解析文本 YAML"""
+    import yaml
+
+    for encoding in TEXT_ENCODINGS:
+        try:
+            text = data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        loaded = yaml.safe_load(text) or {}
+        return loaded if isinstance(loaded, dict) else {}
+    return {}
+
+
+def _split_template(raw: str) -> Tuple[str, ...]:
+    """按 {sender_nickname} 切分模板，渲染时只需一次 join"""
+    parts: List[str] = []
+    current: List[str] = []
+    try:
+        for literal, field, spec, conversion in _formatter.parse(raw):
+            current.append(literal)
+            if field is None:
+                continue
+            if field == NICKNAME_FIELD and not spec and not conversion:
+                parts.append(''.join(current))
+                current = []
+                continue
+            # 未知占位符保持原样输出，而不是在发送时抛出 KeyError
+            placeholder = field
+            if conversion:
+                placeholder += '!' + conversion
+            if spec:
+                placeholder += ':' + spec
+            current.append('{' + placeholder + '}')
+    except ValueError:
+        return (raw,)
+    parts.append(''.join(current))
+    return tuple(parts)
+
+
+class TextTemplate:
+    """预解析的文本模板"""
+
+    __slots__ = ('raw', '_parts')
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self._parts = _split_template(raw)
+
+    def render(self, sender_nickname: str) -> str:
+        parts = self._parts
+        if len(parts) == 1:
+            return parts[0]
+        return sender_nickname.join(parts)
+
+
+class TextPool:
+    """编译后的只读文本池，每个键对应一个模板元组"""
+
+    __slots__ = ('_entries', 'digest')
+
+    def __init__(self, entries: Dict[str, Tuple[TextTemplate, ...]], digest: str = ''):
+        self._entries = entries
+        self.digest = digest
+
+    def templates(self, key: str) -> Tuple[TextTemplate, ...]:
+        return self._entries.get(key, ())
+
+    def choose(self, key: str) -> Optional[TextTemplate]:
+        templates = self._entries.get(key)
+        return random.choice(templates) if templates else None
+
+
+def _as_text_list(value: Any) -> Optional[List[str]]:
+    if not value or not isinstance(value, list):
+        return None
+    return [item if isinstance(item, str) else str(item) for item in value]
+
+
+def compile_texts(loaded: Dict[str, Any], *fallbacks: Dict[str, Any], digest: str = '') -> TextPool:
+    """把文本字典编译为文本池，缺失或非法的键依次使用后备文本"""
+    keys: List[str] = []
+    for source in (loaded,) + fallbacks:
+        for key in source:
+            if key not in keys:
+                keys.append(key)
+
+    entries: Dict[str, Tuple[TextTemplate, ...]] = {}
+    for key in keys:
+        for source in (loaded,) + fallbacks:
+            values = _as_text_list(source.get(key))
+            if values:
+                entries[key] = tuple(TextTemplate(value) for value in values)
+                break
+    return TextPool(entries, digest)
+
+
+class TextFileWatcher:
+    """按 mtime/大小探测文本文件变化，内容哈希不变时不重新编译"""
+
+    __slots__ = ('path', '_signature', '_digest')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature: Optional[Tuple[int, int]] = None
+        self._digest: Optional[str] = None
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        """只做一次 stat，判断文件是否可能发生变化"""
+        return self._stat_signature() != self._signature
+
+    def read_if_changed(self) -> Optional[Tuple[Dict[str, Any], str]]:
+        """文件内容确有变化时返回 (解析结果, 摘要)，否则返回 None"""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return None
+        try:
+            with open(self.path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            self._signature = signature
+            return None
+        self._signature = signature
+        digest = hashlib.sha1(data).hexdigest()
+        if digest == self._digest:
+            return None
+        self._digest = digest
+        return decode_texts(data), digest
+
@@ -0,0 +1,145 @@
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from astrbot.api import logger
+
+DEFAULT_TICK_SECONDS = 0.25
+DEFAULT_WHEEL_SLOTS = 512
+# 单批并发回调数量，避免一次性为数万个到期群创建任务
+CALLBACK_BATCH_SIZE = 256
+
+
+class TimeoutWheel:
+    """基于单调时钟的哈希时间轮，按群 id 管理游戏超时
+
+    每个群在时间轮里只有一个条目，重新计时与取消都是 O(1) 的字典操作；
+    后台任务每个刻度推进一次，把同一刻度内到期的群批量交给回调处理。
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Any], Awaitable[Any]],
+        tick_seconds: float = DEFAULT_TICK_SECONDS,
+        slots: int = DEFAULT_WHEEL_SLOTS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._callback = callback
+        self.tick_seconds = tick_seconds
+        self._slot_count = slots
+        self._clock = clock
+        self._slots: List[Dict[Any, float]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Any, int] = {}
+        self._cursor = int(clock() // tick_seconds)
+        self._task: Optional[asyncio.Task] = None
+        self._pending_callbacks: set = set()
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key) -> bool:
+        return key in self._slot_of
+
+    def schedule(self, key, delay: float):
+        """为 key 设置 delay 秒后的超时，已存在的超时会被替换"""
+        self.schedule_at(key, self._clock() + delay)
+
+    def schedule_at(self, key, deadline: float):
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            del self._slots[slot][key]
+        tick_index = math.ceil(deadline / self.tick_seconds)
+        if tick_index <= self._cursor:
+            tick_index = self._cursor + 1
+        slot = tick_index % self._slot_count
+        self._slots[slot][key] = deadline
+        self._slot_of[key] = slot
+        self._ensure_running()
+
+    def cancel(self, key) -> bool:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def deadline(self, key) -> Optional[float]:
+        slot = self._slot_of.get(key)
+        if slot is None:
+            return None
+        return self._slots[slot][key]
+
+    def remaining(self, key) -> Optional[float]:
+        """剩余时间（秒），没有超时返回 None"""
+        deadline = self.deadline(key)
+        if deadline is None:
+            return None
+        return max(deadline - self._clock(), 0.0)
+
+    def advance(self, now: Optional[float] = None) -> List[Any]:
+        """推进时间轮到 now，返回并移除所有已到期的 key"""
+        if now is None:
+            now = self._clock()
+        target = int(now // self.tick_seconds)
+        cursor = self._cursor
+        if target <= cursor:
+            return []
+        expired: List[Any] = []
+        # 间隔超过一整圈时每个槽只需要扫描一次
+        steps = min(target - cursor, self._slot_count)
+        slots = self._slots
+        slot_of = self._slot_of
+        for tick_index in range(target - steps + 1, target + 1):
+            bucket = slots[tick_index % self._slot_count]
+            if not bucket:
+                continue
+            due = [key for key, deadline in bucket.items() if deadline <= now]
+            for key in due:
+                del bucket[key]
+                del slot_of[key]
+            expired.extend(due)
+        self._cursor = target
+        return expired
+
+    def start(self):
+        """在事件循环中启动推进任务（例如恢复快照后）"""
+        self._ensure_running()
+
+    def _ensure_running(self):
+        if self._task is not None and not self._task.done():
+            return
+        if not self._slot_of:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while self._slot_of:
+            # 对齐到下一个刻度边界，到期延迟不超过一个刻度
+            next_tick = (self._cursor + 1) * self.tick_seconds
+            await asyncio.sleep(max(next_tick - self._clock(), 0.0))
+            expired = self.advance()
+            if expired:
+                task = asyncio.ensure_future(self._fire(expired))
+                self._pending_callbacks.add(task)
+                task.add_done_callback(self._pending_callbacks.discard)
+
+    async def _fire(self, keys: List[Any]):
+        for offset in range(0, len(keys), CALLBACK_BATCH_SIZE):
+            batch = keys[offset:offset + CALLBACK_BATCH_SIZE]
+            results = await asyncio.gather(*(self._callback(key) for key in batch), return_exceptions=True)
+            for key, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Timeout callback failed for {key}: {result}")
+
+    def stop(self):
+        """停止后台推进任务，已登记的超时保留在时间轮中"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._pending_callbacks):
+            task.cancel()